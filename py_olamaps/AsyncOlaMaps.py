@@ -0,0 +1,292 @@
+import asyncio
+import time
+from enum import Enum
+from http import HTTPStatus
+
+from py_olamaps import resources
+from py_olamaps.BaseOlaMaps import BaseOlaMaps
+from py_olamaps.auth import DEFAULT_REFRESH_MARGIN, AsyncTokenManager, TokenStore
+from py_olamaps.breaker import CircuitBreaker
+from py_olamaps.hedge import HedgePolicy, asend_hedged
+from py_olamaps.image_cache import ImageCache
+from py_olamaps.metadata import MetadataCache, MetadataEntry
+from py_olamaps.ratelimit import RateLimiter
+from py_olamaps.retry import RetryPolicy
+from py_olamaps.singleflight import AsyncSingleFlight
+from py_olamaps.transport import AsyncTransport
+from py_olamaps.utils.download import DEFAULT_CHUNK_SIZE, DownloadResult, conditional_headers, open_sink
+
+
+class AsyncOlaMaps(BaseOlaMaps):
+    def __init__(self,
+                 api_key: str = None,
+                 client_id: str = None,
+                 client_secret: str = None,
+                 transport=None,
+                 max_connections: int = None,
+                 timeout: tuple = None,
+                 base_url: str = None,
+                 cache=None,
+                 token_refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 token_store: TokenStore = None,
+                 retry: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None,
+                 circuit_breaker: CircuitBreaker = None,
+                 coalesce_requests: bool = False,
+                 hedge: HedgePolicy = None,
+                 image_cache: ImageCache = None,
+                 metadata_cache: MetadataCache = None):
+        """
+        Asyncio counterpart of `OlaMaps`. Every resource method is a coroutine and all requests share one non-blocking
+        pooled `AsyncTransport`, so thousands of lookups can be in flight from a single event loop.
+
+        This automatically infers the following arguments from their corresponding environment variables if they are not provided:
+        - `api_key` from `OLA_MAPS_API_KEY`
+        - `client_id` from `OLA_MAPS_CLIENT_ID`
+        - `client_secret` from `OLA_MAPS_CLIENT_SECRET`
+
+        The OAuth access token is fetched asynchronously on the first authenticated call, refreshed in a background
+        task `token_refresh_margin` seconds before it expires and, like in `OlaMaps`, can be shared between processes
+        through `token_store`. Constructing the client makes no network calls; await `warm()` to fetch the token ahead
+        of the first request.
+        """
+        super().__init__(api_key, client_id, client_secret, base_url, cache, retry, rate_limiter,
+                         circuit_breaker, AsyncSingleFlight() if coalesce_requests else None,
+                         hedge, image_cache, metadata_cache)
+
+        if transport is None:
+            transport_options = dict()
+            if max_connections is not None:
+                transport_options["max_connections"] = max_connections
+            if timeout is not None:
+                transport_options["timeout"] = timeout
+            transport = AsyncTransport(**transport_options)
+        self.transport = transport
+        self._metadata_flight = AsyncSingleFlight()
+        self._metadata_tasks = set()
+        self.token_manager = AsyncTokenManager(self._fetch_token, token_refresh_margin, token_store,
+                                               self._token_store_key())
+
+        self.routing = resources.AsyncRouting(self)
+        self.places = resources.AsyncPlaces(self)
+        self.map_tiles = resources.AsyncMapTiles(self)
+        self.roads = resources.AsyncRoads(self)
+        self.geocode = resources.AsyncGeocode(self)
+
+    async def generate_access_token(self):
+        """
+        Description: Async variant of `OlaMaps.generate_access_token`.
+        """
+        if self.api_key is not None:
+            return None
+        return await self.token_manager.get_token()
+
+    async def warm(self):
+        """
+        Description: Async variant of `OlaMaps.warm`.
+
+        :return: AsyncOlaMaps
+        Example: client = await AsyncOlaMaps(client_id=..., client_secret=...).warm()
+        """
+        await self.generate_access_token()
+        return self
+
+    async def _fetch_token(self):
+        url, data = self._token_request()
+        requested_at = time.time()
+        response = await self.transport.request("POST", url, data=data)
+        return self._parse_token(response, requested_at)
+
+    async def _request(self,
+                       method: str,
+                       endpoint: Enum,
+                       url: str,
+                       headers: dict,
+                       query_params: dict,
+                       raw: bool = False):
+        cache_key = self._cache_key(method, endpoint, url, query_params, raw)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, endpoint)
+            if cached is not None:
+                return cached
+
+        flight_key = self._flight_key(method, url, headers, query_params, raw)
+        if flight_key is None:
+            return await self._perform(method, endpoint, url, headers, query_params, raw, cache_key)
+        return await self.single_flight.do(
+            flight_key, lambda: self._perform(method, endpoint, url, headers, query_params, raw, cache_key))
+
+    async def _perform(self,
+                       method: str,
+                       endpoint: Enum,
+                       url: str,
+                       headers: dict,
+                       query_params: dict,
+                       raw: bool,
+                       cache_key: str):
+        response = await self._send_with_retry(method, endpoint, url, headers, query_params)
+        result = self._handle_response(response, query_params, raw)
+
+        if cache_key is not None:
+            self.cache.set(cache_key, result, endpoint)
+        return result
+
+    async def _request_metadata(self,
+                                endpoint: Enum,
+                                url: str,
+                                headers: dict,
+                                query_params: dict) -> dict:
+        key = self._metadata_key(endpoint, url, query_params)
+        if key is None:
+            return await self._request("GET", endpoint, url, headers, query_params)
+
+        entry = self.metadata_cache.get(key)
+        if entry is None:
+            entry = await self._metadata_flight.do(
+                key, lambda: self._load_metadata(key, endpoint, url, headers, query_params))
+        elif self.metadata_cache.begin_revalidation(key, entry):
+            task = asyncio.ensure_future(self._revalidate_metadata(key, endpoint, url, headers, query_params, entry))
+            self._metadata_tasks.add(task)
+            task.add_done_callback(self._metadata_tasks.discard)
+        return entry.value
+
+    async def _fetch_metadata(self,
+                              endpoint: Enum,
+                              url: str,
+                              headers: dict,
+                              query_params: dict,
+                              entry: MetadataEntry = None) -> MetadataEntry:
+        if entry is not None:
+            headers = conditional_headers(headers, entry.etag, entry.last_modified)
+        response = await self._send_with_retry("GET", endpoint, url, headers, query_params)
+        return self._metadata_entry(response, query_params, entry)
+
+    async def _load_metadata(self, key: str, endpoint: Enum, url: str, headers: dict,
+                             query_params: dict) -> MetadataEntry:
+        entry = await self._fetch_metadata(endpoint, url, headers, query_params)
+        self.metadata_cache.set(key, entry)
+        return entry
+
+    async def _revalidate_metadata(self, key: str, endpoint: Enum, url: str, headers: dict, query_params: dict,
+                                   entry: MetadataEntry):
+        # A failed revalidation keeps serving the current copy until it is due again.
+        fresh = entry._replace(validated_at=time.monotonic())
+        try:
+            fresh = await self._fetch_metadata(endpoint, url, headers, query_params, entry)
+        except Exception:
+            pass
+        finally:
+            self.metadata_cache.end_revalidation(key, fresh)
+
+    async def _download(self,
+                        endpoint: Enum,
+                        url: str,
+                        headers: dict,
+                        query_params: dict,
+                        destination,
+                        chunk_size: int = DEFAULT_CHUNK_SIZE,
+                        copy=None) -> DownloadResult:
+        started_at = time.monotonic()
+        response = await self._send_with_retry("GET", endpoint, url, headers, query_params, stream=True)
+        try:
+            headers_at = time.monotonic()
+            if response.status_code == HTTPStatus.NOT_MODIFIED:
+                return self._download_result(response, 0, started_at, headers_at)
+            if response.status_code != HTTPStatus.OK:
+                # Error bodies are small; read them so that `APIException` can parse them.
+                await response.aread()
+            self._handle_response(response, query_params, raw=True)
+
+            sink = open_sink(destination, copy)
+            bytes_written = 0
+            try:
+                async for chunk in response.aiter_bytes(chunk_size):
+                    sink.write(chunk)
+                    bytes_written += len(chunk)
+            except BaseException:
+                sink.abort()
+                raise
+            sink.commit()
+            return self._download_result(response, bytes_written, started_at, headers_at)
+        finally:
+            await response.aclose()
+
+    async def _send_with_retry(self,
+                               method: str,
+                               endpoint: Enum,
+                               url: str,
+                               headers: dict,
+                               query_params: dict,
+                               stream: bool = False):
+        policy = self._retry_policy(endpoint)
+        attempt = 1
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before(endpoint)
+            wait = self._rate_limit_delay(endpoint)
+            if wait:
+                await asyncio.sleep(wait)
+            try:
+                response = await self._send_hedged(method, endpoint, url, headers, query_params, stream)
+            except Exception as error:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.after(endpoint, error=error)
+                delay = policy.retry_delay(method, attempt, self.retry.budget, error=error) if policy else None
+                if delay is None:
+                    raise
+            else:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.after(endpoint, response=response)
+                delay = policy.retry_delay(method, attempt, self.retry.budget, response=response) if policy else None
+                if delay is None:
+                    return response
+                await response.aclose()
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def _send_hedged(self,
+                           method: str,
+                           endpoint: Enum,
+                           url: str,
+                           headers: dict,
+                           query_params: dict,
+                           stream: bool = False):
+        if not self._hedges(endpoint):
+            return await self._send(method, url, headers, query_params, stream)
+        return await asend_hedged(self.hedge, endpoint, lambda: self._send(method, url, headers, query_params, stream),
+                                  lambda: self._allow_hedge(endpoint))
+
+    async def _send(self,
+                    method: str,
+                    url: str,
+                    headers: dict,
+                    query_params: dict,
+                    stream: bool = False):
+        if not self._is_api_url(url):
+            return await self.transport.request(method, url, headers=headers, params=query_params, stream=stream)
+
+        access_token = await self.generate_access_token()
+        request_headers, request_params = self._authorize(headers, query_params, access_token)
+        response = await self.transport.request(method, url, headers=request_headers, params=request_params,
+                                                stream=stream)
+
+        if response.status_code == HTTPStatus.UNAUTHORIZED and access_token is not None:
+            # The token may have been revoked or rotated early; retry once with a freshly fetched one.
+            await response.aclose()
+            await self.token_manager.invalidate(access_token)
+            access_token = await self.generate_access_token()
+            request_headers, request_params = self._authorize(headers, query_params, access_token)
+            response = await self.transport.request(method, url, headers=request_headers, params=request_params,
+                                                    stream=stream)
+        return response
+
+    async def aclose(self):
+        for task in list(self._metadata_tasks):
+            task.cancel()
+        await self.transport.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
@@ -0,0 +1,207 @@
+import datetime
+import os
+import time
+from enum import Enum
+from http import HTTPStatus
+from urllib.parse import urlencode, urlsplit
+
+from py_olamaps.auth import Token
+from py_olamaps.exceptions import APIException, OlaMapsError
+from py_olamaps.metadata import MetadataEntry
+from py_olamaps.utils.CommonEnums import Api, OAuth
+from py_olamaps.utils.download import DownloadResult
+
+
+class BaseOlaMaps:
+    def __init__(self,
+                 api_key: str = None,
+                 client_id: str = None,
+                 client_secret: str = None,
+                 base_url: str = None,
+                 cache=None,
+                 retry=None,
+                 rate_limiter=None,
+                 circuit_breaker=None,
+                 single_flight=None,
+                 hedge=None,
+                 image_cache=None,
+                 metadata_cache=None):
+        """
+        Shared configuration of `OlaMaps` and `AsyncOlaMaps`: credentials, OAuth token state, the optional response,
+        image and metadata caches, retry policy, rate limiter, circuit breaker, request coalescing and hedging, and the
+        mapping of API responses to results or `APIException`.
+        """
+        if api_key is None:
+            api_key = os.environ.get("OLA_MAPS_API_KEY")
+
+        if client_id is None:
+            client_id = os.environ.get("OLA_MAPS_CLIENT_ID")
+
+        if client_secret is None:
+            client_secret = os.environ.get("OLA_MAPS_CLIENT_SECRET")
+
+        if not api_key and not (client_id and client_secret):
+            raise OlaMapsError(
+                "You must provide either an api_key or both client_id and client_secret. "
+                "Set the OLA_MAPS_API_KEY environment variable or pass the api_key, or set both "
+                "OLA_MAPS_CLIENT_ID and OLA_MAPS_CLIENT_SECRET environment variables or pass the client_id and client_secret."
+            )
+
+        self.api_key = api_key
+        self.client_id = client_id
+        self.client_secret = client_secret
+        self.base_url = base_url if base_url is not None else Api.Protocol.value + Api.Host.value
+        self.cache = cache
+        self.retry = retry
+        self.rate_limiter = rate_limiter
+        self.circuit_breaker = circuit_breaker
+        self.single_flight = single_flight
+        self.hedge = hedge
+        self.image_cache = image_cache
+        self.metadata_cache = metadata_cache
+        self.token_manager = None
+
+    @property
+    def access_token(self) -> str:
+        token = self.token_manager.token if self.token_manager is not None else None
+        return token.value if token is not None else None
+
+    @property
+    def token_expiry(self) -> datetime.datetime:
+        token = self.token_manager.token if self.token_manager is not None else None
+        if token is None or token.expires_at is None:
+            return None
+        return datetime.datetime.utcfromtimestamp(token.expires_at)
+
+    def _token_request(self) -> tuple:
+        url = OAuth.Protocol.value + OAuth.Host.value + OAuth.Route.value
+        data = {
+            "grant_type": OAuth.Grant_Type.value,
+            "scope": OAuth.Scope.value,
+            "client_id": self.client_id,
+            "client_secret": self.client_secret
+        }
+        return url, data
+
+    def _token_store_key(self) -> str:
+        # Tokens are scoped to the client and the OAuth scope they were granted for.
+        return f"{OAuth.Host.value}:{OAuth.Scope.value}:{self.client_id}"
+
+    @staticmethod
+    def _parse_token(response, requested_at: float) -> Token:
+        if response.status_code == HTTPStatus.OK:
+            oauth_response = response.json()
+            if "access_token" in oauth_response:
+                expires_at = None
+                if "expires_in" in oauth_response:
+                    # Measured from when the request was sent, so network latency never makes a token look fresher.
+                    expires_at = requested_at + oauth_response["expires_in"]
+                return Token(oauth_response["access_token"], expires_at)
+        raise OlaMapsError(f"Could not obtain an access token (HTTP {response.status_code}). "
+                           "Check OLA_MAPS_CLIENT_ID and OLA_MAPS_CLIENT_SECRET.")
+
+    def _cache_key(self, method: str, endpoint: Enum, url: str, query_params: dict, raw: bool) -> str:
+        # Only parsed GET responses are cached; the key is built before credentials are added to the request.
+        if self.cache is None or method != "GET" or raw or not self.cache.ttl_for(endpoint):
+            return None
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return self.cache.key(method, endpoint, path, query_params)
+
+    def _image_cache_key(self, url: str, query_params: dict) -> str:
+        if self.image_cache is None:
+            return None
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return self.image_cache.key(path, query_params)
+
+    def _metadata_key(self, endpoint: Enum, url: str, query_params: dict) -> str:
+        if self.metadata_cache is None or endpoint not in self.metadata_cache.endpoints:
+            return None
+        path = url[len(self.base_url):] if url.startswith(self.base_url) else url
+        return self.metadata_cache.key(path, query_params)
+
+    def _metadata_entry(self, response, query_params: dict, entry: MetadataEntry = None) -> MetadataEntry:
+        # A 304 answers a revalidation: the copy already held is still current.
+        if entry is not None and response.status_code == HTTPStatus.NOT_MODIFIED:
+            self.metadata_cache.record_not_modified()
+            return entry._replace(validated_at=time.monotonic())
+        value = self._handle_response(response, query_params)
+        return MetadataEntry(value, response.headers.get("ETag"), response.headers.get("Last-Modified"),
+                             time.monotonic())
+
+    def _flight_key(self, method: str, url: str, headers: dict, query_params: dict, raw: bool) -> str:
+        # Only parsed GET responses are shared between concurrent callers.
+        if self.single_flight is None or method != "GET" or raw:
+            return None
+        return (f"{method} {url}?{urlencode(sorted(query_params.items()), doseq=True)} "
+                f"{urlencode(sorted(headers.items()))}")
+
+    def _retry_policy(self, endpoint: Enum):
+        if self.retry is None:
+            return None
+        policy = self.retry.for_endpoint(endpoint)
+        if policy is not None:
+            self.retry.budget.record_request()
+        return policy
+
+    def _rate_limit_delay(self, endpoint: Enum) -> float:
+        return self.rate_limiter.reserve(endpoint) if self.rate_limiter is not None else 0.0
+
+    def _hedges(self, endpoint: Enum) -> bool:
+        return self.hedge is not None and endpoint in self.hedge.endpoints
+
+    def _allow_hedge(self, endpoint: Enum) -> bool:
+        return self.rate_limiter is None or self.rate_limiter.try_reserve(endpoint)
+
+    def _is_api_url(self, url: str) -> bool:
+        # URLs taken from API documents (tile templates, TileJSON links) may point at other hosts such as a CDN.
+        # Credentials are only ever sent to the scheme and host of `base_url`.
+        target = urlsplit(url)
+        api = urlsplit(self.base_url)
+        return (target.scheme.lower(), target.netloc.lower()) == (api.scheme.lower(), api.netloc.lower())
+
+    def _authorize(self, headers: dict, query_params: dict, access_token: str) -> tuple:
+        headers = dict(headers)
+        query_params = dict(query_params)
+
+        if self.api_key is None:
+            headers["Authorization"] = f"Bearer {str(access_token)}"
+        else:
+            query_params["api_key"] = self.api_key
+
+        return headers, query_params
+
+    @staticmethod
+    def _download_result(response, bytes_written: int, started_at: float, headers_at: float) -> DownloadResult:
+        return DownloadResult(bytes_written=bytes_written,
+                              elapsed=time.monotonic() - started_at,
+                              time_to_first_byte=headers_at - started_at,
+                              not_modified=response.status_code == HTTPStatus.NOT_MODIFIED,
+                              etag=response.headers.get("ETag"),
+                              last_modified=response.headers.get("Last-Modified"),
+                              content_type=response.headers.get("Content-Type"))
+
+    @staticmethod
+    def _handle_response(response, query_params: dict, raw: bool = False):
+        if response.status_code == HTTPStatus.OK:
+            return response if raw else response.json()
+        elif raw and response.status_code == HTTPStatus.NO_CONTENT:
+            # Raw bodies may legitimately be empty, e.g. a vector tile without features.
+            return response
+        elif response.status_code == HTTPStatus.BAD_REQUEST:
+            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
+        elif response.status_code == HTTPStatus.UNAUTHORIZED:
+            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
+        elif response.status_code == HTTPStatus.FORBIDDEN:
+            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
+        elif response.status_code == HTTPStatus.NOT_FOUND:
+            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
+        elif response.status_code == HTTPStatus.CONFLICT:
+            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
+        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
+            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
+        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
+            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
+        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
+            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
+        else:
+            raise APIException("Unknown Error", response, query_params)
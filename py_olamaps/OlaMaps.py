@@ -1,48 +1,86 @@
-import datetime
-import os
+import concurrent.futures
+import threading
+import time
+from enum import Enum
 from http import HTTPStatus
 
-import requests
-
 from py_olamaps import resources
-from py_olamaps.exceptions import OlaMapsError
-from py_olamaps.utils.CommonEnums import OAuth
+from py_olamaps.BaseOlaMaps import BaseOlaMaps
+from py_olamaps.auth import DEFAULT_REFRESH_MARGIN, TokenManager, TokenStore
+from py_olamaps.breaker import CircuitBreaker
+from py_olamaps.hedge import HedgePolicy, send_hedged
+from py_olamaps.image_cache import ImageCache
+from py_olamaps.metadata import MetadataCache, MetadataEntry
+from py_olamaps.ratelimit import RateLimiter
+from py_olamaps.retry import RetryPolicy
+from py_olamaps.singleflight import SingleFlight
+from py_olamaps.transport import Transport
+from py_olamaps.utils.download import DEFAULT_CHUNK_SIZE, DownloadResult, conditional_headers, open_sink
 
 
-class OlaMaps:
+class OlaMaps(BaseOlaMaps):
     def __init__(self,
                  api_key: str = None,
                  client_id: str = None,
-                 client_secret: str = None):
+                 client_secret: str = None,
+                 transport=None,
+                 pool_maxsize: int = None,
+                 timeout: tuple = None,
+                 base_url: str = None,
+                 cache=None,
+                 token_refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 token_store: TokenStore = None,
+                 retry: RetryPolicy = None,
+                 rate_limiter: RateLimiter = None,
+                 circuit_breaker: CircuitBreaker = None,
+                 coalesce_requests: bool = False,
+                 hedge: HedgePolicy = None,
+                 image_cache: ImageCache = None,
+                 metadata_cache: MetadataCache = None):
         """
         This automatically infers the following arguments from their corresponding environment variables if they are not provided:
         - `api_key` from `OLA_MAPS_API_KEY`
         - `client_id` from `OLA_MAPS_CLIENT_ID`
         - `client_secret` from `OLA_MAPS_CLIENT_SECRET`
-        """
-        if api_key is None:
-            api_key = os.environ.get("OLA_MAPS_API_KEY")
 
-        if client_id is None:
-            client_id = os.environ.get("OLA_MAPS_CLIENT_ID")
+        Every resource sends its requests through one pooled, keep-alive `Transport` owned by the client. Pass
+        `pool_maxsize` and `timeout` to tune the default transport, or `transport` to inject your own (for example one
+        pointed at a local stand-in server together with `base_url`).
 
-        if client_secret is None:
-            client_secret = os.environ.get("OLA_MAPS_CLIENT_SECRET")
+        With client credentials, every request reads the access token from `token_manager` when it is sent. The token
+        is refreshed in the background `token_refresh_margin` seconds before it expires, and a request rejected with
+        401 is retried once with a freshly fetched token. Pass a `token_store` (e.g. `FileTokenStore`) to share tokens
+        with every other process using the same `client_id` and the same store; only one of them refreshes at a time.
 
-        if not api_key and not (client_id and client_secret):
-            raise OlaMapsError(
-                "You must provide either an api_key or both client_id and client_secret. "
-                "Set the OLA_MAPS_API_KEY environment variable or pass the api_key, or set both "
-                "OLA_MAPS_CLIENT_ID and OLA_MAPS_CLIENT_SECRET environment variables or pass the client_id and client_secret."
-            )
+        `cache`, `retry`, `rate_limiter` and `circuit_breaker` opt into response caching (`py_olamaps.cache`), retries
+        with backoff (`py_olamaps.retry`), client-side rate limits per endpoint family (`py_olamaps.ratelimit`) and
+        failing fast while an endpoint family is down (`py_olamaps.breaker`). With `coalesce_requests`, identical GET
+        requests made while one is already in flight wait for it and share its result or error instead of being sent
+        again; like cached results, shared results must not be mutated. `hedge` sends a second copy of slow requests
+        to the endpoints it lists and returns whichever answers first (`py_olamaps.hedge`). `image_cache` serves
+        repeated static map images from memory or disk (`py_olamaps.image_cache`), and `metadata_cache` memoizes the
+        TileJSON and style documents and revalidates them in the background (`py_olamaps.metadata`).
 
-        self.api_key = api_key
-        self.client_id = client_id
-        self.client_secret = client_secret
+        Constructing the client makes no network calls: the first token is fetched by the first authenticated request,
+        or ahead of time by calling `warm()`.
+        """
+        super().__init__(api_key, client_id, client_secret, base_url, cache, retry, rate_limiter,
+                         circuit_breaker, SingleFlight() if coalesce_requests else None, hedge, image_cache,
+                         metadata_cache)
 
-        self.access_token = None
-        self.token_expiry = None
-        self.access_token = self.generate_access_token()
+        if transport is None:
+            transport_options = dict()
+            if pool_maxsize is not None:
+                transport_options["pool_maxsize"] = pool_maxsize
+            if timeout is not None:
+                transport_options["timeout"] = timeout
+            transport = Transport(**transport_options)
+        self.transport = transport
+        self._hedge_executor = None
+        self._hedge_executor_lock = threading.Lock()
+        self._metadata_flight = SingleFlight()
+        self.token_manager = TokenManager(self._fetch_token, token_refresh_margin, token_store,
+                                          self._token_store_key())
 
         self.routing = resources.Routing(self)
         self.places = resources.Places(self)
@@ -51,26 +89,223 @@ class OlaMaps:
         self.geocode = resources.Geocode(self)
 
     def generate_access_token(self):
+        """
+        Description: Returns a valid OAuth access token, fetching one if needed. Returns None when the client
+        authenticates with an api_key.
+        """
+        if self.api_key is not None:
+            return None
+        return self.token_manager.get_token()
+
+    def warm(self):
+        """
+        Description: Opt-in warm-up for latency-sensitive callers: fetches the OAuth access token now instead of on the
+        first request. Does nothing when the client authenticates with an api_key.
+
+        :return: OlaMaps
+        Example: client = OlaMaps(client_id=..., client_secret=...).warm()
+        """
+        self.generate_access_token()
+        return self
+
+    def _fetch_token(self):
+        url, data = self._token_request()
+        requested_at = time.time()
+        response = self.transport.request("POST", url, data=data)
+        return self._parse_token(response, requested_at)
+
+    def _request(self,
+                 method: str,
+                 endpoint: Enum,
+                 url: str,
+                 headers: dict,
+                 query_params: dict,
+                 raw: bool = False):
+        cache_key = self._cache_key(method, endpoint, url, query_params, raw)
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, endpoint)
+            if cached is not None:
+                return cached
+
+        flight_key = self._flight_key(method, url, headers, query_params, raw)
+        if flight_key is None:
+            return self._perform(method, endpoint, url, headers, query_params, raw, cache_key)
+        return self.single_flight.do(
+            flight_key, lambda: self._perform(method, endpoint, url, headers, query_params, raw, cache_key))
+
+    def _perform(self,
+                 method: str,
+                 endpoint: Enum,
+                 url: str,
+                 headers: dict,
+                 query_params: dict,
+                 raw: bool,
+                 cache_key: str):
+        response = self._send_with_retry(method, endpoint, url, headers, query_params)
+        result = self._handle_response(response, query_params, raw)
+
+        if cache_key is not None:
+            self.cache.set(cache_key, result, endpoint)
+        return result
+
+    def _request_metadata(self,
+                          endpoint: Enum,
+                          url: str,
+                          headers: dict,
+                          query_params: dict) -> dict:
+        key = self._metadata_key(endpoint, url, query_params)
+        if key is None:
+            return self._request("GET", endpoint, url, headers, query_params)
+
+        entry = self.metadata_cache.get(key)
+        if entry is None:
+            entry = self._metadata_flight.do(
+                key, lambda: self._load_metadata(key, endpoint, url, headers, query_params))
+        elif self.metadata_cache.begin_revalidation(key, entry):
+            threading.Thread(target=self._revalidate_metadata,
+                             args=(key, endpoint, url, headers, query_params, entry), daemon=True).start()
+        return entry.value
+
+    def _fetch_metadata(self,
+                        endpoint: Enum,
+                        url: str,
+                        headers: dict,
+                        query_params: dict,
+                        entry: MetadataEntry = None) -> MetadataEntry:
+        if entry is not None:
+            headers = conditional_headers(headers, entry.etag, entry.last_modified)
+        response = self._send_with_retry("GET", endpoint, url, headers, query_params)
+        return self._metadata_entry(response, query_params, entry)
+
+    def _load_metadata(self, key: str, endpoint: Enum, url: str, headers: dict, query_params: dict) -> MetadataEntry:
+        entry = self._fetch_metadata(endpoint, url, headers, query_params)
+        self.metadata_cache.set(key, entry)
+        return entry
+
+    def _revalidate_metadata(self, key: str, endpoint: Enum, url: str, headers: dict, query_params: dict,
+                             entry: MetadataEntry):
+        # A failed revalidation keeps serving the current copy until it is due again.
+        fresh = entry._replace(validated_at=time.monotonic())
         try:
-            if self.access_token and self.token_expiry > datetime.datetime.utcnow():
-                return self.access_token
-
-            url = OAuth.Protocol.value + OAuth.Host.value + OAuth.Route.value
-            data = {
-                "grant_type": OAuth.Grant_Type.value,
-                "scope": OAuth.Scope.value,
-                "client_id": self.client_id,
-                "client_secret": self.client_secret
-            }
-
-            response = requests.post(url, data=data)
-            if response.status_code == HTTPStatus.OK:
-                oauth_response = response.json()
-                if "access_token" in oauth_response:
-                    self.access_token = oauth_response["access_token"]
-                    if "expires_in" in oauth_response:
-                        expires_in = oauth_response["expires_in"]
-                        self.token_expiry = datetime.datetime.utcnow() + datetime.timedelta(seconds=expires_in)
-            return self.access_token
+            fresh = self._fetch_metadata(endpoint, url, headers, query_params, entry)
         except Exception:
-            raise
+            pass
+        finally:
+            self.metadata_cache.end_revalidation(key, fresh)
+
+    def _download(self,
+                  endpoint: Enum,
+                  url: str,
+                  headers: dict,
+                  query_params: dict,
+                  destination,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  copy=None) -> DownloadResult:
+        # Streams the body chunk by chunk into the destination so that no full copy of it is held in memory.
+        started_at = time.monotonic()
+        response = self._send_with_retry("GET", endpoint, url, headers, query_params, stream=True)
+        try:
+            headers_at = time.monotonic()
+            if response.status_code == HTTPStatus.NOT_MODIFIED:
+                return self._download_result(response, 0, started_at, headers_at)
+            self._handle_response(response, query_params, raw=True)
+
+            sink = open_sink(destination, copy)
+            bytes_written = 0
+            try:
+                for chunk in response.iter_content(chunk_size):
+                    sink.write(chunk)
+                    bytes_written += len(chunk)
+            except BaseException:
+                sink.abort()
+                raise
+            sink.commit()
+            return self._download_result(response, bytes_written, started_at, headers_at)
+        finally:
+            response.close()
+
+    def _send_with_retry(self,
+                         method: str,
+                         endpoint: Enum,
+                         url: str,
+                         headers: dict,
+                         query_params: dict,
+                         stream: bool = False):
+        policy = self._retry_policy(endpoint)
+        attempt = 1
+        while True:
+            if self.circuit_breaker is not None:
+                self.circuit_breaker.before(endpoint)
+            wait = self._rate_limit_delay(endpoint)
+            if wait:
+                time.sleep(wait)
+            try:
+                response = self._send_hedged(method, endpoint, url, headers, query_params, stream)
+            except Exception as error:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.after(endpoint, error=error)
+                delay = policy.retry_delay(method, attempt, self.retry.budget, error=error) if policy else None
+                if delay is None:
+                    raise
+            else:
+                if self.circuit_breaker is not None:
+                    self.circuit_breaker.after(endpoint, response=response)
+                delay = policy.retry_delay(method, attempt, self.retry.budget, response=response) if policy else None
+                if delay is None:
+                    return response
+                response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def _send_hedged(self,
+                     method: str,
+                     endpoint: Enum,
+                     url: str,
+                     headers: dict,
+                     query_params: dict,
+                     stream: bool = False):
+        if not self._hedges(endpoint):
+            return self._send(method, url, headers, query_params, stream)
+        if self._hedge_executor is None:
+            with self._hedge_executor_lock:
+                if self._hedge_executor is None:
+                    self._hedge_executor = concurrent.futures.ThreadPoolExecutor(self.hedge.max_workers,
+                                                                                 "py_olamaps-hedge")
+        return send_hedged(self._hedge_executor, self.hedge, endpoint,
+                           lambda: self._send(method, url, headers, query_params, stream),
+                           lambda: self._allow_hedge(endpoint))
+
+    def _send(self,
+              method: str,
+              url: str,
+              headers: dict,
+              query_params: dict,
+              stream: bool = False):
+        if not self._is_api_url(url):
+            return self.transport.request(method, url, headers=headers, params=query_params, stream=stream)
+
+        access_token = self.generate_access_token()
+        request_headers, request_params = self._authorize(headers, query_params, access_token)
+        response = self.transport.request(method, url, headers=request_headers, params=request_params,
+                                          stream=stream)
+
+        if response.status_code == HTTPStatus.UNAUTHORIZED and access_token is not None:
+            # The token may have been revoked or rotated early; retry once with a freshly fetched one.
+            response.close()
+            self.token_manager.invalidate(access_token)
+            access_token = self.generate_access_token()
+            request_headers, request_params = self._authorize(headers, query_params, access_token)
+            response = self.transport.request(method, url, headers=request_headers, params=request_params,
+                                              stream=stream)
+        return response
+
+    def close(self):
+        if self._hedge_executor is not None:
+            self._hedge_executor.shutdown(wait=False)
+        self.transport.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
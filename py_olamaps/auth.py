@@ -0,0 +1,346 @@
+import asyncio
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import threading
+import time
+from typing import Callable, NamedTuple
+
+from py_olamaps.exceptions import OlaMapsError
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+DEFAULT_REFRESH_MARGIN = 60
+
+
+class Token(NamedTuple):
+    """
+    An OAuth access token. `expires_at` is a Unix timestamp, or None if the token does not expire.
+    """
+    value: str
+    expires_at: float = None
+
+    def expired(self, now: float = None) -> bool:
+        return self.expires_at is not None and self.expires_at <= (time.time() if now is None else now)
+
+    def expiring(self, margin: float, now: float = None) -> bool:
+        return self.expires_at is not None and self.expires_at - margin <= (time.time() if now is None else now)
+
+
+class TokenStore:
+    """
+    Key-value interface for sharing access tokens between processes and hosts, so that workers using the same
+    `client_id` reuse one token instead of each minting their own. Implement these methods to keep tokens in Redis,
+    memcached, a database, ...
+    """
+
+    def get(self, key: str) -> Token:
+        """
+        Return the Token stored under `key`, or None.
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, token: Token):
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def lock(self, key: str):
+        """
+        Return a lock object with `acquire()` and `release()` methods, exclusive across every process sharing the
+        store. It is held while a token is fetched, so only one process refreshes a given key at a time.
+        """
+        raise NotImplementedError
+
+
+class _FileLock:
+    def __init__(self, path: str):
+        self.path = path
+        self._file = None
+
+    def acquire(self):
+        self._file = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    self._file.seek(0)
+                    msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue
+
+    def release(self):
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        self._file.close()
+        self._file = None
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *args):
+        self.release()
+
+
+class FileTokenStore(TokenStore):
+    def __init__(self,
+                 directory: str = None):
+        """
+        Description: Token store for processes on one host. Each key is kept in its own JSON file, written atomically
+        and readable only by the current user, next to a lock file used to serialize refreshes.
+
+        :param directory: string
+        Description: Directory holding the token files. It is created if missing, and must be owned by the current
+        user and not writable by anyone else.
+        Example: /var/run/olamaps
+        Default value: ~/.cache/py_olamaps/tokens
+        """
+        if directory is None:
+            directory = os.path.join(os.path.expanduser("~"), ".cache", "py_olamaps", "tokens")
+        os.makedirs(directory, mode=0o700, exist_ok=True)
+        self._check_directory(directory)
+        self.directory = directory
+
+    @staticmethod
+    def _check_directory(directory: str):
+        # An existing directory keeps its owner and mode, so verify that no other user can plant or remove tokens.
+        if not hasattr(os, "getuid"):
+            return
+        status = os.stat(directory)
+        if status.st_uid != os.getuid():
+            raise OlaMapsError(f"Token directory {directory} is not owned by the current user")
+        if status.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise OlaMapsError(f"Token directory {directory} is writable by other users")
+
+    def _path(self, key: str) -> str:
+        # Hash the key so that file names never depend on (or reveal) the credentials it is built from.
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest()[:32])
+
+    def get(self, key: str) -> Token:
+        try:
+            with open(self._path(key) + ".json") as file:
+                data = json.load(file)
+            return Token(data["value"], data.get("expires_at"))
+        except (OSError, ValueError, KeyError, TypeError, AttributeError):
+            # A missing, partial or foreign file is treated as no token.
+            return None
+
+    def set(self, key: str, token: Token):
+        path = self._path(key) + ".json"
+        descriptor, temporary_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(descriptor, "w") as file:
+                json.dump({"value": token.value, "expires_at": token.expires_at}, file)
+            os.replace(temporary_path, path)
+        except BaseException:
+            os.unlink(temporary_path)
+            raise
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self._path(key) + ".json")
+        except FileNotFoundError:
+            pass
+
+    def lock(self, key: str) -> _FileLock:
+        return _FileLock(self._path(key) + ".lock")
+
+
+class TokenManager:
+    def __init__(self,
+                 fetch: Callable,
+                 refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 store: TokenStore = None,
+                 store_key: str = None):
+        """
+        Description: Hands out the current access token to every request at send time. Once the token is within
+        `refresh_margin` seconds of expiry a single background thread fetches the next one while callers keep using
+        the still-valid token; only when no valid token is left do callers wait, and then concurrent callers share one
+        fetch. Safe to use from any number of threads.
+
+        :param fetch: callable
+        Description: Called without arguments to obtain a new Token.
+
+        :param refresh_margin: float
+        Description: Seconds before expiry at which the background refresh starts.
+        Default value: 60
+
+        :param store: TokenStore
+        Description: Shared store consulted before fetching a token. A fetch holds the store's lock for `store_key`
+        and re-reads the store first, so across all processes sharing the store only one fetches each new token.
+        Default value: None
+
+        :param store_key: string
+        Description: Key of the token in `store`.
+        """
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.store = store
+        self.store_key = store_key
+        self.token = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self._refreshing_lock = threading.Lock()
+
+    def get_token(self) -> str:
+        token = self.token
+        if token is not None and not token.expired():
+            if token.expiring(self.refresh_margin):
+                self._refresh_in_background()
+            return token.value
+        return self._refresh(token).value
+
+    def invalidate(self, value: str):
+        """
+        Description: Drops the current token if it is `value`, e.g. after the API rejected it with 401, so the next
+        `get_token` fetches a new one. Tokens that were already replaced are left alone.
+        """
+        with self._lock:
+            if self.token is not None and self.token.value == value:
+                self.token = None
+        if self.store is not None:
+            with self.store.lock(self.store_key):
+                stored = self.store.get(self.store_key)
+                if stored is not None and stored.value == value:
+                    self.store.delete(self.store_key)
+
+    @staticmethod
+    def _usable(token: Token, stale: Token, margin: float) -> bool:
+        return token is not None and token != stale and not token.expiring(margin)
+
+    def _refresh(self, stale: Token, margin: float = 0) -> Token:
+        with self._lock:
+            # Another caller may have refreshed while this one waited for the lock.
+            if self._usable(self.token, stale, margin):
+                return self.token
+            self.token = self._fetch_shared(stale, margin) if self.store is not None else self._fetch()
+            return self.token
+
+    def _fetch_shared(self, stale: Token, margin: float) -> Token:
+        stored = self.store.get(self.store_key)
+        if self._usable(stored, stale, margin):
+            return stored
+        with self.store.lock(self.store_key):
+            # Another process may have stored a new token while this one waited for the lock.
+            stored = self.store.get(self.store_key)
+            if self._usable(stored, stale, margin):
+                return stored
+            token = self._fetch()
+            self.store.set(self.store_key, token)
+            return token
+
+    def _refresh_in_background(self):
+        with self._refreshing_lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+        threading.Thread(target=self._background_refresh, daemon=True).start()
+
+    def _background_refresh(self):
+        try:
+            self._refresh(self.token, self.refresh_margin)
+        except Exception:
+            # The current token is still valid; a foreground refresh retries once it expires.
+            pass
+        finally:
+            with self._refreshing_lock:
+                self._refreshing = False
+
+
+class AsyncTokenManager:
+    def __init__(self,
+                 fetch: Callable,
+                 refresh_margin: float = DEFAULT_REFRESH_MARGIN,
+                 store: TokenStore = None,
+                 store_key: str = None):
+        """
+        Description: Asyncio counterpart of `TokenManager`. `fetch` is a coroutine function and the background refresh
+        runs as a task on the event loop. Calls to `store` may block, so they run in the loop's default executor.
+        """
+        self._fetch = fetch
+        self.refresh_margin = refresh_margin
+        self.store = store
+        self.store_key = store_key
+        self.token = None
+        self._lock = None
+        self._refresh_task = None
+
+    async def get_token(self) -> str:
+        token = self.token
+        if token is not None and not token.expired():
+            if token.expiring(self.refresh_margin):
+                self._refresh_in_background()
+            return token.value
+        return (await self._refresh(token)).value
+
+    async def invalidate(self, value: str):
+        """
+        Description: Async variant of `TokenManager.invalidate`.
+        """
+        if self.token is not None and self.token.value == value:
+            self.token = None
+        if self.store is None:
+            return
+
+        # The store lock may be held by a refresh awaiting its token request, so never wait for it on the loop.
+        loop = asyncio.get_running_loop()
+        lock = self.store.lock(self.store_key)
+        await loop.run_in_executor(None, lock.acquire)
+        try:
+            stored = await loop.run_in_executor(None, self.store.get, self.store_key)
+            if stored is not None and stored.value == value:
+                await loop.run_in_executor(None, self.store.delete, self.store_key)
+        finally:
+            lock.release()
+
+    async def _refresh(self, stale: Token, margin: float = 0) -> Token:
+        # The lock is created lazily so that it binds to the running event loop.
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+
+        async with self._lock:
+            if TokenManager._usable(self.token, stale, margin):
+                return self.token
+            self.token = await self._fetch_shared(stale, margin) if self.store is not None else await self._fetch()
+            return self.token
+
+    async def _fetch_shared(self, stale: Token, margin: float) -> Token:
+        loop = asyncio.get_running_loop()
+        stored = await loop.run_in_executor(None, self.store.get, self.store_key)
+        if TokenManager._usable(stored, stale, margin):
+            return stored
+
+        lock = self.store.lock(self.store_key)
+        await loop.run_in_executor(None, lock.acquire)
+        try:
+            stored = await loop.run_in_executor(None, self.store.get, self.store_key)
+            if TokenManager._usable(stored, stale, margin):
+                return stored
+            token = await self._fetch()
+            await loop.run_in_executor(None, self.store.set, self.store_key, token)
+            return token
+        finally:
+            lock.release()
+
+    def _refresh_in_background(self):
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.ensure_future(self._background_refresh())
+
+    async def _background_refresh(self):
+        try:
+            await self._refresh(self.token, self.refresh_margin)
+        except Exception:
+            pass
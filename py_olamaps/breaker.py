@@ -0,0 +1,218 @@
+import collections
+import threading
+import time
+from enum import Enum
+from typing import Callable
+
+from py_olamaps.exceptions import CircuitOpenError
+from py_olamaps.retry import DEFAULT_RETRY_EXCEPTIONS
+
+DEFAULT_FAILURE_STATUSES = tuple(range(500, 600))
+
+
+class CircuitState(Enum):
+    Closed = "closed"
+    Open = "open"
+    Half_Open = "half_open"
+
+
+class _Circuit:
+    def __init__(self, family: type):
+        self.family = family
+        self.state = CircuitState.Closed
+        self.consecutive_failures = 0
+        self.outcomes = collections.deque()
+        self.window_failures = 0
+        self.opened_at = None
+        self.probes = []
+        self.times_opened = 0
+        self.rejected = 0
+        self.lock = threading.Lock()
+
+
+class CircuitBreaker:
+    def __init__(self,
+                 consecutive_failures: int = 5,
+                 error_rate: float = 0.5,
+                 minimum_requests: int = 20,
+                 window: float = 30.0,
+                 recovery_timeout: float = 30.0,
+                 half_open_max_calls: int = 1,
+                 failure_statuses: tuple = DEFAULT_FAILURE_STATUSES,
+                 failure_exceptions: tuple = DEFAULT_RETRY_EXCEPTIONS,
+                 on_state_change: Callable = None):
+        """
+        Description: One circuit per endpoint family (the endpoint enum class). A circuit opens after
+        `consecutive_failures` failures in a row, or once at least `minimum_requests` requests in the last `window`
+        seconds failed at `error_rate` or more. While open, requests to the family fail at once with
+        `CircuitOpenError` instead of waiting on a failing upstream. After `recovery_timeout` seconds the circuit lets
+        `half_open_max_calls` trial requests through: a success closes it, a failure opens it again. Thread-safe and
+        usable from sync and async clients.
+
+        :param consecutive_failures: integer
+        Description: Failures in a row that open the circuit.
+        Default value: 5
+
+        :param error_rate: float
+        Description: Failure ratio over `window` that opens the circuit.
+        Default value: 0.5
+
+        :param minimum_requests: integer
+        Description: Requests needed in `window` before `error_rate` is considered.
+        Default value: 20
+
+        :param window: float
+        Description: Length in seconds of the sliding window the error rate is computed over.
+        Default value: 30.0
+
+        :param recovery_timeout: float
+        Description: Seconds a circuit stays open before trial requests are let through.
+        Default value: 30.0
+
+        :param half_open_max_calls: integer
+        Description: Trial requests allowed at the same time while half-open.
+        Default value: 1
+
+        :param failure_statuses: tuple
+        Description: HTTP status codes that count as failures.
+        Default value: 500-599
+
+        :param failure_exceptions: tuple
+        Description: Transport exception types that count as failures.
+        Default value: connection errors and timeouts of requests and httpx
+
+        :param on_state_change: callable
+        Description: Called as `on_state_change(family, old_state, new_state)` whenever a circuit changes state, e.g.
+        to export metrics or log incidents.
+        Default value: None
+        """
+        self.consecutive_failures = consecutive_failures
+        self.error_rate = error_rate
+        self.minimum_requests = minimum_requests
+        self.window = window
+        self.recovery_timeout = recovery_timeout
+        self.half_open_max_calls = half_open_max_calls
+        self.failure_statuses = tuple(failure_statuses)
+        self.failure_exceptions = tuple(failure_exceptions)
+        self.on_state_change = on_state_change
+        self._circuits = {}
+        self._lock = threading.Lock()
+
+    def _circuit(self, endpoint: Enum) -> _Circuit:
+        family = type(endpoint)
+        circuit = self._circuits.get(family)
+        if circuit is None:
+            with self._lock:
+                circuit = self._circuits.setdefault(family, _Circuit(family))
+        return circuit
+
+    def _transition(self, circuit: _Circuit, state: CircuitState, now: float):
+        old_state = circuit.state
+        circuit.state = state
+        if state == CircuitState.Open:
+            circuit.opened_at = now
+            circuit.times_opened += 1
+            circuit.probes = []
+        elif state == CircuitState.Closed:
+            circuit.consecutive_failures = 0
+            circuit.outcomes.clear()
+            circuit.window_failures = 0
+            circuit.probes = []
+        return old_state
+
+    def _notify(self, circuit: _Circuit, old_state: CircuitState):
+        if self.on_state_change is not None and old_state != circuit.state:
+            self.on_state_change(circuit.family, old_state, circuit.state)
+
+    def before(self, endpoint: Enum):
+        """
+        Description: Admits a request to `endpoint` or raises `CircuitOpenError` if its circuit is open.
+        """
+        circuit = self._circuit(endpoint)
+        old_state = None
+        with circuit.lock:
+            now = time.monotonic()
+            if circuit.state == CircuitState.Open:
+                if now - circuit.opened_at < self.recovery_timeout:
+                    circuit.rejected += 1
+                    raise CircuitOpenError(circuit.family.__name__,
+                                           self.recovery_timeout - (now - circuit.opened_at))
+                old_state = self._transition(circuit, CircuitState.Half_Open, now)
+
+            if circuit.state == CircuitState.Half_Open:
+                # Probes that never reported back (e.g. cancelled) stop counting after recovery_timeout.
+                circuit.probes = [started_at for started_at in circuit.probes
+                                  if now - started_at < self.recovery_timeout]
+                if len(circuit.probes) >= self.half_open_max_calls:
+                    circuit.rejected += 1
+                    raise CircuitOpenError(circuit.family.__name__, 0.0)
+                circuit.probes.append(now)
+        if old_state is not None:
+            self._notify(circuit, old_state)
+
+    def after(self, endpoint: Enum, response=None, error: Exception = None):
+        """
+        Description: Records the outcome of a request admitted by `before`. Errors that are not transport failures
+        (e.g. bugs in the caller) count neither as success nor as failure.
+        """
+        if error is not None and not isinstance(error, self.failure_exceptions):
+            self._release(endpoint)
+            return
+        failed = error is not None or response.status_code in self.failure_statuses
+
+        circuit = self._circuit(endpoint)
+        old_state = None
+        with circuit.lock:
+            now = time.monotonic()
+            if circuit.state == CircuitState.Half_Open:
+                old_state = self._transition(circuit, CircuitState.Open if failed else CircuitState.Closed, now)
+            elif circuit.state == CircuitState.Closed:
+                circuit.outcomes.append((now, failed))
+                circuit.window_failures += failed
+                while circuit.outcomes and circuit.outcomes[0][0] <= now - self.window:
+                    circuit.window_failures -= circuit.outcomes.popleft()[1]
+                circuit.consecutive_failures = circuit.consecutive_failures + 1 if failed else 0
+
+                requests = len(circuit.outcomes)
+                if failed and (circuit.consecutive_failures >= self.consecutive_failures or (
+                        requests >= self.minimum_requests and
+                        circuit.window_failures / requests >= self.error_rate)):
+                    old_state = self._transition(circuit, CircuitState.Open, now)
+        if old_state is not None:
+            self._notify(circuit, old_state)
+
+    def _release(self, endpoint: Enum):
+        circuit = self._circuit(endpoint)
+        with circuit.lock:
+            if circuit.probes:
+                circuit.probes.pop()
+
+    def state(self, endpoint: Enum) -> CircuitState:
+        return self._circuit(endpoint).state
+
+    def reset(self):
+        with self._lock:
+            self._circuits.clear()
+
+    def metrics(self) -> dict:
+        """
+        Description: Snapshot of every circuit, keyed by endpoint family name.
+
+        :return: dict
+        Example: {"RoutingApi": {"state": "open", "consecutive_failures": 5, "window_requests": 12,
+        "window_failures": 7, "error_rate": 0.58, "times_opened": 1, "rejected": 340}}
+        """
+        metrics = dict()
+        for family, circuit in list(self._circuits.items()):
+            with circuit.lock:
+                requests = len(circuit.outcomes)
+                metrics[family.__name__] = {
+                    "state": circuit.state.value,
+                    "consecutive_failures": circuit.consecutive_failures,
+                    "window_requests": requests,
+                    "window_failures": circuit.window_failures,
+                    "error_rate": circuit.window_failures / requests if requests else 0.0,
+                    "times_opened": circuit.times_opened,
+                    "rejected": circuit.rejected,
+                }
+        return metrics
@@ -0,0 +1,322 @@
+import collections
+import json
+import os
+import sqlite3
+import threading
+import time
+from enum import Enum
+from urllib.parse import urlencode
+
+from py_olamaps.utils.CommonEnums import GeocodeApi
+from py_olamaps.utils.coordinates import geohash_cell_diagonal, geohash_encode, parse_lat_lng
+
+DEFAULT_TTL = 300
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_DISK_MAX_ENTRIES = 1000000
+
+
+class CacheBackend:
+    """
+    Storage interface of `ResponseCache`. Implement these methods to keep cached responses anywhere (Redis, a
+    database, ...). Values are JSON-compatible objects and keys are strings.
+    """
+
+    def get(self, key: str):
+        """
+        Return the value stored under `key`, or None if it is missing or expired.
+        """
+        raise NotImplementedError
+
+    def set(self, key: str, value, ttl: float):
+        """
+        Store `value` under `key` for `ttl` seconds.
+        """
+        raise NotImplementedError
+
+    def delete(self, key: str):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    def __init__(self,
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        """
+        Description: Thread-safe in-process backend holding at most `max_entries` values and evicting the least
+        recently used one when full.
+        """
+        self.max_entries = max_entries
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: float):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache(CacheBackend):
+    # Reads refresh an entry's access time at most this often, so cache hits rarely need a write.
+    _ACCESS_RESOLUTION = 60
+
+    def __init__(self,
+                 path: str,
+                 max_entries: int = DEFAULT_DISK_MAX_ENTRIES,
+                 compact_interval: int = 1000,
+                 timeout: float = 30.0):
+        """
+        Description: Persistent backend storing entries in a single SQLite file, so cached lookups survive restarts
+        and deploys. Several processes on the same host can share one file: the database runs in WAL mode, which lets
+        readers proceed while one writer commits, and each process and thread uses its own connection. Opening the
+        cache does not read the entries, so start-up time does not depend on its size.
+
+        :param path: string
+        Description: Path of the SQLite file. It is created if missing.
+        Example: /var/cache/olamaps/responses.sqlite
+
+        :param max_entries: integer
+        Description: Size cap. When exceeded, compaction drops expired entries and then the least recently used ones.
+        Default value: 1000000
+
+        :param compact_interval: integer
+        Description: Number of writes by this process between two compactions.
+        Default value: 1000
+
+        :param timeout: float
+        Description: Seconds to wait for a lock held by another process before failing.
+        Default value: 30.0
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.compact_interval = compact_interval
+        self.timeout = timeout
+        self._local = threading.local()
+        self._writes = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS entries ("
+                               "key TEXT PRIMARY KEY, value TEXT NOT NULL, "
+                               "expires_at REAL NOT NULL, accessed_at REAL NOT NULL)")
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_expires_at ON entries (expires_at)")
+            connection.execute("CREATE INDEX IF NOT EXISTS entries_accessed_at ON entries (accessed_at)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork or be shared between threads, so keep one per process and thread.
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA auto_vacuum = INCREMENTAL")
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    def get(self, key: str):
+        connection = self._connection()
+        row = connection.execute("SELECT value, expires_at, accessed_at FROM entries WHERE key = ?",
+                                 (key,)).fetchone()
+        if row is None:
+            return None
+
+        value, expires_at, accessed_at = row
+        now = time.time()
+        if expires_at <= now:
+            with connection:
+                connection.execute("DELETE FROM entries WHERE key = ? AND expires_at <= ?", (key, now))
+            return None
+        if now - accessed_at > self._ACCESS_RESOLUTION:
+            with connection:
+                connection.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        return json.loads(value)
+
+    def set(self, key: str, value, ttl: float):
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute("INSERT OR REPLACE INTO entries (key, value, expires_at, accessed_at) "
+                               "VALUES (?, ?, ?, ?)", (key, json.dumps(value), now + ttl, now))
+
+        with self._lock:
+            self._writes += 1
+            compact = self._writes % self.compact_interval == 0
+        if compact:
+            self.compact()
+
+    def delete(self, key: str):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM entries WHERE key = ?", (key,))
+
+    def clear(self):
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM entries")
+        connection.execute("PRAGMA incremental_vacuum")
+
+    def compact(self):
+        """
+        Description: Deletes expired entries, then trims the least recently used ones down to 90% of `max_entries`
+        if the cap is exceeded, and returns the freed pages to the file system.
+        """
+        connection = self._connection()
+        with connection:
+            connection.execute("DELETE FROM entries WHERE expires_at <= ?", (time.time(),))
+            (count,) = connection.execute("SELECT COUNT(*) FROM entries").fetchone()
+            if count > self.max_entries:
+                connection.execute("DELETE FROM entries WHERE key IN "
+                                   "(SELECT key FROM entries ORDER BY accessed_at LIMIT ?)",
+                                   (count - int(self.max_entries * 0.9),))
+        connection.execute("PRAGMA incremental_vacuum")
+
+    def __len__(self):
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM entries").fetchone()
+        return count
+
+
+class ResponseCache:
+    def __init__(self,
+                 backend: CacheBackend = None,
+                 ttl: float = DEFAULT_TTL,
+                 endpoint_ttls: dict = None,
+                 max_entries: int = DEFAULT_MAX_ENTRIES,
+                 reverse_geocode_precision: int = None):
+        """
+        Description: Caches the JSON responses of the client's GET endpoints. Entries are keyed by the endpoint path
+        and its sorted query parameters; the api_key and the Authorization header are never part of the key, so clients
+        with different credentials share entries. Cached results are shared between callers and must not be mutated.
+
+        :param backend: CacheBackend
+        Description: Where entries are stored.
+        Default value: MemoryCache(max_entries)
+
+        :param ttl: float
+        Description: Seconds an entry stays valid for endpoints without an entry in `endpoint_ttls`.
+        Default value: 300
+
+        :param endpoint_ttls: dict
+        Description: Per-endpoint TTLs keyed by endpoint enum member. A TTL of 0 disables caching for that endpoint.
+        Example: {GeocodeApi.Reverse_Geocode_Endpoint: 86400, PlacesApi.Autocomplete_Endpoint: 0}
+        Default value: None
+
+        :param max_entries: integer
+        Description: Size bound of the default in-memory backend.
+        Default value: 1024
+
+        :param reverse_geocode_precision: integer
+        Description: Opt-in spatial mode for `Geocode.reverse_geocode`. When set, coordinates are quantized to a geohash
+        of this many characters and every point of a cell is served the answer cached for that cell, trading up to
+        `max_position_error` meters of accuracy for far fewer API calls. Precision 8 gives cells of about 38 x 19 m,
+        precision 9 about 5 x 5 m.
+        Example: 8
+        Default value: None
+        """
+        self.backend = backend if backend is not None else MemoryCache(max_entries)
+        self.ttl = ttl
+        self.endpoint_ttls = dict(endpoint_ttls or {})
+        self.reverse_geocode_precision = reverse_geocode_precision
+        self.hits = 0
+        self.misses = 0
+        self.spatial_hits = 0
+        self.spatial_misses = 0
+        self._lock = threading.Lock()
+
+    def ttl_for(self, endpoint: Enum) -> float:
+        return self.endpoint_ttls.get(endpoint, self.ttl)
+
+    def _is_spatial(self, endpoint: Enum) -> bool:
+        return self.reverse_geocode_precision is not None and endpoint == GeocodeApi.Reverse_Geocode_Endpoint
+
+    def key(self, method: str, endpoint: Enum, path: str, query_params: dict) -> str:
+        if self._is_spatial(endpoint) and "latlng" in query_params:
+            try:
+                latitude, longitude = parse_lat_lng(query_params["latlng"])
+            except (TypeError, ValueError):
+                latitude = longitude = None
+            # A malformed or out of range latlng is left to the API to reject, cached under its exact parameters.
+            if latitude is not None and -90 <= latitude <= 90 and -180 <= longitude <= 180:
+                query_params = dict(query_params)
+                del query_params["latlng"]
+                query_params["geohash"] = geohash_encode(latitude, longitude, self.reverse_geocode_precision)
+        return f"{method} {path}?{urlencode(sorted(query_params.items()), doseq=True)}"
+
+    def get(self, key: str, endpoint: Enum = None):
+        value = self.backend.get(key)
+        spatial = self._is_spatial(endpoint)
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                self.spatial_misses += spatial
+            else:
+                self.hits += 1
+                self.spatial_hits += spatial
+        return value
+
+    def set(self, key: str, value, endpoint: Enum = None):
+        ttl = self.ttl_for(endpoint)
+        if ttl and ttl > 0:
+            self.backend.set(key, value, ttl)
+
+    def clear(self):
+        self.backend.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    @property
+    def spatial_hit_ratio(self) -> float:
+        lookups = self.spatial_hits + self.spatial_misses
+        return self.spatial_hits / lookups if lookups else 0.0
+
+    @property
+    def max_position_error(self) -> float:
+        """
+        Description: Worst-case distance in meters between a reverse geocoded point and the point its cached answer
+        was fetched for, i.e. the diagonal of a geohash cell. 0.0 when the spatial mode is off.
+        """
+        if self.reverse_geocode_precision is None:
+            return 0.0
+        return geohash_cell_diagonal(self.reverse_geocode_precision)
+
+    def stats(self) -> dict:
+        stats = {"hits": self.hits, "misses": self.misses, "hit_ratio": self.hit_ratio}
+        if self.reverse_geocode_precision is not None:
+            stats["spatial_hits"] = self.spatial_hits
+            stats["spatial_misses"] = self.spatial_misses
+            stats["spatial_hit_ratio"] = self.spatial_hit_ratio
+            stats["max_position_error"] = self.max_position_error
+        return stats
@@ -11,3 +11,10 @@ class APIException(Exception):
 
 class OlaMapsError(Exception):
     pass
+
+
+class CircuitOpenError(OlaMapsError):
+    def __init__(self, family, retry_after):
+        super().__init__(f"Circuit for {family} is open; requests fail fast for another {retry_after:.1f}s")
+        self.family = family
+        self.retry_after = retry_after
@@ -0,0 +1,251 @@
+import asyncio
+import collections
+import concurrent.futures
+import math
+import threading
+import time
+from enum import Enum
+from typing import Callable
+
+from py_olamaps.retry import RetryBudget
+
+
+class HedgePolicy:
+    def __init__(self,
+                 endpoints: tuple,
+                 delay: float = None,
+                 percentile: float = None,
+                 min_samples: int = 20,
+                 sample_size: int = 1000,
+                 max_hedge_ratio: float = 0.05,
+                 window: float = 10.0,
+                 max_workers: int = 32):
+        """
+        Description: Opt-in hedging for latency-critical, idempotent endpoints. If a request has not answered after
+        the hedge delay, an identical request is sent; the first successful response wins and the other request is
+        cancelled (async client) or abandoned and its response closed (sync client). An error status such as 429 or
+        5xx only wins once neither request can succeed any more. The delay is either fixed or a percentile
+        of the endpoint's recent latencies, so that only the slowest requests are hedged.
+
+        :param endpoints: tuple
+        Description: Endpoint enum members to hedge. Only list endpoints whose requests are safe to send twice.
+        Example: (RoutingApi.Directions_Endpoint, PlacesApi.Autocomplete_Endpoint)
+
+        :param delay: float
+        Description: Seconds to wait before hedging. With `percentile` it is used until `min_samples` latencies have
+        been observed.
+        Example: 0.3
+        Default value: None
+
+        :param percentile: float
+        Description: Hedge requests slower than this percentile of the endpoint's recent latencies.
+        Example: 95
+        Default value: None
+
+        :param min_samples: integer
+        Description: Latencies needed before `percentile` is used.
+        Default value: 20
+
+        :param sample_size: integer
+        Description: Recent latencies kept per endpoint.
+        Default value: 1000
+
+        :param max_hedge_ratio: float
+        Description: Hedges allowed per hedgeable request over the last `window` seconds, which bounds the extra
+        quota hedging uses.
+        Default value: 0.05
+
+        :param window: float
+        Description: Length in seconds of the sliding window `max_hedge_ratio` applies to.
+        Default value: 10.0
+
+        :param max_workers: integer
+        Description: Threads the sync client uses to send hedge copies. Primaries never wait for a free worker.
+        Default value: 32
+        """
+        if delay is None and percentile is None:
+            raise ValueError("Either delay or percentile is required")
+        self.endpoints = frozenset(endpoints)
+        self.delay = delay
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.sample_size = sample_size
+        self.max_workers = max_workers
+        # A hedge is an extra request just like a retry, so the same sliding-window budget bounds both.
+        self.budget = RetryBudget(ratio=max_hedge_ratio, min_retries_per_second=0.0, window=window)
+        self.hedged = 0
+        self.hedge_wins = 0
+        self._latencies = collections.defaultdict(lambda: collections.deque(maxlen=self.sample_size))
+        self._lock = threading.Lock()
+
+    def delay_for(self, endpoint: Enum) -> float:
+        """
+        Description: Seconds to wait before hedging a request to `endpoint`, or None while it cannot be computed yet.
+        """
+        if self.percentile is not None:
+            with self._lock:
+                latencies = sorted(self._latencies[endpoint])
+            if len(latencies) >= self.min_samples:
+                rank = max(0, math.ceil(self.percentile / 100 * len(latencies)) - 1)
+                return latencies[rank]
+        return self.delay
+
+    def record(self, endpoint: Enum, latency: float):
+        with self._lock:
+            self._latencies[endpoint].append(latency)
+
+    def _record_hedge(self, won: bool):
+        with self._lock:
+            self.hedged += 1
+            self.hedge_wins += won
+
+    def stats(self) -> dict:
+        return {"hedged": self.hedged, "hedge_wins": self.hedge_wins}
+
+
+def _timed(policy: HedgePolicy, endpoint: Enum, send: Callable):
+    started_at = time.monotonic()
+    response = send()
+    policy.record(endpoint, time.monotonic() - started_at)
+    return response
+
+
+def _succeeded(response) -> bool:
+    return response.status_code < 400
+
+
+def _close(future: concurrent.futures.Future):
+    if not future.cancelled() and future.exception() is None:
+        future.result().close()
+
+
+def _discard(future: concurrent.futures.Future):
+    # A request already running in a thread cannot be interrupted; release its connection once it completes.
+    if not future.cancel():
+        future.add_done_callback(_close)
+
+
+def _start_thread(function: Callable, *args) -> concurrent.futures.Future:
+    # Runs the primary on a thread of its own, so that it never queues behind other requests for a pool worker.
+    future = concurrent.futures.Future()
+
+    def run():
+        future.set_running_or_notify_cancel()
+        try:
+            future.set_result(function(*args))
+        except BaseException as error:
+            future.set_exception(error)
+
+    threading.Thread(target=run, name="py_olamaps-hedge-primary", daemon=True).start()
+    return future
+
+
+def _pick(responses: list):
+    """
+    Description: Returns the first successful `(attempt, response)` of `responses`, or None.
+    """
+    return next((outcome for outcome in responses if _succeeded(outcome[1])), None)
+
+
+def send_hedged(executor: concurrent.futures.Executor,
+                policy: HedgePolicy,
+                endpoint: Enum,
+                send: Callable,
+                allow_extra: Callable):
+    """
+    Description: Calls `send()` and hedges it according to `policy`; `executor` only runs the hedge copies.
+    `allow_extra()` is asked before sending the hedge (e.g. to take a rate limit token without waiting) and can veto
+    it.
+    """
+    policy.budget.record_request()
+    delay = policy.delay_for(endpoint)
+    if delay is None:
+        return _timed(policy, endpoint, send)
+
+    primary = _start_thread(_timed, policy, endpoint, send)
+    done, _ = concurrent.futures.wait([primary], timeout=delay)
+    if done or not allow_extra() or not policy.budget.try_spend():
+        return primary.result()
+
+    hedge = executor.submit(_timed, policy, endpoint, send)
+    pending = {primary, hedge}
+    responses = []
+    error = None
+    winner = None
+    while pending and winner is None:
+        done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+        for future in sorted(done, key=lambda attempt: attempt is hedge):
+            if future.exception() is None:
+                responses.append((future, future.result()))
+            else:
+                error = error or future.exception()
+        winner = _pick(responses)
+
+    for future in pending:
+        _discard(future)
+    if winner is None and responses:
+        winner = responses[0]
+    for _, response in responses:
+        if winner is None or response is not winner[1]:
+            response.close()
+    if winner is None:
+        policy._record_hedge(False)
+        raise error
+    policy._record_hedge(winner[0] is hedge)
+    return winner[1]
+
+
+async def asend_hedged(policy: HedgePolicy,
+                       endpoint: Enum,
+                       send: Callable,
+                       allow_extra: Callable):
+    """
+    Description: Async variant of `send_hedged`. `send` is a coroutine function; the losing request is cancelled.
+    """
+
+    async def timed():
+        started_at = time.monotonic()
+        response = await send()
+        policy.record(endpoint, time.monotonic() - started_at)
+        return response
+
+    policy.budget.record_request()
+    primary = asyncio.ensure_future(timed())
+    hedge = None
+    delay = policy.delay_for(endpoint)
+    try:
+        if delay is None:
+            return await asyncio.shield(primary)
+
+        done, _ = await asyncio.wait([primary], timeout=delay)
+        if done or not allow_extra() or not policy.budget.try_spend():
+            return await asyncio.shield(primary)
+
+        hedge = asyncio.ensure_future(timed())
+        pending = {primary, hedge}
+        responses = []
+        error = None
+        winner = None
+        while pending and winner is None:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=lambda attempt: attempt is hedge):
+                if task.exception() is None:
+                    responses.append((task, task.result()))
+                else:
+                    error = error or task.exception()
+            winner = _pick(responses)
+
+        if winner is None and responses:
+            winner = responses[0]
+        for _, response in responses:
+            if winner is None or response is not winner[1]:
+                await response.aclose()
+        if winner is None:
+            policy._record_hedge(False)
+            raise error
+        policy._record_hedge(winner[0] is hedge)
+        return winner[1]
+    finally:
+        for task in (primary, hedge):
+            if task is not None and not task.done():
+                task.cancel()
@@ -0,0 +1,292 @@
+import collections
+import hashlib
+import mmap
+import os
+import tempfile
+import threading
+import time
+from urllib.parse import urlencode
+
+DEFAULT_MAX_MEMORY_BYTES = 64 * 1024 * 1024
+DEFAULT_MAX_DISK_BYTES = 1024 * 1024 * 1024
+
+
+class _MemoryTier:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._entries = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> bytes:
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+            return data
+
+    def set(self, key: str, data: bytes):
+        # Images larger than the whole tier are left to the disk tier instead of flushing everything else out.
+        if len(data) > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= len(previous)
+            self._entries[key] = data
+            self.size += len(data)
+            while self.size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self.size -= len(evicted)
+
+    def delete(self, key: str):
+        with self._lock:
+            data = self._entries.pop(key, None)
+            if data is not None:
+                self.size -= len(data)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class _DiskTier:
+    # Reads refresh a file's modification time, which orders eviction, at most this often.
+    _ACCESS_RESOLUTION = 60
+
+    def __init__(self, directory: str, max_bytes: int, compact_interval: int):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.compact_interval = compact_interval
+        self._writes = 0
+        self._lock = threading.Lock()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], key)
+
+    def get(self, key: str) -> memoryview:
+        path = self.path(key)
+        try:
+            with open(path, "rb") as file:
+                stat = os.fstat(file.fileno())
+                # A zero-length file cannot be mapped.
+                view = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else b"")
+        except FileNotFoundError:
+            return None
+
+        now = time.time()
+        if now - stat.st_mtime > self._ACCESS_RESOLUTION:
+            try:
+                os.utime(path, (now, now))
+            except OSError:
+                pass
+        return view
+
+    def set(self, key: str, data: bytes):
+        writer = self.writer(key)
+        try:
+            writer.write(data)
+        except BaseException:
+            writer.abort()
+            raise
+        writer.commit()
+
+    def writer(self, key: str) -> "_DiskWriter":
+        return _DiskWriter(self, key)
+
+    def _written(self):
+        with self._lock:
+            self._writes += 1
+            compact = self._writes % self.compact_interval == 0
+        if compact:
+            self.compact()
+
+    def delete(self, key: str):
+        try:
+            os.unlink(self.path(key))
+        except FileNotFoundError:
+            pass
+
+    def _files(self) -> list:
+        files = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_dir():
+                continue
+            for file in os.scandir(entry.path):
+                if file.is_file() and not file.name.endswith(".part"):
+                    try:
+                        stat = file.stat()
+                    except FileNotFoundError:
+                        continue
+                    files.append((stat.st_mtime, stat.st_size, file.path))
+        return files
+
+    def compact(self):
+        files = self._files()
+        size = sum(file_size for _, file_size, _ in files)
+        if size <= self.max_bytes:
+            return
+        target = int(self.max_bytes * 0.9)
+        for _, file_size, path in sorted(files):
+            if size <= target:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            size -= file_size
+
+    def clear(self):
+        for _, _, path in self._files():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+    @property
+    def size(self) -> int:
+        return sum(file_size for _, file_size, _ in self._files())
+
+
+class _DiskWriter:
+    # Streams one image into the disk tier. It is written next to the target and renamed into place, so readers never
+    # map a partial image. The temporary file is only created by the first write, so a download that fails before its
+    # body arrives leaves nothing behind.
+    def __init__(self, tier: _DiskTier, key: str):
+        self.tier = tier
+        self.path = tier.path(key)
+        self.file = None
+        self.temporary_path = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        os.makedirs(directory, exist_ok=True)
+        descriptor, self.temporary_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        self.file = os.fdopen(descriptor, "wb")
+
+    def write(self, chunk: bytes):
+        if self.file is None:
+            self._open()
+        self.file.write(chunk)
+
+    def commit(self):
+        if self.file is None:
+            self._open()
+        self.file.close()
+        os.replace(self.temporary_path, self.path)
+        self.tier._written()
+
+    def abort(self):
+        if self.file is None:
+            return
+        self.file.close()
+        os.unlink(self.temporary_path)
+
+
+class ImageCache:
+    def __init__(self,
+                 max_memory_bytes: int = DEFAULT_MAX_MEMORY_BYTES,
+                 directory: str = None,
+                 max_disk_bytes: int = DEFAULT_MAX_DISK_BYTES,
+                 compact_interval: int = 100):
+        """
+        Description: Content-addressed cache of static map images. Entries are keyed by a SHA-256 of the endpoint path
+        and all of its sorted query parameters, so any two requests for the same style, area, size, format, markers
+        and path share one entry whatever the order of their arguments; the api_key and request ids are never part of
+        the key. Images are kept in an in-process memory tier and, when `directory` is set, in a disk tier shared by
+        every process using the same directory. Both tiers are bounded in bytes and evict the least recently used
+        images first. Cached images are returned as read-only `memoryview`s without copying: memory hits view the
+        cached bytes, disk hits view an mmap of the file, which the OS page cache keeps in RAM while it is hot.
+        Streamed downloads are written to the disk tier chunk by chunk alongside their destination.
+
+        :param max_memory_bytes: integer
+        Description: Size cap of the memory tier. Images larger than this are only stored on disk. 0 disables the tier.
+        Default value: 67108864 (64 MiB)
+
+        :param directory: string
+        Description: Directory of the disk tier. It is created if missing. None keeps images in memory only.
+        Example: /var/cache/olamaps/static-maps
+        Default value: None
+
+        :param max_disk_bytes: integer
+        Description: Size cap of the disk tier. When exceeded, compaction deletes the least recently used images down
+        to 90% of it.
+        Default value: 1073741824 (1 GiB)
+
+        :param compact_interval: integer
+        Description: Number of images written to disk by this process between two compactions.
+        Default value: 100
+        """
+        self.memory = _MemoryTier(max_memory_bytes)
+        self.disk = _DiskTier(directory, max_disk_bytes, compact_interval) if directory is not None else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str, query_params: dict) -> str:
+        canonical = f"{path}?{urlencode(sorted(query_params.items()), doseq=True)}"
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> memoryview:
+        """
+        Description: Returns a read-only view of the image stored under `key`, or None if neither tier holds it.
+        """
+        data = self.memory.get(key)
+        if data is not None:
+            with self._lock:
+                self.memory_hits += 1
+            return memoryview(data)
+
+        view = self.disk.get(key) if self.disk is not None else None
+        with self._lock:
+            if view is None:
+                self.misses += 1
+            else:
+                self.disk_hits += 1
+        return view
+
+    def set(self, key: str, data: bytes) -> memoryview:
+        """
+        Description: Stores `data` in both tiers and returns a read-only view of it.
+        """
+        data = bytes(data)
+        self.memory.set(key, data)
+        if self.disk is not None:
+            self.disk.set(key, data)
+        return memoryview(data)
+
+    def writer(self, key: str):
+        """
+        Description: Returns a sink that streams an image into the disk tier under `key` as it is downloaded, or None
+        without a disk tier. Call `write` for each chunk, then `commit`, or `abort` if the download fails.
+        """
+        return self.disk.writer(key) if self.disk is not None else None
+
+    def delete(self, key: str):
+        self.memory.delete(key)
+        if self.disk is not None:
+            self.disk.delete(key)
+
+    def clear(self):
+        self.memory.clear()
+        if self.disk is not None:
+            self.disk.clear()
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+    def stats(self) -> dict:
+        stats = {"memory_hits": self.memory_hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                 "hit_ratio": self.hit_ratio, "memory_entries": len(self.memory), "memory_bytes": self.memory.size}
+        if self.disk is not None:
+            stats["disk_bytes"] = self.disk.size
+        return stats
@@ -0,0 +1,102 @@
+import threading
+import time
+from typing import Any, NamedTuple
+from urllib.parse import urlencode
+
+from py_olamaps.utils.CommonEnums import MapTilesApi
+
+DEFAULT_REVALIDATE_AFTER = 300
+
+METADATA_ENDPOINTS = (MapTilesApi.Get_Array_Of_Data_Endpoint, MapTilesApi.Get_Map_Endpoint,
+                      MapTilesApi.Get_Style_Endpoint)
+
+
+class MetadataEntry(NamedTuple):
+    """
+    A memoized metadata document with the validators the API sent along with it. `validated_at` is a
+    `time.monotonic()` timestamp of when it was last known to be current.
+    """
+    value: Any
+    etag: str
+    last_modified: str
+    validated_at: float
+
+
+class MetadataCache:
+    def __init__(self,
+                 revalidate_after: float = DEFAULT_REVALIDATE_AFTER,
+                 endpoints: tuple = METADATA_ENDPOINTS):
+        """
+        Description: Memoizes the large, rarely changing map metadata documents (TileJSON, the style list and style
+        documents) for the life of the client. The first call fetches a document; every later call returns the same
+        parsed copy right away. Once a copy is older than `revalidate_after` seconds, the next call still returns it
+        and revalidates it in the background with `If-None-Match` / `If-Modified-Since`, so an unchanged document
+        costs a 304 round trip and is never downloaded or parsed again. A failed revalidation keeps the current copy
+        and is retried `revalidate_after` seconds later. Copies are shared between callers and must not be mutated.
+
+        :param revalidate_after: float
+        Description: Seconds after which a copy is revalidated on its next use.
+        Default value: 300
+
+        :param endpoints: tuple
+        Description: Endpoint enum members whose responses are memoized.
+        Default value: (MapTilesApi.Get_Array_Of_Data_Endpoint, MapTilesApi.Get_Map_Endpoint,
+        MapTilesApi.Get_Style_Endpoint)
+        """
+        self.revalidate_after = revalidate_after
+        self.endpoints = frozenset(endpoints)
+        self.hits = 0
+        self.misses = 0
+        self.revalidations = 0
+        self.not_modified = 0
+        self._entries = {}
+        self._revalidating = set()
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(path: str, query_params: dict) -> str:
+        return f"{path}?{urlencode(sorted(query_params.items()), doseq=True)}"
+
+    def get(self, key: str) -> MetadataEntry:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return entry
+
+    def set(self, key: str, entry: MetadataEntry):
+        with self._lock:
+            self._entries[key] = entry
+
+    def begin_revalidation(self, key: str, entry: MetadataEntry) -> bool:
+        """
+        Description: Returns True if `entry` is due for revalidation and no revalidation of `key` is running yet, in
+        which case the caller must revalidate it and then call `end_revalidation`.
+        """
+        if time.monotonic() - entry.validated_at < self.revalidate_after:
+            return False
+        with self._lock:
+            if key in self._revalidating:
+                return False
+            self._revalidating.add(key)
+            self.revalidations += 1
+            return True
+
+    def end_revalidation(self, key: str, entry: MetadataEntry):
+        with self._lock:
+            self._entries[key] = entry
+            self._revalidating.discard(key)
+
+    def record_not_modified(self):
+        with self._lock:
+            self.not_modified += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses, "revalidations": self.revalidations,
+                "not_modified": self.not_modified}
@@ -0,0 +1,100 @@
+import threading
+import time
+from enum import Enum
+
+
+class TokenBucket:
+    def __init__(self,
+                 rate: float,
+                 capacity: float = None):
+        """
+        Description: Token bucket refilled with `rate` tokens per second up to `capacity`. Callers reserve a token and
+        are told how long to wait for it, so waiting callers are served in arrival order at exactly `rate` per second
+        instead of polling. One bucket can be shared by threads and event loops alike.
+
+        :param rate: float
+        Description: Sustained requests per second.
+        Example: 10
+
+        :param capacity: float
+        Description: Largest burst allowed after an idle period.
+        Default value: max(1, rate)
+        """
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else max(1.0, rate)
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, tokens: float = 1) -> float:
+        """
+        Description: Takes `tokens` from the bucket, borrowing against future refills if needed, and returns how many
+        seconds the caller must wait before using them.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            self._tokens -= tokens
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def try_take(self, tokens: float = 1) -> bool:
+        """
+        Description: Takes `tokens` only if they are available right now, without borrowing against future refills.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+            self._updated_at = now
+            if self._tokens < tokens:
+                return False
+            self._tokens -= tokens
+            return True
+
+
+class RateLimiter:
+    def __init__(self,
+                 limits: dict,
+                 default: float = None):
+        """
+        Description: Client-side rate limits per endpoint family, so that bursts from many threads or tasks queue up
+        smoothly instead of being rejected with 429. Share one limiter between clients to make them share the quota.
+
+        :param limits: dict
+        Description: Limits keyed by endpoint family (the endpoint enum class). Values are requests per second or a
+        `TokenBucket` for a custom burst size.
+        Example: {RoutingApi: 5, PlacesApi: 20, GeocodeApi: TokenBucket(50, capacity=100), RoadsApi: 10, MapTilesApi: 50}
+
+        :param default: float
+        Description: Requests per second for every family missing from `limits`. None leaves them unlimited.
+        Default value: None
+        """
+        self.buckets = {family: limit if isinstance(limit, TokenBucket) else TokenBucket(limit)
+                        for family, limit in limits.items()}
+        self.default = default
+        self._lock = threading.Lock()
+
+    def bucket(self, endpoint: Enum) -> TokenBucket:
+        family = type(endpoint)
+        bucket = self.buckets.get(family)
+        if bucket is None and self.default is not None:
+            with self._lock:
+                bucket = self.buckets.setdefault(family, TokenBucket(self.default))
+        return bucket
+
+    def reserve(self, endpoint: Enum) -> float:
+        """
+        Description: Reserves one request to `endpoint` and returns the seconds to wait before sending it.
+        """
+        bucket = self.bucket(endpoint)
+        return bucket.reserve() if bucket is not None else 0.0
+
+    def try_reserve(self, endpoint: Enum) -> bool:
+        """
+        Description: Reserves one request to `endpoint` only if it can be sent right away, e.g. for optional extra
+        requests such as hedges.
+        """
+        bucket = self.bucket(endpoint)
+        return bucket.try_take() if bucket is not None else True
@@ -1,13 +1,18 @@
-from .geocode import Geocode
-from .map_tiles import MapTiles
-from .places import Places
-from .roads import Roads
-from .routing import Routing
+from .geocode import AsyncGeocode, Geocode
+from .map_tiles import AsyncMapTiles, MapTiles
+from .places import AsyncPlaces, Places
+from .roads import AsyncRoads, Roads
+from .routing import AsyncRouting, Routing
 
 __all__ = [
     "Routing",
     "Places",
     "MapTiles",
     "Roads",
-    "Geocode"
+    "Geocode",
+    "AsyncRouting",
+    "AsyncPlaces",
+    "AsyncMapTiles",
+    "AsyncRoads",
+    "AsyncGeocode"
 ]
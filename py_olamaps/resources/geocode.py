@@ -1,16 +1,17 @@
-from http import HTTPStatus
+from typing import AsyncIterator, Iterable, Iterator
 
-import requests
-
-from py_olamaps.exceptions import APIException
-from py_olamaps.utils.CommonEnums import Api, GeocodeApi
+from py_olamaps.utils.CommonEnums import GeocodeApi
+from py_olamaps.utils.address import normalize_address
+from py_olamaps.utils.batch import (DEFAULT_ASYNC_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY, BatchResult,
+                                    DeduplicatedBatch, arun_batch, arun_deduplicated_batch, run_batch,
+                                    run_deduplicated_batch)
+from py_olamaps.utils.coordinates import format_lat_lng
 
 
 class Geocode:
     def __init__(self,
                  client):
-        self._api_key = client.api_key
-        self._access_token = client.access_token
+        self._client = client
 
     def forward_geocode(self,
                         address: str,
@@ -49,11 +50,6 @@ class Geocode:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["address"] = address
 
         if language is not None:
@@ -68,29 +64,49 @@ class Geocode:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        geocode_api_url = Api.Protocol.value + Api.Host.value + GeocodeApi.Forward_Geocode_Endpoint.value
-        response = requests.get(geocode_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        geocode_api_url = self._client.base_url + GeocodeApi.Forward_Geocode_Endpoint.value
+        return self._client._request("GET", GeocodeApi.Forward_Geocode_Endpoint, geocode_api_url, headers, query_params)
+
+    def bulk_forward_geocode(self,
+                             addresses: Iterable[str],
+                             bounds: str = None,
+                             language: str = None,
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                             x_correlation_id: str = None) -> DeduplicatedBatch:
+        """
+        Description: Forward geocodes a batch of addresses concurrently, issuing only one upstream request per distinct
+        address. Addresses are compared after normalization (case, whitespace and punctuation around separators), and
+        the answer for each distinct address is copied to all of its duplicates. Failures are reported per item.
+
+        :param addresses: iterable[string]
+        Description: The addresses to be geocoded.
+        Example: ["Koramangala, Bengaluru", "koramangala ,bengaluru", "Mumbai"]
+
+        :param bounds: string
+        Description: Pipe ("|") separated lat,lng pairs of two corner points of a bounding box, applied to every address.
+        Default value: None
+
+        :param language: string
+        Description: The language in which to return the results. Currently only accepts English.
+        Default value: None
+
+        :param max_concurrency: integer
+        Description: Maximum number of lookups in flight at once.
+        Default value: 8
+
+        :param x_correlation_id: string
+        Description: A UUIDv4 unique over a series of requests and responses, identifying a transaction.
+        Default value: None
+
+        :return: DeduplicatedBatch
+        Description: `results` holds one BatchResult per input address in input order, `upstream_calls` the number of
+        requests issued and `calls_saved` the number avoided by deduplication.
+        """
+        def lookup(address):
+            return self.forward_geocode(address.strip(), bounds=bounds, language=language,
+                                        x_correlation_id=x_correlation_id)
+
+        return run_deduplicated_batch(lookup, addresses, normalize_address, max_concurrency)
 
     def reverse_geocode(self,
                         latitude_longitude: str,
@@ -117,11 +133,6 @@ class Geocode:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["latlng"] = latitude_longitude
 
         if x_request_id is not None:
@@ -130,26 +141,92 @@ class Geocode:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        reverse_geocode_api_url = Api.Protocol.value + Api.Host.value + GeocodeApi.Reverse_Geocode_Endpoint.value
-        response = requests.get(reverse_geocode_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        reverse_geocode_api_url = self._client.base_url + GeocodeApi.Reverse_Geocode_Endpoint.value
+        return self._client._request("GET", GeocodeApi.Reverse_Geocode_Endpoint, reverse_geocode_api_url, headers,
+                                     query_params)
+
+    def bulk_reverse_geocode(self,
+                             coordinates: Iterable,
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                             ordered: bool = True,
+                             x_correlation_id: str = None) -> Iterator[BatchResult]:
+        """
+        Description: Reverse geocodes a stream of coordinates concurrently. Results are yielded as they become available
+        and failures are reported per item, so one bad coordinate does not abort the batch. The input is consumed
+        lazily, so generators of millions of points can be streamed through without holding them in memory.
+
+        :param coordinates: iterable
+        Description: Coordinates to reverse geocode, each either a "lat,lng" string or a (latitude, longitude) pair.
+        Example: ["12.931316595874005,77.61649243443775", (12.93219851203095, 77.611182859373)]
+
+        :param max_concurrency: integer
+        Description: Maximum number of lookups in flight at once.
+        Default value: 8
+
+        :param ordered: boolean
+        Description: If true, results are yielded in input order, otherwise in completion order.
+        Default value: True
+
+        :param x_correlation_id: string
+        Description: A UUIDv4 unique over a series of requests and responses, identifying a transaction.
+        Default value: None
+
+        :return: iterator of BatchResult
+        """
+        def lookup(point):
+            return self.reverse_geocode(format_lat_lng(point), x_correlation_id=x_correlation_id)
+
+        return run_batch(lookup, coordinates, max_concurrency, ordered)
+
+
+class AsyncGeocode(Geocode):
+    async def forward_geocode(self,
+                              address: str,
+                              bounds: str = None,
+                              language: str = None,
+                              x_request_id: str = None,
+                              x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Geocode.forward_geocode`.
+        """
+        return await super().forward_geocode(address=address, bounds=bounds, language=language,
+                                             x_request_id=x_request_id, x_correlation_id=x_correlation_id)
+
+    async def reverse_geocode(self,
+                              latitude_longitude: str,
+                              x_request_id: str = None,
+                              x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Geocode.reverse_geocode`.
+        """
+        return await super().reverse_geocode(latitude_longitude=latitude_longitude, x_request_id=x_request_id,
+                                             x_correlation_id=x_correlation_id)
+
+    async def bulk_forward_geocode(self,
+                                   addresses: Iterable[str],
+                                   bounds: str = None,
+                                   language: str = None,
+                                   max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+                                   x_correlation_id: str = None) -> DeduplicatedBatch:
+        """
+        Description: Async variant of `Geocode.bulk_forward_geocode`.
+        """
+        async def lookup(address):
+            return await self.forward_geocode(address.strip(), bounds=bounds, language=language,
+                                              x_correlation_id=x_correlation_id)
+
+        return await arun_deduplicated_batch(lookup, addresses, normalize_address, max_concurrency)
+
+    async def bulk_reverse_geocode(self,
+                                   coordinates,
+                                   max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+                                   ordered: bool = True,
+                                   x_correlation_id: str = None) -> AsyncIterator[BatchResult]:
+        """
+        Description: Async variant of `Geocode.bulk_reverse_geocode`. `coordinates` may also be an async iterable.
+        """
+        async def lookup(point):
+            return await self.reverse_geocode(format_lat_lng(point), x_correlation_id=x_correlation_id)
+
+        async for result in arun_batch(lookup, coordinates, max_concurrency, ordered):
+            yield result
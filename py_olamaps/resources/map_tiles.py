@@ -1,16 +1,20 @@
-from http import HTTPStatus
+import time
+from typing import AsyncIterator, Iterable, Iterator
 
-import requests
-
-from py_olamaps.exceptions import APIException
-from py_olamaps.utils.CommonEnums import Api, MapTilesApi
+from py_olamaps.exceptions import OlaMapsError
+from py_olamaps.utils.CommonEnums import MapTilesApi
+from py_olamaps.utils.batch import (DEFAULT_ASYNC_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY, BatchResult, arun_batch,
+                                    run_batch)
+from py_olamaps.utils.download import conditional_headers, deliver_image
+from py_olamaps.utils.static_maps import StaticMapRender, StaticMapSink, static_map_key, static_map_kind
+from py_olamaps.utils.vector_tiles import (DEFAULT_COMMIT_INTERVAL, AsyncTileFetcher, MBTilesStore, TileFetcher,
+                                           vector_source)
 
 
 class MapTiles:
     def __init__(self,
                  client):
-        self._api_key = client.api_key
-        self._access_token = client.access_token
+        self._client = client
 
     def array_of_data(self,
                       dataset_name: str,
@@ -36,41 +40,16 @@ class MapTiles:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         if x_request_id is not None:
             headers["x_request_id"] = x_request_id
 
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        get_array_of_data_url = Api.Protocol.value + Api.Host.value + (
+        get_array_of_data_url = self._client.base_url + (
             MapTilesApi.Get_Array_Of_Data_Endpoint.value).format(datasetName=dataset_name)
-        response = requests.get(get_array_of_data_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        return self._client._request_metadata(MapTilesApi.Get_Array_Of_Data_Endpoint, get_array_of_data_url, headers,
+                                              query_params)
 
     def get_map_style(self,
                       x_request_id: str = None,
@@ -103,40 +82,14 @@ class MapTiles:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         if x_request_id is not None:
             headers["x_request_id"] = x_request_id
 
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        get_map_style_url = Api.Protocol.value + Api.Host.value + MapTilesApi.Get_Map_Endpoint.value
-        response = requests.get(get_map_style_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        get_map_style_url = self._client.base_url + MapTilesApi.Get_Map_Endpoint.value
+        return self._client._request_metadata(MapTilesApi.Get_Map_Endpoint, get_map_style_url, headers, query_params)
 
     def get_style_details(self,
                           style_name: str,
@@ -166,41 +119,16 @@ class MapTiles:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         if x_request_id is not None:
             headers["x_request_id"] = x_request_id
 
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        get_style_details_url = Api.Protocol.value + Api.Host.value + (MapTilesApi.Get_Style_Endpoint.value).format(
+        get_style_details_url = self._client.base_url + (MapTilesApi.Get_Style_Endpoint.value).format(
             styleName=style_name)
-        response = requests.get(get_style_details_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        return self._client._request_metadata(MapTilesApi.Get_Style_Endpoint, get_style_details_url, headers,
+                                              query_params)
 
     def static_map_image_based_on_center_point(self,
                                                style_name: str,
@@ -212,6 +140,10 @@ class MapTiles:
                                                image_format: str,
                                                marker: list[str] = None,
                                                path: str = None,
+                                               destination=None,
+                                               if_none_match: str = None,
+                                               if_modified_since: str = None,
+                                               as_memoryview: bool = False,
                                                x_request_id: str = None,
                                                x_correlation_id: str = None) -> object:
         """
@@ -265,6 +197,27 @@ class MapTiles:
         Example: 77.61,12.93|77.61190639293811,12.937637130956137|width:6|stroke:#00ff44
         Default value: None
 
+        :param destination: string, file object or buffer
+        Description: Streaming mode. Write the image in chunks to this path, binary file object or pre-allocated
+        writable buffer (bytearray, memoryview, numpy array, ...) instead of loading it into memory, and return a
+        `DownloadResult` with the bytes written and timings. A path is replaced atomically once the download
+        completes.
+        Default value: None
+
+        :param if_none_match: string
+        Description: Streaming mode only. ETag of the copy already at `destination`, from `DownloadResult.etag`. If
+        the image is unchanged nothing is downloaded and the result has `not_modified` set.
+        Default value: None
+
+        :param if_modified_since: string
+        Description: Streaming mode only. Like `if_none_match`, with `DownloadResult.last_modified`.
+        Default value: None
+
+        :param as_memoryview: boolean
+        Description: Return a read-only `memoryview` of the image instead of the response. When the client has an
+        `image_cache`, the image is served from it and stored in it on a miss. Cannot be combined with `destination`.
+        Default value: False
+
         :param x_request_id: string
         Description: A UUIDv4 unique to that HTTP request and response combination.
         Default value: None
@@ -274,15 +227,12 @@ class MapTiles:
         Default value: None
 
         :return: object
+        Description: The `requests.Response` holding the image, a `DownloadResult` in streaming mode, or a read-only
+        `memoryview` of the image with `as_memoryview`.
         """
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         if marker is not None and len(marker) > 0:
             query_params["marker"] = marker
 
@@ -295,7 +245,7 @@ class MapTiles:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        static_image_based_on_center_point_url = Api.Protocol.value + Api.Host.value + (
+        static_image_based_on_center_point_url = self._client.base_url + (
             MapTilesApi.Static_Map_Image_Based_On_Center_Point_Endpoint.value).format(styleName=style_name,
                                                                                       lon=longitude,
                                                                                       lat=latitude,
@@ -303,28 +253,9 @@ class MapTiles:
                                                                                       width=image_width,
                                                                                       height=image_height,
                                                                                       format=image_format)
-        response = requests.get(static_image_based_on_center_point_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        return self._static_map(MapTilesApi.Static_Map_Image_Based_On_Center_Point_Endpoint,
+                                static_image_based_on_center_point_url, headers, query_params, destination,
+                                if_none_match, if_modified_since, as_memoryview)
 
     def static_map_image_based_on_bounding_box(self,
                                                style_name: str,
@@ -337,6 +268,10 @@ class MapTiles:
                                                image_format: str,
                                                marker: list[str] = None,
                                                path: str = None,
+                                               destination=None,
+                                               if_none_match: str = None,
+                                               if_modified_since: str = None,
+                                               as_memoryview: bool = False,
                                                x_request_id: str = None,
                                                x_correlation_id: str = None) -> object:
         """
@@ -394,6 +329,27 @@ class MapTiles:
         Example: 77.61,12.93|77.61190639293811,12.937637130956137|width:6|stroke:#00ff44
         Default value: None
 
+        :param destination: string, file object or buffer
+        Description: Streaming mode. Write the image in chunks to this path, binary file object or pre-allocated
+        writable buffer (bytearray, memoryview, numpy array, ...) instead of loading it into memory, and return a
+        `DownloadResult` with the bytes written and timings. A path is replaced atomically once the download
+        completes.
+        Default value: None
+
+        :param if_none_match: string
+        Description: Streaming mode only. ETag of the copy already at `destination`, from `DownloadResult.etag`. If
+        the image is unchanged nothing is downloaded and the result has `not_modified` set.
+        Default value: None
+
+        :param if_modified_since: string
+        Description: Streaming mode only. Like `if_none_match`, with `DownloadResult.last_modified`.
+        Default value: None
+
+        :param as_memoryview: boolean
+        Description: Return a read-only `memoryview` of the image instead of the response. When the client has an
+        `image_cache`, the image is served from it and stored in it on a miss. Cannot be combined with `destination`.
+        Default value: False
+
         :param x_request_id: string
         Description: A UUIDv4 unique to that HTTP request and response combination.
         Default value: None
@@ -403,15 +359,12 @@ class MapTiles:
         Default value: None
 
         :return: object
+        Description: The `requests.Response` holding the image, a `DownloadResult` in streaming mode, or a read-only
+        `memoryview` of the image with `as_memoryview`.
         """
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         if marker is not None and len(marker) > 0:
             query_params["marker"] = marker
 
@@ -424,7 +377,7 @@ class MapTiles:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        static_image_based_on_bounding_box_url = Api.Protocol.value + Api.Host.value + (
+        static_image_based_on_bounding_box_url = self._client.base_url + (
             MapTilesApi.Static_Map_Image_Based_On_Bounding_Box_Endpoint.value).format(styleName=style_name,
                                                                                       minx=min_x,
                                                                                       miny=min_y,
@@ -433,28 +386,9 @@ class MapTiles:
                                                                                       width=image_width,
                                                                                       height=image_height,
                                                                                       format=image_format)
-        response = requests.get(static_image_based_on_bounding_box_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        return self._static_map(MapTilesApi.Static_Map_Image_Based_On_Bounding_Box_Endpoint,
+                                static_image_based_on_bounding_box_url, headers, query_params, destination,
+                                if_none_match, if_modified_since, as_memoryview)
 
     def static_map_image(self,
                          style_name: str,
@@ -463,6 +397,10 @@ class MapTiles:
                          image_format: str,
                          path: str,
                          marker: list[str] = None,
+                         destination=None,
+                         if_none_match: str = None,
+                         if_modified_since: str = None,
+                         as_memoryview: bool = False,
                          x_request_id: str = None,
                          x_correlation_id: str = None) -> object:
         """
@@ -503,6 +441,27 @@ class MapTiles:
         Example: 77.61,12.93|red|scale:0.9
         Default value: None
 
+        :param destination: string, file object or buffer
+        Description: Streaming mode. Write the image in chunks to this path, binary file object or pre-allocated
+        writable buffer (bytearray, memoryview, numpy array, ...) instead of loading it into memory, and return a
+        `DownloadResult` with the bytes written and timings. A path is replaced atomically once the download
+        completes.
+        Default value: None
+
+        :param if_none_match: string
+        Description: Streaming mode only. ETag of the copy already at `destination`, from `DownloadResult.etag`. If
+        the image is unchanged nothing is downloaded and the result has `not_modified` set.
+        Default value: None
+
+        :param if_modified_since: string
+        Description: Streaming mode only. Like `if_none_match`, with `DownloadResult.last_modified`.
+        Default value: None
+
+        :param as_memoryview: boolean
+        Description: Return a read-only `memoryview` of the image instead of the response. When the client has an
+        `image_cache`, the image is served from it and stored in it on a miss. Cannot be combined with `destination`.
+        Default value: False
+
         :param x_request_id: string
         Description: A UUIDv4 unique to that HTTP request and response combination.
         Default value: None
@@ -512,15 +471,12 @@ class MapTiles:
         Default value: None
 
         :return: object
+        Description: The `requests.Response` holding the image, a `DownloadResult` in streaming mode, or a read-only
+        `memoryview` of the image with `as_memoryview`.
         """
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         if marker is not None and len(marker) > 0:
             query_params["marker"] = marker
 
@@ -533,30 +489,377 @@ class MapTiles:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        static_image_based_url = Api.Protocol.value + Api.Host.value + (
+        static_image_based_url = self._client.base_url + (
             MapTilesApi.Static_Map_Image_Based_Endpoint.value).format(styleName=style_name,
                                                                       width=image_width,
                                                                       height=image_height,
                                                                       format=image_format)
-        response = requests.get(static_image_based_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
+        return self._static_map(MapTilesApi.Static_Map_Image_Based_Endpoint,
+                                static_image_based_url, headers, query_params, destination,
+                                if_none_match, if_modified_since, as_memoryview)
+
+    def bulk_static_map(self,
+                        specs: Iterable[dict],
+                        sink: StaticMapSink,
+                        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                        ordered: bool = False,
+                        x_correlation_id: str = None) -> Iterator[BatchResult]:
+        """
+        Description: Renders a stream of static maps concurrently and streams each image into `sink`. Specs whose
+        content key `sink` already holds are skipped without a request, so rerunning an interrupted or nightly job only
+        renders what is missing. Requests go through the client like any other call, so its rate limiter, retry
+        policy and circuit breaker apply. Failures are reported per spec and do not abort the batch.
+
+        :param specs: iterable of dict
+        Description: Keyword arguments of `static_map_image_based_on_bounding_box` (specs with `min_x`),
+        `static_map_image_based_on_center_point` (specs with `longitude`) or `static_map_image` (all others). The
+        input is consumed lazily.
+        Example: [{"style_name": "default-light-standard", "min_x": 77.5, "min_y": 12.9, "max_x": 77.7, "max_y": 13.0,
+        "image_width": 800, "image_height": 600, "image_format": "png"}]
+
+        :param sink: StaticMapSink
+        Description: Where images are written, e.g. `DirectorySink("reports/maps")`.
+
+        :param max_concurrency: integer
+        Description: Maximum number of images rendered at once.
+        Default value: 8
+
+        :param ordered: boolean
+        Description: If true, results are yielded in input order, otherwise in completion order.
+        Default value: False
+
+        :param x_correlation_id: string
+        Description: A UUIDv4 unique over a series of requests and responses, identifying a transaction. Used for
+        specs that do not set their own.
+        Default value: None
+
+        :return: iterator of BatchResult
+        Description: One per spec, with a `StaticMapRender` as result.
+        """
+        def render(spec):
+            key = static_map_key(spec)
+            if sink.exists(key, spec):
+                return StaticMapRender(key, True)
+            destination = sink.destination(key, spec)
+            try:
+                download = self._render_static_map(spec, destination, x_correlation_id)
+            except Exception as error:
+                sink.finish(key, spec, destination, error)
+                raise
+            sink.finish(key, spec, destination)
+            return StaticMapRender(key, False, download)
+
+        return run_batch(render, specs, max_concurrency, ordered)
+
+    def vector_tiles(self,
+                     store: MBTilesStore,
+                     dataset_name: str = "planet",
+                     style_name: str = None,
+                     source_name: str = None,
+                     commit_interval: int = DEFAULT_COMMIT_INTERVAL,
+                     x_correlation_id: str = None) -> TileFetcher:
+        """
+        Description: Creates a fetcher for the vector tiles of a dataset or style, stored in `store`. Reads the tile
+        URL templates from the dataset's TileJSON (`array_of_data`) or, with `style_name`, from the style document
+        (`get_style_details`), following its TileJSON URL if needed. Use `fetcher.seed` to download every tile of an
+        area ahead of time and `fetcher.get_tile` to serve tiles from `store`, downloading missing ones on demand.
+        Credentials are only sent to the host of the client's `base_url`; TileJSON and tile URLs on other hosts are
+        fetched without them.
+
+        :param store: MBTilesStore
+        Description: Single-file SQLite tile store the tiles are written to and served from.
+        Example: MBTilesStore("tiles/bengaluru.mbtiles")
+
+        :param dataset_name: string
+        Description: Name of the dataset whose TileJSON lists the tile URLs. Ignored when `style_name` is set.
+        Default value: planet
+
+        :param style_name: string
+        Description: Name of a style whose vector source lists the tile URLs.
+        Example: default-light-standard
+        Default value: None
+
+        :param source_name: string
+        Description: Source of the style to use.
+        Default value: the first vector source
+
+        :param commit_interval: integer
+        Description: Number of tiles `seed` downloads between two commits to `store`.
+        Default value: 256
+
+        :param x_correlation_id: string
+        Description: A UUIDv4 unique over a series of requests and responses, identifying a transaction. Sent with
+        every request of the fetcher.
+        Default value: None
+
+        :return: TileFetcher
+        """
+        if style_name is not None:
+            document = self.get_style_details(style_name, x_correlation_id=x_correlation_id)
+        else:
+            document = self.array_of_data(dataset_name, x_correlation_id=x_correlation_id)
+        tilejson = vector_source(document, source_name)
+        if "tiles" not in tilejson:
+            tilejson = self._client._request_metadata(MapTilesApi.Get_Array_Of_Data_Endpoint, tilejson["url"],
+                                                      self._correlation_headers(x_correlation_id), dict())
+        return TileFetcher(self._client, store, tilejson, commit_interval, x_correlation_id)
+
+    @staticmethod
+    def _correlation_headers(x_correlation_id: str) -> dict:
+        headers = dict()
+        if x_correlation_id is not None:
+            headers["x_correlation_id"] = x_correlation_id
+        return headers
+
+    def _render_static_map(self, spec: dict, destination, x_correlation_id: str):
+        methods = {
+            "bounding_box": self.static_map_image_based_on_bounding_box,
+            "center_point": self.static_map_image_based_on_center_point,
+            "static_map_image": self.static_map_image,
+        }
+        options = dict(spec, destination=destination)
+        options.setdefault("x_correlation_id", x_correlation_id)
+        return methods[static_map_kind(spec)](**options)
+
+    def _static_map(self,
+                    endpoint: MapTilesApi,
+                    url: str,
+                    headers: dict,
+                    query_params: dict,
+                    destination,
+                    if_none_match: str,
+                    if_modified_since: str,
+                    as_memoryview: bool):
+        cache_key = self._image_cache_key(url, query_params, destination, if_none_match, if_modified_since,
+                                          as_memoryview)
+        if as_memoryview:
+            image = self._client.image_cache.get(cache_key) if cache_key is not None else None
+            if image is None:
+                response = self._client._request("GET", endpoint, url, headers, query_params, raw=True)
+                image = self._store_image(cache_key, response.content)
+            return image
+
+        if destination is None:
+            return self._client._request("GET", endpoint, url, headers, query_params, raw=True)
+        if cache_key is not None:
+            started_at = time.monotonic()
+            image = self._client.image_cache.get(cache_key)
+            if image is not None:
+                return deliver_image(image, destination, started_at)
+        headers = conditional_headers(headers, if_none_match, if_modified_since)
+        return self._client._download(endpoint, url, headers, query_params, destination,
+                                      copy=self._image_cache_writer(cache_key))
+
+    def _image_cache_key(self,
+                         url: str,
+                         query_params: dict,
+                         destination,
+                         if_none_match: str,
+                         if_modified_since: str,
+                         as_memoryview: bool) -> str:
+        if as_memoryview and destination is not None:
+            raise OlaMapsError("as_memoryview cannot be combined with destination")
+        # Plain responses are returned as they are. Conditional requests revalidate a copy the caller already holds,
+        # so they always go to the API.
+        if not as_memoryview and destination is None:
+            return None
+        if if_none_match is not None or if_modified_since is not None:
+            return None
+        return self._client._image_cache_key(url, query_params)
+
+    def _store_image(self, cache_key: str, content: bytes) -> memoryview:
+        if cache_key is None:
+            return memoryview(content)
+        return self._client.image_cache.set(cache_key, content)
+
+    def _image_cache_writer(self, cache_key: str):
+        # Streamed images only go to the disk tier, which takes them chunk by chunk; the memory tier would need the
+        # whole image buffered.
+        return self._client.image_cache.writer(cache_key) if cache_key is not None else None
+
+
+class AsyncMapTiles(MapTiles):
+    async def array_of_data(self,
+                            dataset_name: str,
+                            x_request_id: str = None,
+                            x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `MapTiles.array_of_data`.
+        """
+        return await super().array_of_data(dataset_name=dataset_name, x_request_id=x_request_id,
+                                           x_correlation_id=x_correlation_id)
+
+    async def get_map_style(self,
+                            x_request_id: str = None,
+                            x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `MapTiles.get_map_style`.
+        """
+        return await super().get_map_style(x_request_id=x_request_id, x_correlation_id=x_correlation_id)
+
+    async def get_style_details(self,
+                                style_name: str,
+                                x_request_id: str = None,
+                                x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `MapTiles.get_style_details`.
+        """
+        return await super().get_style_details(style_name=style_name, x_request_id=x_request_id,
+                                               x_correlation_id=x_correlation_id)
+
+    async def static_map_image_based_on_center_point(self,
+                                                     style_name: str,
+                                                     longitude: float,
+                                                     latitude: float,
+                                                     zoom_level: float,
+                                                     image_width: int,
+                                                     image_height: int,
+                                                     image_format: str,
+                                                     marker: list[str] = None,
+                                                     path: str = None,
+                                                     destination=None,
+                                                     if_none_match: str = None,
+                                                     if_modified_since: str = None,
+                                                     as_memoryview: bool = False,
+                                                     x_request_id: str = None,
+                                                     x_correlation_id: str = None) -> object:
+        """
+        Description: Async variant of `MapTiles.static_map_image_based_on_center_point`.
+        """
+        return await super().static_map_image_based_on_center_point(style_name=style_name, longitude=longitude,
+                                                                    latitude=latitude, zoom_level=zoom_level,
+                                                                    image_width=image_width, image_height=image_height,
+                                                                    image_format=image_format, marker=marker, path=path,
+                                                                    destination=destination,
+                                                                    if_none_match=if_none_match,
+                                                                    if_modified_since=if_modified_since,
+                                                                    as_memoryview=as_memoryview,
+                                                                    x_request_id=x_request_id,
+                                                                    x_correlation_id=x_correlation_id)
+
+    async def static_map_image_based_on_bounding_box(self,
+                                                     style_name: str,
+                                                     min_x: float,
+                                                     min_y: float,
+                                                     max_x: float,
+                                                     max_y: float,
+                                                     image_width: int,
+                                                     image_height: int,
+                                                     image_format: str,
+                                                     marker: list[str] = None,
+                                                     path: str = None,
+                                                     destination=None,
+                                                     if_none_match: str = None,
+                                                     if_modified_since: str = None,
+                                                     as_memoryview: bool = False,
+                                                     x_request_id: str = None,
+                                                     x_correlation_id: str = None) -> object:
+        """
+        Description: Async variant of `MapTiles.static_map_image_based_on_bounding_box`.
+        """
+        return await super().static_map_image_based_on_bounding_box(style_name=style_name, min_x=min_x, min_y=min_y,
+                                                                    max_x=max_x, max_y=max_y, image_width=image_width,
+                                                                    image_height=image_height,
+                                                                    image_format=image_format, marker=marker, path=path,
+                                                                    destination=destination,
+                                                                    if_none_match=if_none_match,
+                                                                    if_modified_since=if_modified_since,
+                                                                    as_memoryview=as_memoryview,
+                                                                    x_request_id=x_request_id,
+                                                                    x_correlation_id=x_correlation_id)
+
+    async def static_map_image(self,
+                               style_name: str,
+                               image_width: int,
+                               image_height: int,
+                               image_format: str,
+                               path: str,
+                               marker: list[str] = None,
+                               destination=None,
+                               if_none_match: str = None,
+                               if_modified_since: str = None,
+                               as_memoryview: bool = False,
+                               x_request_id: str = None,
+                               x_correlation_id: str = None) -> object:
+        """
+        Description: Async variant of `MapTiles.static_map_image`.
+        """
+        return await super().static_map_image(style_name=style_name, image_width=image_width, image_height=image_height,
+                                              image_format=image_format, path=path, marker=marker,
+                                              destination=destination, if_none_match=if_none_match,
+                                              if_modified_since=if_modified_since, as_memoryview=as_memoryview,
+                                              x_request_id=x_request_id, x_correlation_id=x_correlation_id)
+
+    async def bulk_static_map(self,
+                              specs,
+                              sink: StaticMapSink,
+                              max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+                              ordered: bool = False,
+                              x_correlation_id: str = None) -> AsyncIterator[BatchResult]:
+        """
+        Description: Async variant of `MapTiles.bulk_static_map`. `specs` may also be an async iterable.
+        """
+        async def render(spec):
+            key = static_map_key(spec)
+            if sink.exists(key, spec):
+                return StaticMapRender(key, True)
+            destination = sink.destination(key, spec)
+            try:
+                download = await self._render_static_map(spec, destination, x_correlation_id)
+            except Exception as error:
+                sink.finish(key, spec, destination, error)
+                raise
+            sink.finish(key, spec, destination)
+            return StaticMapRender(key, False, download)
+
+        async for result in arun_batch(render, specs, max_concurrency, ordered):
+            yield result
+
+    async def vector_tiles(self,
+                           store: MBTilesStore,
+                           dataset_name: str = "planet",
+                           style_name: str = None,
+                           source_name: str = None,
+                           commit_interval: int = DEFAULT_COMMIT_INTERVAL,
+                           x_correlation_id: str = None) -> AsyncTileFetcher:
+        """
+        Description: Async variant of `MapTiles.vector_tiles`.
+        """
+        if style_name is not None:
+            document = await self.get_style_details(style_name, x_correlation_id=x_correlation_id)
         else:
-            raise APIException("Unknown Error", response, query_params)
+            document = await self.array_of_data(dataset_name, x_correlation_id=x_correlation_id)
+        tilejson = vector_source(document, source_name)
+        if "tiles" not in tilejson:
+            tilejson = await self._client._request_metadata(MapTilesApi.Get_Array_Of_Data_Endpoint, tilejson["url"],
+                                                            self._correlation_headers(x_correlation_id), dict())
+        return AsyncTileFetcher(self._client, store, tilejson, commit_interval, x_correlation_id)
+
+    async def _static_map(self,
+                          endpoint: MapTilesApi,
+                          url: str,
+                          headers: dict,
+                          query_params: dict,
+                          destination,
+                          if_none_match: str,
+                          if_modified_since: str,
+                          as_memoryview: bool):
+        cache_key = self._image_cache_key(url, query_params, destination, if_none_match, if_modified_since,
+                                          as_memoryview)
+        if as_memoryview:
+            image = self._client.image_cache.get(cache_key) if cache_key is not None else None
+            if image is None:
+                response = await self._client._request("GET", endpoint, url, headers, query_params, raw=True)
+                image = self._store_image(cache_key, response.content)
+            return image
+
+        if destination is None:
+            return await self._client._request("GET", endpoint, url, headers, query_params, raw=True)
+        if cache_key is not None:
+            started_at = time.monotonic()
+            image = self._client.image_cache.get(cache_key)
+            if image is not None:
+                return deliver_image(image, destination, started_at)
+        headers = conditional_headers(headers, if_none_match, if_modified_since)
+        return await self._client._download(endpoint, url, headers, query_params, destination,
+                                            copy=self._image_cache_writer(cache_key))
@@ -1,16 +1,12 @@
-from http import HTTPStatus
-
-import requests
-
-from py_olamaps.exceptions import APIException
-from py_olamaps.utils.CommonEnums import Api, PlacesApi
+from py_olamaps.utils.CommonEnums import PlacesApi
+from py_olamaps.utils.autocomplete import (DEFAULT_DEBOUNCE, DEFAULT_MIN_PREFIX_RESULTS, DEFAULT_SESSION_CACHE_SIZE,
+                                           AsyncAutocompleteSession, AutocompleteSession)
 
 
 class Places:
     def __init__(self,
                  client):
-        self._api_key = client.api_key
-        self._access_token = client.access_token
+        self._client = client
 
     def autocomplete(self,
                      input: str,
@@ -67,11 +63,6 @@ class Places:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["input"] = input
 
         if origin is not None:
@@ -92,29 +83,68 @@ class Places:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        autocomplete_api_url = Api.Protocol.value + Api.Host.value + PlacesApi.Autocomplete_Endpoint.value
-        response = requests.get(autocomplete_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        autocomplete_api_url = self._client.base_url + PlacesApi.Autocomplete_Endpoint.value
+        return self._client._request("GET", PlacesApi.Autocomplete_Endpoint, autocomplete_api_url, headers,
+                                     query_params)
+
+    def autocomplete_session(self,
+                             origin: str = None,
+                             location: str = None,
+                             radius: int = 0,
+                             strictbounds: bool = None,
+                             debounce: float = DEFAULT_DEBOUNCE,
+                             min_length: int = 1,
+                             min_prefix_results: int = DEFAULT_MIN_PREFIX_RESULTS,
+                             cache_size: int = DEFAULT_SESSION_CACHE_SIZE,
+                             x_correlation_id: str = None) -> AutocompleteSession:
+        """
+        Description: Starts a typeahead session for one user. Pass every partial input to `session.update`, which
+        debounces them, drops superseded ones and reuses answers of earlier inputs of the session when possible, so a
+        backend can forward keystrokes as they arrive.
+
+        :param origin: string
+        Description: Same as in `autocomplete`, used for every request of the session.
+        Default value: None
+
+        :param location: string
+        Description: Same as in `autocomplete`, used for every request of the session.
+        Default value: None
+
+        :param radius: integer
+        Description: Same as in `autocomplete`.
+        Default value: 0
+
+        :param strictbounds: boolean
+        Description: Same as in `autocomplete`.
+        Default value: None
+
+        :param debounce: float
+        Description: Seconds an input must stay the latest before it is looked up.
+        Default value: 0.25
+
+        :param min_length: integer
+        Description: Inputs shorter than this, once normalized, are not looked up and `update` returns None for them.
+        Default value: 1
+
+        :param min_prefix_results: integer
+        Description: Answer an input locally from the results of its longest already-answered prefix when at least this
+        many of those predictions still match it. 0 disables this.
+        Default value: 3
+
+        :param cache_size: integer
+        Description: Answers kept by the session.
+        Default value: 256
+
+        :param x_correlation_id: string
+        Description: Correlation id sent with every request of the session.
+        Default value: a new UUIDv4
+
+        :return: AutocompleteSession
+        Example: session.update("kempe")
+        """
+        return AutocompleteSession(self, origin=origin, location=location, radius=radius, strictbounds=strictbounds,
+                                   debounce=debounce, min_length=min_length, min_prefix_results=min_prefix_results,
+                                   cache_size=cache_size, x_correlation_id=x_correlation_id)
 
     def place_details(self,
                       place_id: str,
@@ -141,11 +171,6 @@ class Places:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["place_id"] = place_id
 
         if x_request_id is not None:
@@ -154,29 +179,9 @@ class Places:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        place_details_api_url = Api.Protocol.value + Api.Host.value + PlacesApi.Place_Details_Endpoint.value
-        response = requests.get(place_details_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        place_details_api_url = self._client.base_url + PlacesApi.Place_Details_Endpoint.value
+        return self._client._request("GET", PlacesApi.Place_Details_Endpoint, place_details_api_url, headers,
+                                     query_params)
 
     def nearby_search(self,
                       layers: str,
@@ -241,11 +246,6 @@ class Places:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["layers"] = layers
         query_params["location"] = location
 
@@ -269,29 +269,9 @@ class Places:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        nearby_search_api_url = Api.Protocol.value + Api.Host.value + PlacesApi.Nearby_Search_Endpoint.value
-        response = requests.get(nearby_search_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        nearby_search_api_url = self._client.base_url + PlacesApi.Nearby_Search_Endpoint.value
+        return self._client._request("GET", PlacesApi.Nearby_Search_Endpoint, nearby_search_api_url, headers,
+                                     query_params)
 
     def text_search(self,
                     input: str,
@@ -347,11 +327,6 @@ class Places:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["input"] = input
 
         if location is not None:
@@ -372,26 +347,82 @@ class Places:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        text_search_api_url = Api.Protocol.value + Api.Host.value + PlacesApi.Text_Search_Endpoint.value
-        response = requests.get(text_search_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        text_search_api_url = self._client.base_url + PlacesApi.Text_Search_Endpoint.value
+        return self._client._request("GET", PlacesApi.Text_Search_Endpoint, text_search_api_url, headers, query_params)
+
+
+class AsyncPlaces(Places):
+    async def autocomplete(self,
+                           input: str,
+                           origin: str = None,
+                           location: str = None,
+                           radius: int = 0,
+                           strictbounds: bool = None,
+                           x_request_id: str = None,
+                           x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Places.autocomplete`.
+        """
+        return await super().autocomplete(input=input, origin=origin, location=location, radius=radius,
+                                          strictbounds=strictbounds, x_request_id=x_request_id,
+                                          x_correlation_id=x_correlation_id)
+
+    def autocomplete_session(self,
+                             origin: str = None,
+                             location: str = None,
+                             radius: int = 0,
+                             strictbounds: bool = None,
+                             debounce: float = DEFAULT_DEBOUNCE,
+                             min_length: int = 1,
+                             min_prefix_results: int = DEFAULT_MIN_PREFIX_RESULTS,
+                             cache_size: int = DEFAULT_SESSION_CACHE_SIZE,
+                             x_correlation_id: str = None) -> AsyncAutocompleteSession:
+        """
+        Description: Async variant of `Places.autocomplete_session`. A newer input cancels the previous input's
+        in-flight request.
+        """
+        return AsyncAutocompleteSession(self, origin=origin, location=location, radius=radius,
+                                        strictbounds=strictbounds, debounce=debounce, min_length=min_length,
+                                        min_prefix_results=min_prefix_results, cache_size=cache_size,
+                                        x_correlation_id=x_correlation_id)
+
+    async def place_details(self,
+                            place_id: str,
+                            x_request_id: str = None,
+                            x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Places.place_details`.
+        """
+        return await super().place_details(place_id=place_id, x_request_id=x_request_id,
+                                           x_correlation_id=x_correlation_id)
+
+    async def nearby_search(self,
+                            layers: str,
+                            location: str,
+                            types: str = None,
+                            radius: int = 0,
+                            strictbounds: bool = None,
+                            with_centroid: bool = None,
+                            limit: int = 5,
+                            x_request_id: str = None,
+                            x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Places.nearby_search`.
+        """
+        return await super().nearby_search(layers=layers, location=location, types=types, radius=radius,
+                                           strictbounds=strictbounds, with_centroid=with_centroid, limit=limit,
+                                           x_request_id=x_request_id, x_correlation_id=x_correlation_id)
+
+    async def text_search(self,
+                          input: str,
+                          location: str = None,
+                          radius: int = 0,
+                          types: str = None,
+                          size: int = 0,
+                          x_request_id: str = None,
+                          x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Places.text_search`.
+        """
+        return await super().text_search(input=input, location=location, radius=radius, types=types, size=size,
+                                         x_request_id=x_request_id, x_correlation_id=x_correlation_id)
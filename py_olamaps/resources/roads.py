@@ -1,16 +1,20 @@
-from http import HTTPStatus
+from typing import AsyncIterator, Iterable, Iterator
 
-import requests
+from py_olamaps.utils.CommonEnums import RoadsApi
+from py_olamaps.utils.batch import (DEFAULT_ASYNC_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY, BatchResult, arun_batch,
+                                    chunked, run_batch)
+from py_olamaps.utils.coordinates import format_lat_lng
+from py_olamaps.utils.tiling import plan_windows
 
-from py_olamaps.exceptions import APIException
-from py_olamaps.utils.CommonEnums import Api, RoadsApi
+SNAP_TO_ROAD_MAX_POINTS = 100
+SNAP_TO_ROAD_OVERLAP = 10
+NEAREST_ROADS_MAX_POINTS = 100
 
 
 class Roads:
     def __init__(self,
                  client):
-        self._api_key = client.api_key
-        self._access_token = client.access_token
+        self._client = client
 
     def snap_to_road(self,
                      points: str,
@@ -46,11 +50,6 @@ class Roads:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["points"] = points
 
         if enhance_path is not None:
@@ -62,29 +61,99 @@ class Roads:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        snap_to_road_api_url = Api.Protocol.value + Api.Host.value + RoadsApi.Snap_To_Road_Endpoint.value
-        response = requests.get(snap_to_road_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        snap_to_road_api_url = self._client.base_url + RoadsApi.Snap_To_Road_Endpoint.value
+        return self._client._request("GET", RoadsApi.Snap_To_Road_Endpoint, snap_to_road_api_url, headers, query_params)
+
+    def bulk_snap_to_road(self,
+                          points: list,
+                          enhance_path: str = None,
+                          window_size: int = SNAP_TO_ROAD_MAX_POINTS,
+                          overlap: int = SNAP_TO_ROAD_OVERLAP,
+                          max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                          x_correlation_id: str = None) -> dict:
+        """
+        Description: Snaps a GPS trace of any length to the road network. The trace is split into overlapping windows
+        of at most `window_size` points which are snapped concurrently. The windows are stitched at the middle of each
+        overlap, so every stretch of road is taken from a window that saw context on both sides and every original
+        point is reported by exactly one window.
+
+        :param points: list
+        Description: The trace, each point either a "lat,lng" string or a (latitude, longitude) pair.
+        Example: ["12.99927894246456,77.67323803525812", (12.992086564113583, 77.65899014102202)]
+
+        :param enhance_path: string
+        Description: If true, response includes additional points between the given snapped points to enrich the path
+        and match the road’s curvature.
+        Example: false or true
+        Default value: None
+
+        :param window_size: integer
+        Description: Points per request. The API accepts at most 100.
+        Default value: 100
+
+        :param overlap: integer
+        Description: Points shared by consecutive windows.
+        Default value: 10
+
+        :param max_concurrency: integer
+        Description: Maximum number of window requests in flight at once.
+        Default value: 8
+
+        :param x_correlation_id: string
+        Description: A UUIDv4 unique over a series of requests and responses, identifying a transaction.
+        Default value: None
+
+        :return: dict
+        Description: {"snapped_points": [...], "errors": [...]} where each snapped point's "original_index" refers to
+        the position in `points`. Failed windows are reported in "errors" as BatchResults whose input is the
+        (start, stop) window, and their stretch of the trace is missing from "snapped_points".
+        """
+        points, windows = self._plan_trace(points, window_size, overlap)
+
+        def snap(window):
+            start, stop = window
+            return self.snap_to_road("|".join(points[start:stop]), enhance_path=enhance_path,
+                                     x_correlation_id=x_correlation_id)
+
+        return self._stitch_trace(len(points), windows, overlap, run_batch(snap, windows, max_concurrency))
+
+    @staticmethod
+    def _plan_trace(points: list,
+                    window_size: int,
+                    overlap: int) -> tuple:
+        points = [format_lat_lng(point) for point in points]
+        return points, plan_windows(len(points), window_size, overlap)
+
+    @staticmethod
+    def _stitch_trace(point_count: int,
+                      windows: list,
+                      overlap: int,
+                      window_results) -> dict:
+        # Window w owns the original indices [cuts[w], cuts[w + 1]), cutting each overlap in the middle.
+        cuts = [0] + [start + overlap // 2 for start, _ in windows[1:]] + [point_count]
+        snapped_points = []
+        errors = []
+
+        for window_index, window_result in enumerate(window_results):
+            if not window_result.ok:
+                errors.append(window_result)
+                continue
+
+            start, _ = window_result.input
+            owned_from, owned_to = cuts[window_index], cuts[window_index + 1]
+            # Points added by enhance_path carry no index; they belong to the last indexed point before them.
+            current_index = start
+
+            for point in window_result.result.get("snapped_points", []):
+                point = dict(point)
+                if point.get("original_index") is not None:
+                    current_index = start + point["original_index"]
+                    point["original_index"] = current_index
+                if not owned_from <= current_index < owned_to:
+                    continue
+                snapped_points.append(point)
+
+        return {"snapped_points": snapped_points, "errors": errors}
 
     def nearest_roads(self,
                       points: str,
@@ -117,11 +186,6 @@ class Roads:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["points"] = points
         query_params["radius"] = radius
 
@@ -131,26 +195,116 @@ class Roads:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        nearest_roads_api_url = Api.Protocol.value + Api.Host.value + RoadsApi.Nearest_Roads_Endpoint.value
-        response = requests.get(nearest_roads_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        nearest_roads_api_url = self._client.base_url + RoadsApi.Nearest_Roads_Endpoint.value
+        return self._client._request("GET", RoadsApi.Nearest_Roads_Endpoint, nearest_roads_api_url, headers,
+                                     query_params)
+
+    def bulk_nearest_roads(self,
+                           points: Iterable,
+                           radius: int = 500,
+                           chunk_size: int = NEAREST_ROADS_MAX_POINTS,
+                           max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                           offset: int = 0,
+                           x_correlation_id: str = None) -> Iterator[BatchResult]:
+        """
+        Description: Nearest roads for any number of points. Points are packed into requests of `chunk_size` points,
+        sent with bounded concurrency and yielded one chunk at a time in input order. The input is consumed lazily, so
+        long jobs can checkpoint after each chunk and resume later.
+
+        :param points: iterable
+        Description: The points, each either a "lat,lng" string or a (latitude, longitude) pair.
+        Example: ["12.99927894246456,77.67323803525812", (12.992086564113583, 77.65899014102202)]
+
+        :param radius: integer
+        Description: Optional (in meters, default 500 meters). When value of radius is between 0 and 1 then it takes
+        the default value of radius.
+        Default value: 500
+
+        :param chunk_size: integer
+        Description: Points per request. The API accepts at most 100.
+        Default value: 100
+
+        :param max_concurrency: integer
+        Description: Maximum number of chunk requests in flight at once.
+        Default value: 8
+
+        :param offset: integer
+        Description: Position of the first point in the overall input. When resuming from a checkpoint, pass the
+        remaining points and the `stop` of the last completed chunk so reported positions stay those of the full job.
+        Default value: 0
+
+        :param x_correlation_id: string
+        Description: A UUIDv4 unique over a series of requests and responses, identifying a transaction.
+        Default value: None
+
+        :return: iterator of BatchResult
+        Description: One BatchResult per chunk in input order. `index` is the chunk number, `input` a Chunk whose
+        `start`/`stop` are the positions of its points in the input, and `result` the nearest roads response for those
+        points, in the same order.
+        """
+        def lookup(chunk):
+            return self.nearest_roads("|".join(format_lat_lng(point) for point in chunk.items), radius=radius,
+                                      x_correlation_id=x_correlation_id)
+
+        return run_batch(lookup, chunked(points, chunk_size, offset), max_concurrency)
+
+
+class AsyncRoads(Roads):
+    async def snap_to_road(self,
+                           points: str,
+                           enhance_path: str = None,
+                           x_request_id: str = None,
+                           x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Roads.snap_to_road`.
+        """
+        return await super().snap_to_road(points=points, enhance_path=enhance_path, x_request_id=x_request_id,
+                                          x_correlation_id=x_correlation_id)
+
+    async def nearest_roads(self,
+                            points: str,
+                            radius: int = 500,
+                            x_request_id: str = None,
+                            x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Roads.nearest_roads`.
+        """
+        return await super().nearest_roads(points=points, radius=radius, x_request_id=x_request_id,
+                                           x_correlation_id=x_correlation_id)
+
+    async def bulk_snap_to_road(self,
+                                points: list,
+                                enhance_path: str = None,
+                                window_size: int = SNAP_TO_ROAD_MAX_POINTS,
+                                overlap: int = SNAP_TO_ROAD_OVERLAP,
+                                max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+                                x_correlation_id: str = None) -> dict:
+        """
+        Description: Async variant of `Roads.bulk_snap_to_road`.
+        """
+        points, windows = self._plan_trace(points, window_size, overlap)
+
+        async def snap(window):
+            start, stop = window
+            return await self.snap_to_road("|".join(points[start:stop]), enhance_path=enhance_path,
+                                           x_correlation_id=x_correlation_id)
+
+        window_results = arun_batch(snap, windows, max_concurrency)
+        return self._stitch_trace(len(points), windows, overlap, [result async for result in window_results])
+
+    async def bulk_nearest_roads(self,
+                                 points: Iterable,
+                                 radius: int = 500,
+                                 chunk_size: int = NEAREST_ROADS_MAX_POINTS,
+                                 max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+                                 offset: int = 0,
+                                 x_correlation_id: str = None) -> AsyncIterator[BatchResult]:
+        """
+        Description: Async variant of `Roads.bulk_nearest_roads`.
+        """
+        async def lookup(chunk):
+            return await self.nearest_roads("|".join(format_lat_lng(point) for point in chunk.items), radius=radius,
+                                            x_correlation_id=x_correlation_id)
+
+        async for result in arun_batch(lookup, chunked(points, chunk_size, offset), max_concurrency):
+            yield result
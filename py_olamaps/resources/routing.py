@@ -1,16 +1,20 @@
-from http import HTTPStatus
+from py_olamaps.exceptions import OlaMapsError
+from py_olamaps.utils.CommonEnums import RoutingApi
+from py_olamaps.utils.batch import DEFAULT_ASYNC_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY, arun_batch, run_batch
+from py_olamaps.utils.coordinates import format_lat_lng
+from py_olamaps.utils.matrix import DistanceMatrixArrays
+from py_olamaps.utils.tiling import MatrixTile, encoded_length, plan_matrix_tiles
 
-import requests
-
-from py_olamaps.exceptions import APIException
-from py_olamaps.utils.CommonEnums import Api, RoutingApi
+DISTANCE_MATRIX_MAX_ELEMENTS = 100
+DISTANCE_MATRIX_MAX_URL_LENGTH = 8000
+# Room left in the URL for the api_key and any other query parameters.
+_URL_OVERHEAD = 256
 
 
 class Routing:
     def __init__(self,
                  client):
-        self._api_key = client.api_key
-        self._access_token = client.access_token
+        self._client = client
 
     def directions(self,
                    origin: str,
@@ -80,11 +84,6 @@ class Routing:
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["origin"] = origin
         query_params["destination"] = destination
 
@@ -115,35 +114,15 @@ class Routing:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        directions_api_url = Api.Protocol.value + Api.Host.value + RoutingApi.Directions_Endpoint.value
-        response = requests.post(directions_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        directions_api_url = self._client.base_url + RoutingApi.Directions_Endpoint.value
+        return self._client._request("POST", RoutingApi.Directions_Endpoint, directions_api_url, headers, query_params)
 
     def distance_matrix(self,
                         origins: str,
                         destinations: str,
                         x_request_id: str = None,
-                        x_correlation_id: str = None) -> dict:
+                        x_correlation_id: str = None,
+                        as_arrays: bool = False) -> dict:
         """
         Description: Provides distance and ETA between different origin and destination points. If there are "x" number
         of origins and "y" number of destinations, the resultant output has "x*y" number of combinations. The origin
@@ -166,16 +145,17 @@ class Routing:
         Description: A UUIDv4 unique over a series of requests and responses, identifying a transaction.
         Default value: None
 
-        :return: dict
+        :param as_arrays: boolean
+        Description: If true, convert the response into a DistanceMatrixArrays of dense NumPy distance, duration and
+        status arrays instead of returning the raw dict. The response is still parsed into the dict first, so this
+        saves no memory on a single call; it only changes the result's shape. Requires numpy.
+        Default value: False
+
+        :return: dict or DistanceMatrixArrays
         """
         query_params = dict()
         headers = dict()
 
-        if self._api_key is None:
-            headers["Authorization"] = f"Bearer {str(self._access_token)}"
-        else:
-            query_params["api_key"] = self._api_key
-
         query_params["origins"] = origins
         query_params["destinations"] = destinations
 
@@ -185,26 +165,195 @@ class Routing:
         if x_correlation_id is not None:
             headers["x_correlation_id"] = x_correlation_id
 
-        distance_matrix_api_url = Api.Protocol.value + Api.Host.value + RoutingApi.Distance_Matrix_Endpoint.value
-        response = requests.get(distance_matrix_api_url, headers=headers, params=query_params)
-
-        if response.status_code == HTTPStatus.OK:
-            return response.json()
-        elif response.status_code == HTTPStatus.BAD_REQUEST:
-            raise APIException(HTTPStatus.BAD_REQUEST.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNAUTHORIZED:
-            raise APIException(HTTPStatus.UNAUTHORIZED.description, response, query_params)
-        elif response.status_code == HTTPStatus.FORBIDDEN:
-            raise APIException(HTTPStatus.FORBIDDEN.description, response, query_params)
-        elif response.status_code == HTTPStatus.NOT_FOUND:
-            raise APIException(HTTPStatus.NOT_FOUND.description, response, query_params)
-        elif response.status_code == HTTPStatus.CONFLICT:
-            raise APIException(HTTPStatus.CONFLICT.description, response, query_params)
-        elif response.status_code == HTTPStatus.UNPROCESSABLE_ENTITY:
-            raise APIException(HTTPStatus.UNPROCESSABLE_ENTITY.description, response, query_params)
-        elif response.status_code == HTTPStatus.TOO_MANY_REQUESTS:
-            raise APIException(HTTPStatus.TOO_MANY_REQUESTS.value, response, query_params)
-        elif response.status_code >= HTTPStatus.INTERNAL_SERVER_ERROR:
-            raise APIException(HTTPStatus.INTERNAL_SERVER_ERROR.description, response, query_params)
-        else:
-            raise APIException("Unknown Error", response, query_params)
+        distance_matrix_api_url = self._client.base_url + RoutingApi.Distance_Matrix_Endpoint.value
+        response = self._client._request("GET", RoutingApi.Distance_Matrix_Endpoint, distance_matrix_api_url, headers,
+                                         query_params)
+
+        if as_arrays:
+            return DistanceMatrixArrays.from_response(response)
+        return response
+
+    def bulk_distance_matrix(self,
+                             origins: list,
+                             destinations: list,
+                             max_elements: int = DISTANCE_MATRIX_MAX_ELEMENTS,
+                             max_url_length: int = DISTANCE_MATRIX_MAX_URL_LENGTH,
+                             max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+                             x_correlation_id: str = None,
+                             as_arrays: bool = False) -> dict:
+        """
+        Description: Distance and ETA between every origin and destination for matrices of any size. The matrix is
+        split into the fewest evenly sized sub-matrices that respect `max_elements` and `max_url_length`, the blocks are
+        fetched concurrently and stitched back together.
+
+        :param origins: list
+        Description: Origin coordinates, each either a "lat,lng" string or a (latitude, longitude) pair.
+        Example: ["28.71866756826579,77.03699668376802", (28.638555357785652, 76.96550156007675)]
+
+        :param destinations: list
+        Description: Destination coordinates, each either a "lat,lng" string or a (latitude, longitude) pair.
+        Example: ["28.638555357785652,76.96550156007675", (28.53966907108812, 77.05190669909288)]
+
+        :param max_elements: integer
+        Description: Maximum number of origin/destination pairs per request.
+        Default value: 100
+
+        :param max_url_length: integer
+        Description: Maximum length of a request URL.
+        Default value: 8000
+
+        :param max_concurrency: integer
+        Description: Maximum number of block requests in flight at once.
+        Default value: 8
+
+        :param x_correlation_id: string
+        Description: A UUIDv4 unique over a series of requests and responses, identifying a transaction.
+        Default value: None
+
+        :param as_arrays: boolean
+        Description: If true, each block's parsed response is copied straight into preallocated NumPy arrays as it
+        arrives and a DistanceMatrixArrays is returned instead of the dict. This avoids building the stitched nested
+        dict of the whole matrix; each block is still parsed into a dict first. Requires numpy.
+        Default value: False
+
+        :return: dict or DistanceMatrixArrays
+        Description: {"rows": [{"elements": [...]}, ...], "errors": [...]} where rows[i]["elements"][j] is the element
+        for origins[i] and destinations[j]. Elements of a block whose request failed, or whose response is missing
+        rows or elements, are None, and the failure is reported in "errors" as a BatchResult whose input is the
+        MatrixTile. With `as_arrays`, such pairs have
+        STATUS_MISSING and the failures are in `errors`.
+        """
+        origins, destinations, tiles = self._plan_distance_matrix(origins, destinations, max_elements, max_url_length)
+
+        def fetch(tile):
+            return self.distance_matrix("|".join(origins[tile.origin_start:tile.origin_stop]),
+                                        "|".join(destinations[tile.destination_start:tile.destination_stop]),
+                                        x_correlation_id=x_correlation_id)
+
+        matrix = self._new_distance_matrix(len(origins), len(destinations), as_arrays)
+        for tile_result in run_batch(fetch, tiles, max_concurrency, ordered=False):
+            self._add_distance_matrix_tile(matrix, tile_result)
+        return matrix
+
+    def _plan_distance_matrix(self,
+                              origins: list,
+                              destinations: list,
+                              max_elements: int,
+                              max_url_length: int) -> tuple:
+        origins = [format_lat_lng(origin) for origin in origins]
+        destinations = [format_lat_lng(destination) for destination in destinations]
+
+        overhead = len(self._client.base_url + RoutingApi.Distance_Matrix_Endpoint.value) + _URL_OVERHEAD
+        max_coordinates = (max_url_length - overhead) // max(encoded_length(origins), encoded_length(destinations))
+        tiles = plan_matrix_tiles(len(origins), len(destinations), max_elements, max_coordinates)
+        return origins, destinations, tiles
+
+    @staticmethod
+    def _new_distance_matrix(origin_count: int,
+                             destination_count: int,
+                             as_arrays: bool):
+        if as_arrays:
+            return DistanceMatrixArrays(origin_count, destination_count)
+        return {"rows": [{"elements": [None] * destination_count} for _ in range(origin_count)], "errors": []}
+
+    @staticmethod
+    def _add_distance_matrix_tile(matrix, tile_result):
+        tile = tile_result.input
+        if tile_result.ok:
+            problem = Routing._distance_matrix_tile_problem(tile, tile_result.result)
+            if problem is not None:
+                tile_result = tile_result._replace(result=None,
+                                                   error=OlaMapsError(f"Malformed distance matrix block: {problem}"))
+
+        if isinstance(matrix, DistanceMatrixArrays):
+            if tile_result.ok:
+                matrix.fill(tile_result.result["rows"], tile.origin_start, tile.destination_start)
+            else:
+                matrix.errors.append(tile_result)
+            return
+
+        if not tile_result.ok:
+            matrix["errors"].append(tile_result)
+            return
+        for offset, row in enumerate(tile_result.result["rows"]):
+            matrix["rows"][tile.origin_start + offset]["elements"][tile.destination_start:tile.destination_stop] = \
+                row["elements"]
+
+    @staticmethod
+    def _distance_matrix_tile_problem(tile: MatrixTile, result) -> str:
+        # Checked before anything is copied, so that a malformed block never leaves a partially filled matrix.
+        rows = result.get("rows") if isinstance(result, dict) else None
+        if not isinstance(rows, list):
+            return "no rows"
+        if len(rows) != tile.origin_stop - tile.origin_start:
+            return f"{len(rows)} rows instead of {tile.origin_stop - tile.origin_start}"
+        for offset, row in enumerate(rows):
+            elements = row.get("elements") if isinstance(row, dict) else None
+            if not isinstance(elements, list) or not all(isinstance(element, dict) for element in elements):
+                return f"row {offset} has no elements"
+            if len(elements) != tile.destination_stop - tile.destination_start:
+                return (f"row {offset} has {len(elements)} elements instead of "
+                        f"{tile.destination_stop - tile.destination_start}")
+        return None
+
+
+class AsyncRouting(Routing):
+    async def directions(self,
+                         origin: str,
+                         destination: str,
+                         waypoints: str = None,
+                         mode: str = None,
+                         alternatives: bool = None,
+                         steps: bool = None,
+                         overview: str = None,
+                         languages: str = None,
+                         traffic_metadata: bool = None,
+                         x_request_id: str = None,
+                         x_correlation_id: str = None
+                         ) -> dict:
+        """
+        Description: Async variant of `Routing.directions`.
+        """
+        return await super().directions(origin=origin, destination=destination, waypoints=waypoints, mode=mode,
+                                        alternatives=alternatives, steps=steps, overview=overview, languages=languages,
+                                        traffic_metadata=traffic_metadata, x_request_id=x_request_id,
+                                        x_correlation_id=x_correlation_id)
+
+    async def distance_matrix(self,
+                              origins: str,
+                              destinations: str,
+                              x_request_id: str = None,
+                              x_correlation_id: str = None,
+                              as_arrays: bool = False) -> dict:
+        """
+        Description: Async variant of `Routing.distance_matrix`.
+        """
+        response = await super().distance_matrix(origins=origins, destinations=destinations,
+                                                 x_request_id=x_request_id, x_correlation_id=x_correlation_id)
+
+        if as_arrays:
+            return DistanceMatrixArrays.from_response(response)
+        return response
+
+    async def bulk_distance_matrix(self,
+                                   origins: list,
+                                   destinations: list,
+                                   max_elements: int = DISTANCE_MATRIX_MAX_ELEMENTS,
+                                   max_url_length: int = DISTANCE_MATRIX_MAX_URL_LENGTH,
+                                   max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+                                   x_correlation_id: str = None,
+                                   as_arrays: bool = False) -> dict:
+        """
+        Description: Async variant of `Routing.bulk_distance_matrix`.
+        """
+        origins, destinations, tiles = self._plan_distance_matrix(origins, destinations, max_elements, max_url_length)
+
+        async def fetch(tile):
+            return await self.distance_matrix("|".join(origins[tile.origin_start:tile.origin_stop]),
+                                              "|".join(destinations[tile.destination_start:tile.destination_stop]),
+                                              x_correlation_id=x_correlation_id)
+
+        matrix = self._new_distance_matrix(len(origins), len(destinations), as_arrays)
+        async for tile_result in arun_batch(fetch, tiles, max_concurrency, ordered=False):
+            self._add_distance_matrix_tile(matrix, tile_result)
+        return matrix
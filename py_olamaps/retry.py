@@ -0,0 +1,218 @@
+import collections
+import datetime
+import email.utils
+import math
+import random
+import threading
+import time
+from enum import Enum
+from http import HTTPStatus
+
+import requests
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_RETRY_STATUSES = (
+    HTTPStatus.TOO_MANY_REQUESTS,
+    HTTPStatus.INTERNAL_SERVER_ERROR,
+    HTTPStatus.BAD_GATEWAY,
+    HTTPStatus.SERVICE_UNAVAILABLE,
+    HTTPStatus.GATEWAY_TIMEOUT,
+)
+DEFAULT_RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout) + (
+    (httpx.TransportError,) if httpx is not None else ())
+IDEMPOTENT_METHODS = ("GET", "HEAD", "OPTIONS")
+
+
+class RetryBudget:
+    def __init__(self,
+                 ratio: float = 0.2,
+                 min_retries_per_second: float = 1.0,
+                 window: float = 10.0):
+        """
+        Description: Caps retries at a fraction of the requests made recently, so that when the upstream is down the
+        client adds at most `ratio` extra load instead of multiplying it by the number of attempts. Thread-safe.
+
+        :param ratio: float
+        Description: Retries allowed per request over the last `window` seconds.
+        Default value: 0.2
+
+        :param min_retries_per_second: float
+        Description: Retries always allowed regardless of traffic, so that a low-volume client can still retry.
+        Default value: 1.0
+
+        :param window: float
+        Description: Length in seconds of the sliding window requests and retries are counted over.
+        Default value: 10.0
+        """
+        self.ratio = ratio
+        self.min_retries_per_second = min_retries_per_second
+        self.window = window
+        self._requests = collections.deque()
+        self._retries = collections.deque()
+        self._lock = threading.Lock()
+
+    def _expire(self, events: collections.deque, now: float):
+        while events and events[0] <= now - self.window:
+            events.popleft()
+
+    def record_request(self):
+        now = time.monotonic()
+        with self._lock:
+            self._expire(self._requests, now)
+            self._requests.append(now)
+
+    def try_spend(self) -> bool:
+        """
+        Description: Records a retry and returns True if the budget allows it, otherwise returns False.
+        """
+        now = time.monotonic()
+        with self._lock:
+            self._expire(self._requests, now)
+            self._expire(self._retries, now)
+            allowed = self.min_retries_per_second * self.window + self.ratio * len(self._requests)
+            if len(self._retries) >= allowed:
+                return False
+            self._retries.append(now)
+            return True
+
+
+class RetryPolicy:
+    def __init__(self,
+                 max_attempts: int = 3,
+                 backoff_factor: float = 0.5,
+                 max_backoff: float = 30.0,
+                 jitter: bool = True,
+                 retry_statuses: tuple = DEFAULT_RETRY_STATUSES,
+                 retry_exceptions: tuple = DEFAULT_RETRY_EXCEPTIONS,
+                 retry_methods: tuple = IDEMPOTENT_METHODS,
+                 respect_retry_after: bool = True,
+                 max_retry_after: float = 60.0,
+                 budget: RetryBudget = None,
+                 endpoint_policies: dict = None):
+        """
+        Description: When and how the client retries a failed request. Attempt n waits up to
+        `backoff_factor * 2 ** (n - 1)` seconds (capped at `max_backoff`) before the next one, or as long as the
+        response's `Retry-After` header asks. Only idempotent methods are retried.
+
+        :param max_attempts: integer
+        Description: Total number of attempts including the first one. 1 disables retries.
+        Default value: 3
+
+        :param backoff_factor: float
+        Description: Base of the exponential backoff in seconds.
+        Default value: 0.5
+
+        :param max_backoff: float
+        Description: Upper bound of a single backoff in seconds.
+        Default value: 30.0
+
+        :param jitter: boolean
+        Description: Wait a uniformly random time between 0 and the backoff ("full jitter") so that clients failing
+        together do not retry in lockstep.
+        Default value: True
+
+        :param retry_statuses: tuple
+        Description: HTTP status codes that are retried.
+        Default value: (429, 500, 502, 503, 504)
+
+        :param retry_exceptions: tuple
+        Description: Transport exception types that are retried.
+        Default value: connection errors and timeouts of requests and httpx
+
+        :param retry_methods: tuple
+        Description: HTTP methods that are safe to retry.
+        Default value: ("GET", "HEAD", "OPTIONS")
+
+        :param respect_retry_after: boolean
+        Description: Wait as long as a `Retry-After` header (seconds or HTTP date) asks instead of the backoff.
+        Default value: True
+
+        :param max_retry_after: float
+        Description: A `Retry-After` longer than this many seconds is not waited for; the failure is returned at once.
+        Default value: 60.0
+
+        :param budget: RetryBudget
+        Description: Retry budget shared by all endpoints of the client. Budgets of policies in `endpoint_policies`
+        are ignored.
+        Default value: RetryBudget()
+
+        :param endpoint_policies: dict
+        Description: Per-endpoint policies keyed by endpoint enum member. None disables retries for that endpoint.
+        Example: {RoutingApi.Directions_Endpoint: RetryPolicy(max_attempts=5), PlacesApi.Autocomplete_Endpoint: None}
+        Default value: None
+        """
+        self.max_attempts = max_attempts
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.retry_statuses = tuple(retry_statuses)
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.retry_methods = tuple(method.upper() for method in retry_methods)
+        self.respect_retry_after = respect_retry_after
+        self.max_retry_after = max_retry_after
+        self.budget = budget if budget is not None else RetryBudget()
+        self.endpoint_policies = dict(endpoint_policies or {})
+
+    def for_endpoint(self, endpoint: Enum):
+        return self.endpoint_policies.get(endpoint, self)
+
+    def backoff(self, attempt: int) -> float:
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** (attempt - 1))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    @staticmethod
+    def retry_after(response) -> float:
+        """
+        Description: Seconds asked for by the response's `Retry-After` header, or None if it has none.
+        """
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        value = value.strip()
+        try:
+            seconds = float(value)
+        except ValueError:
+            try:
+                date = email.utils.parsedate_to_datetime(value)
+            except (TypeError, ValueError):
+                return None
+            if date.tzinfo is None:
+                date = date.replace(tzinfo=datetime.timezone.utc)
+            seconds = (date - datetime.datetime.now(datetime.timezone.utc)).total_seconds()
+        if math.isnan(seconds):
+            return None
+        return max(0.0, seconds)
+
+    def retry_delay(self,
+                    method: str,
+                    attempt: int,
+                    budget: RetryBudget,
+                    response=None,
+                    error: Exception = None) -> float:
+        """
+        Description: Seconds to wait before retrying attempt number `attempt`, which ended with `response` or raised
+        `error`, or None if it must not be retried.
+        """
+        if attempt >= self.max_attempts or method.upper() not in self.retry_methods:
+            return None
+        if error is not None:
+            if not isinstance(error, self.retry_exceptions):
+                return None
+        elif response.status_code not in self.retry_statuses:
+            return None
+
+        delay = self.backoff(attempt)
+        if response is not None and self.respect_retry_after:
+            retry_after = self.retry_after(response)
+            if retry_after is not None:
+                if retry_after > self.max_retry_after:
+                    return None
+                delay = retry_after
+
+        if not budget.try_spend():
+            return None
+        return delay
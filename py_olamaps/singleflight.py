@@ -0,0 +1,71 @@
+import asyncio
+import threading
+from typing import Callable
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    def __init__(self):
+        """
+        Description: Coalesces identical calls made at the same time from several threads. The first caller for a key
+        runs the function; callers arriving while it is in flight wait for it and receive the same result or exception.
+        Nothing is remembered once the call completes.
+        """
+        self._calls = {}
+        self._lock = threading.Lock()
+        self.shared = 0
+
+    def do(self, key: str, function: Callable):
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            else:
+                self.shared += 1
+
+        if not leader:
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = function()
+            return call.result
+        except BaseException as error:
+            call.error = error
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+
+class AsyncSingleFlight:
+    def __init__(self):
+        """
+        Description: Asyncio counterpart of `SingleFlight`. The call runs in its own task, so cancelling one of the
+        waiting callers does not cancel it for the others.
+        """
+        self._tasks = {}
+        self.shared = 0
+
+    async def do(self, key: str, function: Callable):
+        task = self._tasks.get(key)
+        if task is None:
+            task = self._tasks[key] = asyncio.ensure_future(function())
+            task.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.shared += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key: str, task: asyncio.Future):
+        if self._tasks.get(key) is task:
+            del self._tasks[key]
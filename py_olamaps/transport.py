@@ -0,0 +1,174 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+from py_olamaps.exceptions import OlaMapsError
+
+try:
+    import httpx
+except ImportError:
+    httpx = None
+
+DEFAULT_TIMEOUT = (10, 30)
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+
+class Transport:
+    def __init__(self,
+                 pool_connections: int = DEFAULT_POOL_CONNECTIONS,
+                 pool_maxsize: int = DEFAULT_POOL_MAXSIZE,
+                 pool_block: bool = False,
+                 timeout: tuple = DEFAULT_TIMEOUT,
+                 session: requests.Session = None):
+        """
+        Description: Pooled HTTP transport shared by every resource of a client. Connections to api.olamaps.io and
+        account.olamaps.io are kept alive and reused, so only the first call to each host pays the TCP + TLS handshake.
+
+        Any object exposing `request(method, url, headers=None, params=None, data=None, timeout=None, stream=False)`
+        and `close()` can be passed to `OlaMaps(transport=...)` instead of this class.
+
+        :param pool_connections: integer
+        Description: Number of per-host connection pools to cache.
+        Default value: 10
+
+        :param pool_maxsize: integer
+        Description: Maximum number of keep-alive connections kept per host. Set this to at least the number of
+        threads sharing the client.
+        Default value: 10
+
+        :param pool_block: boolean
+        Description: If true, callers wait for a free connection instead of opening a throwaway one once the pool is
+        exhausted.
+        Default value: False
+
+        :param timeout: float or tuple
+        Description: Default timeout in seconds, either a single value or a (connect, read) tuple.
+        Default value: (10, 30)
+
+        :param session: requests.Session
+        Description: An existing session to mount the pooled adapters on.
+        Default value: None
+        """
+        self.timeout = timeout
+        self._session = session if session is not None else requests.Session()
+
+        adapter = HTTPAdapter(pool_connections=pool_connections,
+                              pool_maxsize=pool_maxsize,
+                              pool_block=pool_block)
+        self._session.mount("https://", adapter)
+        self._session.mount("http://", adapter)
+
+    def request(self,
+                method: str,
+                url: str,
+                headers: dict = None,
+                params: dict = None,
+                data: dict = None,
+                timeout: tuple = None,
+                stream: bool = False) -> requests.Response:
+        return self._session.request(method,
+                                     url,
+                                     headers=headers,
+                                     params=params,
+                                     data=data,
+                                     timeout=self.timeout if timeout is None else timeout,
+                                     stream=stream)
+
+    def close(self):
+        self._session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class AsyncTransport:
+    def __init__(self,
+                 max_connections: int = 1000,
+                 max_keepalive_connections: int = 100,
+                 keepalive_expiry: float = 30.0,
+                 timeout: tuple = DEFAULT_TIMEOUT,
+                 http2: bool = False,
+                 client=None):
+        """
+        Description: Non-blocking pooled HTTP transport used by `AsyncOlaMaps`, backed by `httpx.AsyncClient`. Requires
+        the optional `httpx` dependency (`pip install py-olamaps[async]`).
+
+        Any object exposing a coroutine `request(method, url, headers=None, params=None, data=None, timeout=None,
+        stream=False)` and a coroutine `aclose()` can be passed to `AsyncOlaMaps(transport=...)` instead of this class.
+
+        :param max_connections: integer
+        Description: Maximum number of concurrent connections, i.e. in-flight requests, across all hosts.
+        Default value: 1000
+
+        :param max_keepalive_connections: integer
+        Description: Maximum number of idle keep-alive connections kept open.
+        Default value: 100
+
+        :param keepalive_expiry: float
+        Description: Seconds an idle keep-alive connection is kept before being closed.
+        Default value: 30.0
+
+        :param timeout: float or tuple
+        Description: Default timeout in seconds, either a single value or a (connect, read) tuple.
+        Default value: (10, 30)
+
+        :param http2: boolean
+        Description: If true, multiplex requests over HTTP/2 connections. Requires the `h2` package.
+        Default value: False
+
+        :param client: httpx.AsyncClient
+        Description: An existing client to send requests with, ignoring the pool options above.
+        Default value: None
+        """
+        if httpx is None:
+            raise OlaMapsError("AsyncOlaMaps requires httpx. Install it with `pip install py-olamaps[async]`.")
+
+        self.timeout = timeout
+        if client is None:
+            limits = httpx.Limits(max_connections=max_connections,
+                                  max_keepalive_connections=max_keepalive_connections,
+                                  keepalive_expiry=keepalive_expiry)
+            client = httpx.AsyncClient(limits=limits, http2=http2)
+        self._client = client
+
+    async def request(self,
+                      method: str,
+                      url: str,
+                      headers: dict = None,
+                      params: dict = None,
+                      data: dict = None,
+                      timeout: tuple = None,
+                      stream: bool = False) -> "httpx.Response":
+        request = self._client.build_request(method,
+                                             url,
+                                             headers=headers,
+                                             params=self._encode_params(params),
+                                             data=data,
+                                             timeout=self._httpx_timeout(self.timeout if timeout is None else timeout))
+        return await self._client.send(request, stream=stream)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.aclose()
+
+    @staticmethod
+    def _encode_params(params: dict) -> dict:
+        # requests sends booleans as "True"/"False" while httpx sends "true"/"false"; keep the sync wire format.
+        if params is None:
+            return None
+        return {key: str(value) if isinstance(value, bool) else value for key, value in params.items()}
+
+    @staticmethod
+    def _httpx_timeout(timeout):
+        if isinstance(timeout, tuple):
+            connect, read = timeout
+            return httpx.Timeout(read, connect=connect)
+        return httpx.Timeout(timeout)
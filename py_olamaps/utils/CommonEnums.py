@@ -40,6 +40,7 @@ class MapTilesApi(Enum):
     Get_Array_Of_Data_Endpoint = "/tiles/vector/v1/data/{datasetName}.json"
     Get_Map_Endpoint = "/tiles/vector/v1/styles.json"
     Get_Style_Endpoint = "/tiles/vector/v1/styles/{styleName}/style.json"
+    Vector_Tile_Endpoint = "/tiles/vector/v1/data/{datasetName}/{z}/{x}/{y}.pbf"
     Static_Map_Image_Based_On_Center_Point_Endpoint = "/tiles/v1/styles/{styleName}/static/{lon},{lat},{zoom}/{width}x{height}.{format}"
     Static_Map_Image_Based_On_Bounding_Box_Endpoint = "/tiles/v1/styles/{styleName}/static/{minx},{miny},{maxx},{maxy}/{width}x{height}.{format}"
     Static_Map_Image_Based_Endpoint = "/tiles/v1/styles/{styleName}/static/auto/{width}x{height}.{format}"
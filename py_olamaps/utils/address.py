@@ -0,0 +1,24 @@
+import re
+import unicodedata
+
+_WHITESPACE = re.compile(r"\s+")
+_SEPARATOR = re.compile(r"\s*([,;|/-])\s*")
+_EDGE_PUNCTUATION = re.compile(r"^[\s,;.|/-]+|[\s,;.|/-]+$")
+
+
+def normalize_address(address: str) -> str:
+    """
+    Description: Canonical form of a free-text address used to detect duplicates: Unicode-normalized, case-folded,
+    with whitespace collapsed, spacing around separators unified and leading/trailing punctuation removed.
+
+    :param address: string
+    Description: The address to normalize.
+    Example: "  Koramangala ,  Bengaluru. "
+
+    :return: string
+    Example: "koramangala,bengaluru"
+    """
+    address = unicodedata.normalize("NFKC", address).casefold()
+    address = _WHITESPACE.sub(" ", address)
+    address = _SEPARATOR.sub(r"\1", address)
+    return _EDGE_PUNCTUATION.sub("", address)
@@ -0,0 +1,198 @@
+import asyncio
+import collections
+import re
+import threading
+import unicodedata
+import uuid
+
+DEFAULT_DEBOUNCE = 0.25
+DEFAULT_MIN_PREFIX_RESULTS = 3
+DEFAULT_SESSION_CACHE_SIZE = 256
+
+_WORD = re.compile(r"\w+")
+
+
+def _normalize_input(input: str) -> str:
+    return " ".join(unicodedata.normalize("NFKC", input).casefold().split())
+
+
+def _matches(prediction: dict, words: list) -> bool:
+    text = prediction.get("description") or prediction.get("structured_formatting", {}).get("main_text") or ""
+    candidates = _WORD.findall(unicodedata.normalize("NFKC", text).casefold())
+    return all(any(candidate.startswith(word) for candidate in candidates) for word in words)
+
+
+class BaseAutocompleteSession:
+    def __init__(self,
+                 places,
+                 origin: str = None,
+                 location: str = None,
+                 radius: int = 0,
+                 strictbounds: bool = None,
+                 debounce: float = DEFAULT_DEBOUNCE,
+                 min_length: int = 1,
+                 min_prefix_results: int = DEFAULT_MIN_PREFIX_RESULTS,
+                 cache_size: int = DEFAULT_SESSION_CACHE_SIZE,
+                 x_correlation_id: str = None):
+        """
+        Description: Typeahead session over `Places.autocomplete`. Feed it every partial input with `update`; inputs
+        are debounced, superseded ones are dropped, and answers are served without a request when the session has
+        already seen the input or can narrow down the results of a prefix of it. Every request of the session shares
+        the same `origin`/`location` context and correlation id. Create one with `Places.autocomplete_session`.
+
+        :param debounce: float
+        Description: Seconds an input must stay the latest before it is looked up.
+        Default value: 0.25
+
+        :param min_length: integer
+        Description: Inputs shorter than this are not looked up.
+        Default value: 1
+
+        :param min_prefix_results: integer
+        Description: An input is answered from the cached results of its longest already-answered prefix when at least
+        this many of those predictions still match it. 0 disables prefix reuse.
+        Default value: 3
+
+        :param cache_size: integer
+        Description: Answers kept by the session.
+        Default value: 256
+
+        :param x_correlation_id: string
+        Description: Correlation id sent with every request of the session.
+        Default value: a new UUIDv4
+        """
+        self._places = places
+        self.origin = origin
+        self.location = location
+        self.radius = radius
+        self.strictbounds = strictbounds
+        self.debounce = debounce
+        self.min_length = min_length
+        self.min_prefix_results = min_prefix_results
+        self.cache_size = cache_size
+        self.x_correlation_id = x_correlation_id if x_correlation_id is not None else str(uuid.uuid4())
+        self.requests = 0
+        self.cache_hits = 0
+        self.prefix_hits = 0
+        self.superseded = 0
+        self._results = collections.OrderedDict()
+        self._results_lock = threading.Lock()
+
+    def _lookup(self, key: str) -> dict:
+        with self._results_lock:
+            result = self._results.get(key)
+            if result is not None:
+                self._results.move_to_end(key)
+                self.cache_hits += 1
+                return result
+
+            if self.min_prefix_results <= 0:
+                return None
+            for length in range(len(key) - 1, self.min_length - 1, -1):
+                prefix_result = self._results.get(key[:length])
+                if prefix_result is None:
+                    continue
+                words = key.split()
+                predictions = [prediction for prediction in prefix_result.get("predictions", [])
+                               if _matches(prediction, words)]
+                if len(predictions) < self.min_prefix_results:
+                    return None
+                self.prefix_hits += 1
+                return dict(prefix_result, predictions=predictions)
+            return None
+
+    def _count_request(self):
+        with self._results_lock:
+            self.requests += 1
+
+    def _store(self, key: str, result: dict):
+        with self._results_lock:
+            self._results[key] = result
+            self._results.move_to_end(key)
+            while len(self._results) > self.cache_size:
+                self._results.popitem(last=False)
+
+    def _autocomplete_options(self) -> dict:
+        return dict(origin=self.origin, location=self.location, radius=self.radius, strictbounds=self.strictbounds,
+                    x_correlation_id=self.x_correlation_id)
+
+    def stats(self) -> dict:
+        return {"requests": self.requests, "cache_hits": self.cache_hits, "prefix_hits": self.prefix_hits,
+                "superseded": self.superseded}
+
+
+class AutocompleteSession(BaseAutocompleteSession):
+    def __init__(self, places, **options):
+        super().__init__(places, **options)
+        self._condition = threading.Condition()
+        self._generation = 0
+
+    def update(self, input: str) -> dict:
+        """
+        Description: Looks up `input` once it has been the latest input for `debounce` seconds. Blocks until then and
+        returns the autocomplete response, or None if a newer input arrived in the meantime (in which case the result
+        of a request already in flight is cached but dropped) or the input is shorter than `min_length`.
+
+        :param input: string
+        Example: kempe
+
+        :return: dict
+        """
+        with self._condition:
+            self._generation += 1
+            generation = self._generation
+            self._condition.notify_all()
+            if self._condition.wait_for(lambda: self._generation != generation, timeout=self.debounce):
+                self.superseded += 1
+                return None
+
+        key = _normalize_input(input)
+        if len(key) < self.min_length:
+            return None
+        result = self._lookup(key)
+        if result is None:
+            self._count_request()
+            result = self._places.autocomplete(input, **self._autocomplete_options())
+            self._store(key, result)
+
+        with self._condition:
+            if self._generation != generation:
+                self.superseded += 1
+                return None
+        return result
+
+
+class AsyncAutocompleteSession(BaseAutocompleteSession):
+    def __init__(self, places, **options):
+        super().__init__(places, **options)
+        self._task = None
+
+    async def update(self, input: str) -> dict:
+        """
+        Description: Async variant of `AutocompleteSession.update`. A newer input cancels the debounce or the
+        in-flight request of the previous one, whose `update` then returns None.
+        """
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        task = self._task = asyncio.ensure_future(self._run(input))
+        try:
+            await asyncio.wait([task])
+        finally:
+            if not task.done():
+                task.cancel()
+        if task.cancelled():
+            self.superseded += 1
+            return None
+        return task.result()
+
+    async def _run(self, input: str) -> dict:
+        await asyncio.sleep(self.debounce)
+        key = _normalize_input(input)
+        if len(key) < self.min_length:
+            return None
+        result = self._lookup(key)
+        if result is None:
+            self._count_request()
+            result = await self._places.autocomplete(input, **self._autocomplete_options())
+            self._store(key, result)
+        return result
@@ -0,0 +1,248 @@
+import asyncio
+import collections
+import itertools
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, Callable, Iterable, Iterator, NamedTuple
+
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_ASYNC_MAX_CONCURRENCY = 64
+
+
+class BatchResult(NamedTuple):
+    """
+    Outcome of one item of a bulk call. Exactly one of `result` and `error` is set.
+    """
+    index: int
+    input: Any
+    result: Any = None
+    error: BaseException = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+class DeduplicatedBatch(NamedTuple):
+    """
+    Outcome of a deduplicated bulk call. `results` holds one `BatchResult` per input item, in input order;
+    `upstream_calls` is the number of requests actually issued and `calls_saved` the number avoided by deduplication.
+    """
+    results: list
+    upstream_calls: int
+    calls_saved: int
+
+
+class Chunk(NamedTuple):
+    """
+    A slice items[start:stop] of a chunked bulk input.
+    """
+    start: int
+    stop: int
+    items: list
+
+
+def chunked(items: Iterable,
+            size: int,
+            offset: int = 0) -> Iterator[Chunk]:
+    """
+    Description: Lazily groups `items` into chunks of at most `size` items. Positions are counted from `offset`, so a
+    job resumed from a checkpoint keeps the indices of the original input.
+    """
+    if size < 1:
+        raise ValueError("size must be at least 1")
+
+    iterator = iter(items)
+    start = offset
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield Chunk(start, start + len(chunk), chunk)
+        start += len(chunk)
+
+
+def _call(function: Callable, index: int, item) -> BatchResult:
+    try:
+        return BatchResult(index, item, function(item))
+    except Exception as error:
+        return BatchResult(index, item, error=error)
+
+
+def run_batch(function: Callable,
+              items: Iterable,
+              max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+              ordered: bool = True) -> Iterator[BatchResult]:
+    """
+    Description: Calls `function` on every item of `items` from a pool of `max_concurrency` threads and yields a
+    `BatchResult` per item, either in input order or in completion order. `items` is consumed lazily and at most
+    2 * `max_concurrency` items are pending at any time, so arbitrarily long generators stream through in constant
+    memory. Exceptions raised by `function` are captured on the item instead of aborting the batch.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    window = 2 * max_concurrency
+    iterator = enumerate(items)
+    executor = ThreadPoolExecutor(max_workers=max_concurrency)
+    pending = collections.deque() if ordered else set()
+
+    def submit_next() -> bool:
+        for index, item in iterator:
+            future = executor.submit(_call, function, index, item)
+            if ordered:
+                pending.append(future)
+            else:
+                pending.add(future)
+            return True
+        return False
+
+    try:
+        while len(pending) < window and submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                pending.difference_update(done)
+
+            for future in done:
+                submit_next()
+                yield future.result()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def _group_by_key(items: Iterable, key: Callable) -> tuple:
+    items = list(items)
+    groups = dict()
+    failures = []
+    for index, item in enumerate(items):
+        try:
+            groups.setdefault(key(item), []).append(index)
+        except Exception as error:
+            # An item without a usable key (e.g. None from a CSV feed) fails on its own instead of aborting the batch.
+            failures.append(BatchResult(index, item, error=error))
+    return items, groups, failures
+
+
+def _spread(items: list, groups: dict, unique_results, failures: list) -> list:
+    results = [None] * len(items)
+    for failure in failures:
+        results[failure.index] = failure
+    for unique_result in unique_results:
+        for index in groups[unique_result.input]:
+            results[index] = unique_result._replace(index=index, input=items[index])
+    return results
+
+
+def run_deduplicated_batch(function: Callable,
+                           items: Iterable,
+                           key: Callable,
+                           max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> DeduplicatedBatch:
+    """
+    Description: Calls `function` once per distinct `key(item)` of the batch, concurrently, and copies each outcome
+    back to every item sharing that key. `function` receives the first item seen for each key. Items for which `key`
+    raises get a failed `BatchResult` without a call.
+    """
+    items, groups, failures = _group_by_key(items, key)
+    representatives = {group_key: items[indices[0]] for group_key, indices in groups.items()}
+
+    unique_results = run_batch(lambda group_key: function(representatives[group_key]),
+                               groups, max_concurrency, ordered=False)
+    results = _spread(items, groups, unique_results, failures)
+    return DeduplicatedBatch(results, len(groups), len(items) - len(failures) - len(groups))
+
+
+async def _acall(function: Callable, index: int, item) -> BatchResult:
+    try:
+        return BatchResult(index, item, await function(item))
+    except Exception as error:
+        return BatchResult(index, item, error=error)
+
+
+async def arun_batch(function: Callable,
+                     items,
+                     max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY,
+                     ordered: bool = True) -> AsyncIterator[BatchResult]:
+    """
+    Description: Asyncio counterpart of `run_batch`. `function` is a coroutine function and `items` may be a regular
+    or an async iterable. At most `max_concurrency` calls are in flight at once.
+    """
+    if max_concurrency < 1:
+        raise ValueError("max_concurrency must be at least 1")
+
+    if hasattr(items, "__aiter__"):
+        iterator = items.__aiter__()
+    else:
+        iterator = _aiter(items)
+
+    index = 0
+    exhausted = False
+    pending = collections.deque() if ordered else set()
+    window = 2 * max_concurrency if ordered else max_concurrency
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def limited(position: int, item) -> BatchResult:
+        async with semaphore:
+            return await _acall(function, position, item)
+
+    async def submit_next() -> bool:
+        nonlocal index, exhausted
+        if exhausted:
+            return False
+        try:
+            item = await iterator.__anext__()
+        except StopAsyncIteration:
+            exhausted = True
+            return False
+        task = asyncio.ensure_future(limited(index, item))
+        index += 1
+        if ordered:
+            pending.append(task)
+        else:
+            pending.add(task)
+        return True
+
+    try:
+        while len(pending) < window and await submit_next():
+            pass
+
+        while pending:
+            if ordered:
+                done = [pending.popleft()]
+            else:
+                done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                pending.difference_update(done)
+
+            for task in done:
+                result = await task
+                await submit_next()
+                yield result
+    finally:
+        for task in pending:
+            task.cancel()
+
+
+async def arun_deduplicated_batch(function: Callable,
+                                  items: Iterable,
+                                  key: Callable,
+                                  max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY) -> DeduplicatedBatch:
+    """
+    Description: Asyncio counterpart of `run_deduplicated_batch`. `function` is a coroutine function.
+    """
+    items, groups, failures = _group_by_key(items, key)
+    representatives = {group_key: items[indices[0]] for group_key, indices in groups.items()}
+
+    async def call(group_key):
+        return await function(representatives[group_key])
+
+    unique_results = [result async for result in arun_batch(call, groups, max_concurrency, ordered=False)]
+    results = _spread(items, groups, unique_results, failures)
+    return DeduplicatedBatch(results, len(groups), len(items) - len(failures) - len(groups))
+
+
+async def _aiter(items: Iterable):
+    for item in items:
+        yield item
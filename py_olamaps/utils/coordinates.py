@@ -0,0 +1,77 @@
+_GEOHASH_ALPHABET = "0123456789bcdefghjkmnpqrstuvwxyz"
+_METERS_PER_DEGREE = 111320.0
+
+
+def format_lat_lng(point) -> str:
+    """
+    Description: Formats a coordinate as the "lat,lng" string the Ola Maps APIs expect.
+
+    :param point: string or tuple
+    Description: Either an already formatted "lat,lng" string or a (latitude, longitude) pair.
+    Example: (12.931316595874005, 77.61649243443775)
+
+    :return: string
+    """
+    if isinstance(point, str):
+        return point.strip()
+    latitude, longitude = point
+    return f"{latitude},{longitude}"
+
+
+def parse_lat_lng(point) -> tuple:
+    """
+    Description: Inverse of `format_lat_lng`: returns a (latitude, longitude) pair of floats.
+    """
+    if isinstance(point, str):
+        latitude, longitude = point.split(",")
+        return float(latitude), float(longitude)
+    latitude, longitude = point
+    return float(latitude), float(longitude)
+
+
+def geohash_encode(latitude: float,
+                   longitude: float,
+                   precision: int) -> str:
+    """
+    Description: Geohash of a coordinate with `precision` characters. Every point of a geohash cell shares its hash.
+
+    :return: string
+    Example: geohash_encode(12.9313, 77.6165, 7) == "tdr1w4n"
+    """
+    latitude_range = [-90.0, 90.0]
+    longitude_range = [-180.0, 180.0]
+    geohash = []
+    bits = 0
+    bit_count = 0
+    even = True
+
+    while len(geohash) < precision:
+        value, value_range = (longitude, longitude_range) if even else (latitude, latitude_range)
+        middle = (value_range[0] + value_range[1]) / 2
+        bits <<= 1
+        if value >= middle:
+            bits |= 1
+            value_range[0] = middle
+        else:
+            value_range[1] = middle
+        even = not even
+
+        bit_count += 1
+        if bit_count == 5:
+            geohash.append(_GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+
+    return "".join(geohash)
+
+
+def geohash_cell_diagonal(precision: int) -> float:
+    """
+    Description: Diagonal in meters of a geohash cell of `precision` characters at the equator, where cells are widest.
+    Two points sharing a geohash are never further apart than this.
+    """
+    longitude_bits = (5 * precision + 1) // 2
+    latitude_bits = 5 * precision // 2
+    height = 180.0 / 2 ** latitude_bits * _METERS_PER_DEGREE
+    width = 360.0 / 2 ** longitude_bits * _METERS_PER_DEGREE
+    return (height ** 2 + width ** 2) ** 0.5
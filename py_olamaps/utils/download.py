@@ -0,0 +1,141 @@
+import os
+import tempfile
+import time
+from typing import NamedTuple
+
+from py_olamaps.exceptions import OlaMapsError
+
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
+
+class DownloadResult(NamedTuple):
+    """
+    Outcome of a streamed download. `not_modified` is True when a conditional request found the image unchanged, in
+    which case nothing was written. Pass `etag` / `last_modified` back as `if_none_match` / `if_modified_since` on the
+    next download of the same image. Times are in seconds.
+    """
+    bytes_written: int
+    elapsed: float
+    time_to_first_byte: float
+    not_modified: bool = False
+    etag: str = None
+    last_modified: str = None
+    content_type: str = None
+
+
+class _PathSink:
+    # Written to a temporary file next to the target and renamed into place, so readers never see a partial image and
+    # a failed download leaves the previous file intact.
+    def __init__(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        descriptor, self.temporary_path = tempfile.mkstemp(dir=directory, suffix=".part")
+        self.file = os.fdopen(descriptor, "wb")
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+
+    def commit(self):
+        self.file.close()
+        os.replace(self.temporary_path, self.path)
+
+    def abort(self):
+        self.file.close()
+        os.unlink(self.temporary_path)
+
+
+class _FileSink:
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, chunk: bytes):
+        self.file.write(chunk)
+
+    def commit(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+class _BufferSink:
+    def __init__(self, buffer):
+        self.view = memoryview(buffer).cast("B")
+        if self.view.readonly:
+            raise OlaMapsError("The destination buffer is read-only")
+        self.offset = 0
+
+    def write(self, chunk: bytes):
+        end = self.offset + len(chunk)
+        if end > len(self.view):
+            raise OlaMapsError(f"The destination buffer of {len(self.view)} bytes is too small for the image")
+        self.view[self.offset:end] = chunk
+        self.offset = end
+
+    def commit(self):
+        pass
+
+    def abort(self):
+        pass
+
+
+class _TeeSink:
+    def __init__(self, sink, copy):
+        self.sink = sink
+        self.copy = copy
+
+    def write(self, chunk: bytes):
+        self.sink.write(chunk)
+        self.copy.write(chunk)
+
+    def commit(self):
+        self.sink.commit()
+        self.copy.commit()
+
+    def abort(self):
+        self.sink.abort()
+        self.copy.abort()
+
+
+def open_sink(destination, copy=None):
+    """
+    Description: Wraps a download destination: a path (str or os.PathLike), a binary file object with a `write`
+    method, or a writable pre-allocated buffer (bytearray, memoryview, numpy array, ...) that the image is copied into
+    from its start. Every chunk is also written to `copy`, a sink such as `ImageCache.writer`, when given.
+    """
+    if isinstance(destination, (str, os.PathLike)):
+        sink = _PathSink(destination)
+    elif hasattr(destination, "write"):
+        sink = _FileSink(destination)
+    else:
+        try:
+            sink = _BufferSink(destination)
+        except TypeError:
+            raise OlaMapsError("destination must be a path, a binary file object or a writable buffer") from None
+    return _TeeSink(sink, copy) if copy is not None else sink
+
+
+def conditional_headers(headers: dict, if_none_match: str, if_modified_since: str) -> dict:
+    headers = dict(headers)
+    if if_none_match is not None:
+        headers["If-None-Match"] = if_none_match
+    if if_modified_since is not None:
+        headers["If-Modified-Since"] = if_modified_since
+    return headers
+
+
+def deliver_image(image: memoryview, destination, started_at: float) -> DownloadResult:
+    """
+    Description: Writes an image held by the image cache to `destination` and returns a `DownloadResult` timed from
+    `started_at`.
+    """
+    sink = open_sink(destination)
+    try:
+        sink.write(image)
+    except BaseException:
+        sink.abort()
+        raise
+    sink.commit()
+    elapsed = time.monotonic() - started_at
+    return DownloadResult(len(image), elapsed, elapsed)
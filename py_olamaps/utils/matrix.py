@@ -0,0 +1,93 @@
+from py_olamaps.exceptions import OlaMapsError
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+STATUS_OK = 0
+STATUS_UNREACHABLE = 1
+STATUS_MISSING = 2
+
+
+class DistanceMatrixArrays:
+    def __init__(self,
+                 origin_count: int,
+                 destination_count: int):
+        """
+        Description: Dense NumPy view of a distance matrix. Requires the optional `numpy` dependency
+        (`pip install py-olamaps[numpy]`).
+
+        - `distance`: float64 array of shape (origins, destinations) in meters, NaN where no route was returned.
+        - `duration`: float64 array of the same shape in seconds, NaN where no route was returned.
+        - `status`: uint8 array of the same shape holding `STATUS_OK`, `STATUS_UNREACHABLE` (the API answered with a
+          non-OK element) or `STATUS_MISSING` (the pair was never answered, e.g. its request failed).
+        - `errors`: failures of the requests that should have filled the `STATUS_MISSING` pairs.
+        """
+        if np is None:
+            raise OlaMapsError("Array results require numpy. Install it with `pip install py-olamaps[numpy]`.")
+
+        shape = (origin_count, destination_count)
+        self.distance = np.full(shape, np.nan, dtype=np.float64)
+        self.duration = np.full(shape, np.nan, dtype=np.float64)
+        self.status = np.full(shape, STATUS_MISSING, dtype=np.uint8)
+        self.errors = []
+
+    @property
+    def shape(self) -> tuple:
+        return self.distance.shape
+
+    @property
+    def reachable(self):
+        """
+        Description: Boolean mask of the origin/destination pairs with a valid distance and duration.
+        """
+        return self.status == STATUS_OK
+
+    @classmethod
+    def from_response(cls, response: dict) -> "DistanceMatrixArrays":
+        """
+        Description: Converts an already parsed distance matrix response. The nested dict is not freed until the
+        caller drops it.
+        """
+        rows = response.get("rows", [])
+        destination_count = max((len(row.get("elements", [])) for row in rows), default=0)
+        arrays = cls(len(rows), destination_count)
+        arrays.fill(rows)
+        return arrays
+
+    def fill(self,
+             rows: list,
+             origin_start: int = 0,
+             destination_start: int = 0):
+        """
+        Description: Copies the "rows" of a distance matrix response into the block of the arrays starting at
+        (origin_start, destination_start), one row at a time and without building intermediate lists.
+        """
+        for offset, row in enumerate(rows):
+            elements = row.get("elements", [])
+            count = len(elements)
+            if count == 0:
+                continue
+
+            origin = origin_start + offset
+            columns = slice(destination_start, destination_start + count)
+            status = np.fromiter(
+                (STATUS_OK if element.get("status", "OK") == "OK" else STATUS_UNREACHABLE for element in elements),
+                dtype=np.uint8, count=count)
+            distance = np.fromiter((_value(element, "distance") for element in elements), dtype=np.float64, count=count)
+            duration = np.fromiter((_value(element, "duration") for element in elements), dtype=np.float64, count=count)
+
+            # A non-OK element may still carry placeholder values; never expose them as real costs.
+            unreachable = status != STATUS_OK
+            distance[unreachable] = np.nan
+            duration[unreachable] = np.nan
+
+            self.status[origin, columns] = status
+            self.distance[origin, columns] = distance
+            self.duration[origin, columns] = duration
+
+
+def _value(element: dict, key: str) -> float:
+    value = element.get(key)
+    return np.nan if value is None else value
@@ -0,0 +1,97 @@
+import hashlib
+import json
+import os
+from typing import NamedTuple
+
+from py_olamaps.utils.download import DownloadResult
+
+# Arguments that do not change the rendered image.
+_NON_CONTENT_ARGUMENTS = ("destination", "if_none_match", "if_modified_since", "x_request_id", "x_correlation_id")
+
+
+class StaticMapRender(NamedTuple):
+    """
+    Outcome of one spec of a bulk render. `download` is None when the spec was skipped because `sink` already held it.
+    """
+    key: str
+    skipped: bool
+    download: DownloadResult = None
+
+
+def static_map_kind(spec: dict) -> str:
+    """
+    Description: Which static map method renders `spec`: "bounding_box" if it has `min_x`, "center_point" if it has
+    `longitude`, otherwise "static_map_image".
+    """
+    if "min_x" in spec:
+        return "bounding_box"
+    if "longitude" in spec:
+        return "center_point"
+    return "static_map_image"
+
+
+def static_map_key(spec: dict) -> str:
+    """
+    Description: Content key of a static map spec: a SHA-256 of its canonical JSON form, ignoring arguments that do not
+    affect the image. Equal specs always get the same key, whatever the order of their arguments.
+
+    :param spec: dict
+    Description: Keyword arguments of one of the static map methods.
+    Example: {"style_name": "default-light-standard", "min_x": 77.5, "min_y": 12.9, "max_x": 77.7, "max_y": 13.0,
+    "image_width": 800, "image_height": 600, "image_format": "png"}
+
+    :return: string
+    """
+    content = {name: value for name, value in spec.items() if name not in _NON_CONTENT_ARGUMENTS}
+    content["kind"] = static_map_kind(spec)
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+class StaticMapSink:
+    """
+    Where a bulk render writes its images. Implement these methods to store them anywhere (object storage, a
+    database, ...). Methods may be called from several threads at once.
+    """
+
+    def exists(self, key: str, spec: dict) -> bool:
+        """
+        Return True if the image with content key `key` is already stored, so that it is not rendered again.
+        """
+        raise NotImplementedError
+
+    def destination(self, key: str, spec: dict):
+        """
+        Return the path, binary file object or writable buffer the image is streamed into.
+        """
+        raise NotImplementedError
+
+    def finish(self, key: str, spec: dict, destination, error: Exception = None):
+        """
+        Called once the image has been written to `destination`, or with `error` if rendering failed, e.g. to close a
+        file or upload it.
+        """
+
+
+class DirectorySink(StaticMapSink):
+    def __init__(self,
+                 directory: str):
+        """
+        Description: Stores each image as `<directory>/<content key>.<image format>`. Files are renamed into place only
+        once complete, so an interrupted run never leaves a partial image that a rerun would skip.
+
+        :param directory: string
+        Description: Directory receiving the images. It is created if missing.
+        Example: reports/maps
+        """
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+
+    def path(self, key: str, spec: dict) -> str:
+        return os.path.join(self.directory, f"{key}.{spec.get('image_format', 'png')}")
+
+    def exists(self, key: str, spec: dict) -> bool:
+        return os.path.exists(self.path(key, spec))
+
+    def destination(self, key: str, spec: dict) -> str:
+        return self.path(key, spec)
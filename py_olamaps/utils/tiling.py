@@ -0,0 +1,153 @@
+import math
+from typing import Iterator, NamedTuple
+from urllib.parse import quote
+
+
+class MatrixTile(NamedTuple):
+    """
+    A block of a distance matrix covering origins[origin_start:origin_stop] x
+    destinations[destination_start:destination_stop].
+    """
+    origin_start: int
+    origin_stop: int
+    destination_start: int
+    destination_stop: int
+
+
+class TileCoordinate(NamedTuple):
+    """
+    A web mercator (XYZ) map tile: column `x` and row `y` counted from the top-left corner at zoom level `zoom`.
+    """
+    zoom: int
+    x: int
+    y: int
+
+
+# Latitude limit of the web mercator projection.
+MAX_LATITUDE = 85.0511287798066
+
+
+def encoded_length(coordinates: list) -> int:
+    """
+    Description: Length of the longest coordinate once URL-encoded, including its encoded "|" separator.
+    """
+    return max((len(quote(coordinate, safe="")) for coordinate in coordinates), default=0) + len(quote("|"))
+
+
+def _even_split(total: int, block: int) -> int:
+    # Keep the number of blocks but spread the items evenly, so no block is left with a small remainder.
+    return math.ceil(total / math.ceil(total / block))
+
+
+def plan_matrix_tiles(origin_count: int,
+                      destination_count: int,
+                      max_elements: int,
+                      max_coordinates: int) -> list:
+    """
+    Description: Splits an origin_count x destination_count matrix into the fewest tiles such that each tile has at
+    most `max_elements` origin/destination pairs and at most `max_coordinates` origins plus destinations (the bound
+    that keeps the request URL short enough). Tiles are evenly sized along each axis.
+
+    :return: list of MatrixTile
+    """
+    if origin_count == 0 or destination_count == 0:
+        return []
+    if max_elements < 1 or max_coordinates < 2:
+        raise ValueError("Tile limits must allow at least one origin and one destination per request")
+
+    best = None
+    for origins_per_tile in range(1, min(origin_count, max_elements, max_coordinates - 1) + 1):
+        destinations_per_tile = min(destination_count,
+                                    max_elements // origins_per_tile,
+                                    max_coordinates - origins_per_tile)
+        tile_count = math.ceil(origin_count / origins_per_tile) * math.ceil(destination_count / destinations_per_tile)
+        candidate = (tile_count, -origins_per_tile * destinations_per_tile, origins_per_tile, destinations_per_tile)
+        if best is None or candidate < best:
+            best = candidate
+
+    origins_per_tile = _even_split(origin_count, best[2])
+    destinations_per_tile = _even_split(destination_count, best[3])
+
+    return [MatrixTile(origin_start, min(origin_start + origins_per_tile, origin_count),
+                       destination_start, min(destination_start + destinations_per_tile, destination_count))
+            for origin_start in range(0, origin_count, origins_per_tile)
+            for destination_start in range(0, destination_count, destinations_per_tile)]
+
+
+def plan_windows(count: int,
+                 window_size: int,
+                 overlap: int) -> list:
+    """
+    Description: Splits a sequence of `count` items into windows of at most `window_size` items, each sharing `overlap`
+    items with the previous one.
+
+    :return: list of (start, stop) tuples
+    """
+    if window_size < 2 or not 0 <= overlap < window_size:
+        raise ValueError("window_size must be at least 2 and overlap between 0 and window_size - 1")
+    if count == 0:
+        return []
+
+    windows = []
+    start = 0
+    while True:
+        stop = min(start + window_size, count)
+        windows.append((start, stop))
+        if stop >= count:
+            return windows
+        start = stop - overlap
+
+
+def lng_lat_to_tile(longitude: float,
+                    latitude: float,
+                    zoom: int) -> TileCoordinate:
+    """
+    Description: The tile containing a point at `zoom`. Latitudes beyond the web mercator limit are clamped.
+    """
+    latitude = max(-MAX_LATITUDE, min(MAX_LATITUDE, latitude))
+    count = 2 ** zoom
+    x = int((longitude + 180.0) / 360.0 * count)
+    y = int((1.0 - math.asinh(math.tan(math.radians(latitude))) / math.pi) / 2.0 * count)
+    return TileCoordinate(zoom, min(max(x, 0), count - 1), min(max(y, 0), count - 1))
+
+
+def plan_tile_pyramid(min_x: float,
+                      min_y: float,
+                      max_x: float,
+                      max_y: float,
+                      min_zoom: int,
+                      max_zoom: int) -> Iterator[TileCoordinate]:
+    """
+    Description: Lazily lists every tile covering the bounding box (min_x, min_y) - (max_x, max_y), in lng/lat, at
+    each zoom level from `min_zoom` to `max_zoom`, zoom level by zoom level. The box must not cross the antimeridian.
+
+    :return: iterator of TileCoordinate
+    """
+    if min_x > max_x or min_y > max_y:
+        raise ValueError("The bounding box must have min_x <= max_x and min_y <= max_y")
+    if not 0 <= min_zoom <= max_zoom:
+        raise ValueError("Zoom levels must satisfy 0 <= min_zoom <= max_zoom")
+
+    for zoom in range(min_zoom, max_zoom + 1):
+        top_left = lng_lat_to_tile(min_x, max_y, zoom)
+        bottom_right = lng_lat_to_tile(max_x, min_y, zoom)
+        for x in range(top_left.x, bottom_right.x + 1):
+            for y in range(top_left.y, bottom_right.y + 1):
+                yield TileCoordinate(zoom, x, y)
+
+
+def tile_pyramid_size(min_x: float,
+                      min_y: float,
+                      max_x: float,
+                      max_y: float,
+                      min_zoom: int,
+                      max_zoom: int) -> int:
+    """
+    Description: Number of tiles `plan_tile_pyramid` lists for the same arguments.
+    """
+    size = 0
+    for zoom in range(min_zoom, max_zoom + 1):
+        top_left = lng_lat_to_tile(min_x, max_y, zoom)
+        bottom_right = lng_lat_to_tile(max_x, min_y, zoom)
+        size += (bottom_right.x - top_left.x + 1) * (bottom_right.y - top_left.y + 1)
+    return size
@@ -0,0 +1,329 @@
+import json
+import os
+import sqlite3
+import threading
+from typing import AsyncIterator, Iterator
+
+from py_olamaps.exceptions import OlaMapsError
+from py_olamaps.utils.CommonEnums import MapTilesApi
+from py_olamaps.utils.batch import (DEFAULT_ASYNC_MAX_CONCURRENCY, DEFAULT_MAX_CONCURRENCY, BatchResult, arun_batch,
+                                    run_batch)
+from py_olamaps.utils.tiling import TileCoordinate, plan_tile_pyramid
+
+DEFAULT_COMMIT_INTERVAL = 256
+
+
+def vector_sources(document) -> list:
+    """
+    Description: The vector tile sources described by a TileJSON document (as returned by `MapTiles.array_of_data`), a
+    list of TileJSON documents, or a style document (as returned by `MapTiles.get_style_details`). Each source is a
+    TileJSON-like dict holding either its URL templates in `tiles` or the URL of its TileJSON in `url`.
+
+    :return: list of dict
+    """
+    if isinstance(document, list):
+        return [source for item in document for source in vector_sources(item)]
+    if not isinstance(document, dict):
+        return []
+    if "tiles" in document:
+        return [document]
+    return [source for source in document.get("sources", {}).values()
+            if source.get("type") == "vector" and ("tiles" in source or "url" in source)]
+
+
+def vector_source(document, source_name: str = None) -> dict:
+    """
+    Description: The source named `source_name` of a style document, or else the first vector source of `document`.
+    Raises OlaMapsError if there is none.
+    """
+    if source_name is not None:
+        source = document.get("sources", {}).get(source_name) if isinstance(document, dict) else None
+        if source is None:
+            raise OlaMapsError(f"The document has no source named {source_name!r}")
+        return source
+    sources = vector_sources(document)
+    if not sources:
+        raise OlaMapsError("The document does not describe any vector tile source")
+    return sources[0]
+
+
+class MBTilesStore:
+    def __init__(self,
+                 path: str,
+                 timeout: float = 30.0):
+        """
+        Description: Single-file tile store using the MBTiles layout: a SQLite database with a `tiles` table keyed by
+        zoom level, column and row (rows counted from the bottom, as MBTiles requires) and a `metadata` table. Tiles
+        are stored as the API returns them. Like `DiskCache`, the database runs in WAL mode and each process and
+        thread uses its own connection, so tiles can be served while a seed job writes.
+
+        :param path: string
+        Description: Path of the SQLite file. It is created if missing.
+        Example: tiles/bengaluru.mbtiles
+
+        :param timeout: float
+        Description: Seconds to wait for a lock held by another connection before failing.
+        Default value: 30.0
+        """
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+
+        connection = self._connection()
+        with connection:
+            connection.execute("CREATE TABLE IF NOT EXISTS metadata (name TEXT PRIMARY KEY, value TEXT)")
+            connection.execute("CREATE TABLE IF NOT EXISTS tiles ("
+                               "zoom_level INTEGER NOT NULL, tile_column INTEGER NOT NULL, "
+                               "tile_row INTEGER NOT NULL, tile_data BLOB NOT NULL)")
+            connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS tile_index ON tiles "
+                               "(zoom_level, tile_column, tile_row)")
+
+    def _connection(self) -> sqlite3.Connection:
+        # Connections must not cross a fork or be shared between threads, so keep one per process and thread.
+        connection = getattr(self._local, "connection", None)
+        if connection is None or self._local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=self.timeout)
+            connection.execute("PRAGMA journal_mode = WAL")
+            connection.execute("PRAGMA synchronous = NORMAL")
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @staticmethod
+    def _row(zoom: int, y: int) -> int:
+        return 2 ** zoom - 1 - y
+
+    def get_tile(self, zoom: int, x: int, y: int) -> bytes:
+        """
+        Description: The stored tile at XYZ coordinates (zoom, x, y), or None if it is missing.
+        """
+        row = self._connection().execute("SELECT tile_data FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                                          "AND tile_row = ?", (zoom, x, self._row(zoom, y))).fetchone()
+        return bytes(row[0]) if row is not None else None
+
+    def has_tile(self, zoom: int, x: int, y: int) -> bool:
+        return self._connection().execute("SELECT 1 FROM tiles WHERE zoom_level = ? AND tile_column = ? "
+                                          "AND tile_row = ?", (zoom, x, self._row(zoom, y))).fetchone() is not None
+
+    def put_tiles(self, tiles):
+        """
+        Description: Stores an iterable of (TileCoordinate, data) pairs in one transaction, replacing existing tiles.
+        """
+        connection = self._connection()
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO tiles (zoom_level, tile_column, tile_row, tile_data) "
+                                   "VALUES (?, ?, ?, ?)",
+                                   ((tile.zoom, tile.x, self._row(tile.zoom, tile.y), sqlite3.Binary(data))
+                                    for tile, data in tiles))
+
+    def put_tile(self, zoom: int, x: int, y: int, data: bytes):
+        self.put_tiles([(TileCoordinate(zoom, x, y), data)])
+
+    def metadata(self) -> dict:
+        return dict(self._connection().execute("SELECT name, value FROM metadata").fetchall())
+
+    def set_metadata(self, metadata: dict):
+        connection = self._connection()
+        with connection:
+            connection.executemany("INSERT OR REPLACE INTO metadata (name, value) VALUES (?, ?)",
+                                   ((name, str(value)) for name, value in metadata.items()))
+
+    def close(self):
+        """
+        Description: Closes the connection of the calling thread.
+        """
+        connection = getattr(self._local, "connection", None)
+        if connection is not None:
+            connection.close()
+            self._local.connection = None
+
+    def __len__(self):
+        (count,) = self._connection().execute("SELECT COUNT(*) FROM tiles").fetchone()
+        return count
+
+
+class BaseTileFetcher:
+    def __init__(self,
+                 client,
+                 store: MBTilesStore,
+                 tilejson: dict,
+                 commit_interval: int = DEFAULT_COMMIT_INTERVAL,
+                 x_correlation_id: str = None):
+        """
+        Description: Downloads the vector tiles of one TileJSON source into `store` and serves them from there. Create
+        one with `MapTiles.vector_tiles`. Tile requests go through the client like any other call, so its rate
+        limiter, retry policy and circuit breaker apply.
+
+        :param commit_interval: integer
+        Description: Number of tiles a seed job downloads between two commits to `store`. An interrupted job loses at
+        most this many tiles, which the next run downloads again.
+        Default value: 256
+        """
+        templates = tilejson.get("tiles") or []
+        if not templates:
+            raise OlaMapsError("The TileJSON document does not list any tile URL templates")
+        self._client = client
+        self.store = store
+        self.tilejson = tilejson
+        self.templates = list(templates)
+        self.scheme = tilejson.get("scheme", "xyz")
+        self.min_zoom = tilejson.get("minzoom", 0)
+        self.max_zoom = tilejson.get("maxzoom", 22)
+        self.commit_interval = commit_interval
+        self.x_correlation_id = x_correlation_id
+
+        metadata = {"format": tilejson.get("format", "pbf"), "minzoom": self.min_zoom, "maxzoom": self.max_zoom}
+        for name in ("name", "description", "attribution", "version"):
+            if name in tilejson:
+                metadata[name] = tilejson[name]
+        if "bounds" in tilejson:
+            metadata["bounds"] = ",".join(str(value) for value in tilejson["bounds"])
+        if "vector_layers" in tilejson:
+            metadata["json"] = json.dumps({"vector_layers": tilejson["vector_layers"]})
+        store.set_metadata(metadata)
+
+    def tile_url(self, zoom: int, x: int, y: int) -> str:
+        # Spread tiles over the templates (usually one per host) the way map renderers do.
+        template = self.templates[(x + y) % len(self.templates)]
+        if self.scheme == "tms":
+            y = 2 ** zoom - 1 - y
+        return template.replace("{z}", str(zoom)).replace("{x}", str(x)).replace("{y}", str(y))
+
+    def _headers(self) -> dict:
+        headers = dict()
+        if self.x_correlation_id is not None:
+            headers["x_correlation_id"] = self.x_correlation_id
+        return headers
+
+    def _plan(self, min_x: float, min_y: float, max_x: float, max_y: float, min_zoom: int, max_zoom: int):
+        min_zoom = self.min_zoom if min_zoom is None else max(min_zoom, self.min_zoom)
+        max_zoom = self.max_zoom if max_zoom is None else min(max_zoom, self.max_zoom)
+        for tile in plan_tile_pyramid(min_x, min_y, max_x, max_y, min_zoom, max_zoom):
+            if not self.store.has_tile(*tile):
+                yield tile
+
+
+class TileFetcher(BaseTileFetcher):
+    def _fetch(self, tile: TileCoordinate) -> bytes:
+        response = self._client._request("GET", MapTilesApi.Vector_Tile_Endpoint, self.tile_url(*tile),
+                                         self._headers(), dict(), raw=True)
+        return response.content
+
+    def get_tile(self, zoom: int, x: int, y: int) -> bytes:
+        """
+        Description: The tile at XYZ coordinates (zoom, x, y), from `store` if it holds it, otherwise downloaded and
+        stored for later requests.
+
+        :return: bytes
+        """
+        data = self.store.get_tile(zoom, x, y)
+        if data is None:
+            data = self._fetch(TileCoordinate(zoom, x, y))
+            self.store.put_tile(zoom, x, y, data)
+        return data
+
+    def seed(self,
+             min_x: float,
+             min_y: float,
+             max_x: float,
+             max_y: float,
+             min_zoom: int = None,
+             max_zoom: int = None,
+             max_concurrency: int = DEFAULT_MAX_CONCURRENCY) -> Iterator[BatchResult]:
+        """
+        Description: Downloads every tile covering a bounding box over a range of zoom levels into `store`,
+        `max_concurrency` at a time. Tiles `store` already holds are skipped, so rerunning an interrupted job resumes
+        it. Failures are reported per tile and do not abort the job; rerun it to retry them. Tiles are committed as
+        the returned iterator is consumed, so consume it to the end (or close it) for the job to complete.
+
+        :param min_x: float
+        Description: Minimum longitude of the bounding box.
+        Example: 77.46
+
+        :param min_y: float
+        Description: Minimum latitude of the bounding box.
+        Example: 12.83
+
+        :param max_x: float
+        Description: Maximum longitude of the bounding box.
+        Example: 77.78
+
+        :param max_y: float
+        Description: Maximum latitude of the bounding box.
+        Example: 13.14
+
+        :param min_zoom: integer
+        Description: Lowest zoom level to download, no lower than the source's `minzoom`.
+        Default value: the source's `minzoom`
+
+        :param max_zoom: integer
+        Description: Highest zoom level to download, no higher than the source's `maxzoom`.
+        Default value: the source's `maxzoom`
+
+        :param max_concurrency: integer
+        Description: Maximum number of tiles downloaded at once.
+        Default value: 8
+
+        :return: iterator of BatchResult
+        Description: One per downloaded tile, with its `TileCoordinate` as input and its size in bytes as result.
+        """
+        pending = []
+        try:
+            for result in run_batch(self._fetch, self._plan(min_x, min_y, max_x, max_y, min_zoom, max_zoom),
+                                    max_concurrency, ordered=False):
+                if result.ok:
+                    pending.append((result.input, result.result))
+                    result = result._replace(result=len(result.result))
+                    if len(pending) >= self.commit_interval:
+                        self.store.put_tiles(pending)
+                        pending = []
+                yield result
+        finally:
+            if pending:
+                self.store.put_tiles(pending)
+
+
+class AsyncTileFetcher(BaseTileFetcher):
+    async def _fetch(self, tile: TileCoordinate) -> bytes:
+        response = await self._client._request("GET", MapTilesApi.Vector_Tile_Endpoint, self.tile_url(*tile),
+                                               self._headers(), dict(), raw=True)
+        return response.content
+
+    async def get_tile(self, zoom: int, x: int, y: int) -> bytes:
+        """
+        Description: Async variant of `TileFetcher.get_tile`.
+        """
+        data = self.store.get_tile(zoom, x, y)
+        if data is None:
+            data = await self._fetch(TileCoordinate(zoom, x, y))
+            self.store.put_tile(zoom, x, y, data)
+        return data
+
+    async def seed(self,
+                   min_x: float,
+                   min_y: float,
+                   max_x: float,
+                   max_y: float,
+                   min_zoom: int = None,
+                   max_zoom: int = None,
+                   max_concurrency: int = DEFAULT_ASYNC_MAX_CONCURRENCY) -> AsyncIterator[BatchResult]:
+        """
+        Description: Async variant of `TileFetcher.seed`.
+        """
+        pending = []
+        try:
+            async for result in arun_batch(self._fetch, self._plan(min_x, min_y, max_x, max_y, min_zoom, max_zoom),
+                                           max_concurrency, ordered=False):
+                if result.ok:
+                    pending.append((result.input, result.result))
+                    result = result._replace(result=len(result.result))
+                    if len(pending) >= self.commit_interval:
+                        self.store.put_tiles(pending)
+                        pending = []
+                yield result
+        finally:
+            if pending:
+                self.store.put_tiles(pending)
@@ -0,0 +1,91 @@
+import asyncio
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from py_olamaps.AsyncOlaMaps import AsyncOlaMaps
+from py_olamaps.auth import FileTokenStore, Token
+from py_olamaps.exceptions import OlaMapsError
+
+
+class _Response:
+    def __init__(self, status_code: int, body: dict):
+        self.status_code = status_code
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    async def aclose(self):
+        pass
+
+
+class _SlowTokenTransport:
+    """
+    Rejects the old token with 401, but only once a token request is in flight, and answers token requests slowly, so
+    the 401 always arrives while the background refresh holds the token store lock.
+    """
+
+    def __init__(self):
+        self.token_requested = asyncio.Event()
+
+    async def request(self, method, url, headers=None, params=None, data=None, stream=False):
+        if method == "POST":
+            self.token_requested.set()
+            await asyncio.sleep(0.2)
+            return _Response(200, {"access_token": "new", "expires_in": 3600})
+        if headers.get("Authorization") == "Bearer old":
+            await self.token_requested.wait()
+            return _Response(401, {"error": "expired"})
+        return _Response(200, {"styles": []})
+
+    async def aclose(self):
+        pass
+
+
+class AsyncTokenManagerTest(unittest.TestCase):
+    def test_401_during_background_refresh_with_token_store(self):
+        directory = tempfile.mkdtemp()
+        outcome = {}
+
+        async def scenario():
+            client = AsyncOlaMaps(client_id="id", client_secret="secret", transport=_SlowTokenTransport(),
+                                  token_store=FileTokenStore(directory))
+            # Within the refresh margin, so the request starts a background refresh.
+            client.token_manager.token = Token("old", time.time() + 30)
+            outcome["result"] = await client.map_tiles.get_map_style()
+            outcome["token"] = client.access_token
+            outcome["stored"] = client.token_manager.store.get(client.token_manager.store_key)
+
+        # The loop runs in its own thread, so a regression that blocks it fails the test instead of hanging the suite.
+        thread = threading.Thread(target=asyncio.run, args=(scenario(),), daemon=True)
+        thread.start()
+        thread.join(10)
+
+        self.assertFalse(thread.is_alive(), "the event loop was blocked")
+        self.assertEqual(outcome["result"], {"styles": []})
+        self.assertEqual(outcome["token"], "new")
+        self.assertEqual(outcome["stored"], Token("new", outcome["stored"].expires_at))
+
+
+class FileTokenStoreTest(unittest.TestCase):
+    def test_malformed_token_file_is_treated_as_missing(self):
+        store = FileTokenStore(tempfile.mkdtemp())
+        for content in ('{"expires_at": 1}', "[1, 2]", '"value"', "{"):
+            with open(store._path("key") + ".json", "w") as file:
+                file.write(content)
+            self.assertIsNone(store.get("key"))
+
+    @unittest.skipUnless(hasattr(os, "getuid"), "POSIX permissions only")
+    def test_rejects_directory_writable_by_others(self):
+        directory = tempfile.mkdtemp()
+        os.chmod(directory, 0o777)
+        with self.assertRaises(OlaMapsError):
+            FileTokenStore(directory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+
+from py_olamaps.cache import ResponseCache
+from py_olamaps.utils.CommonEnums import GeocodeApi
+
+ENDPOINT = GeocodeApi.Reverse_Geocode_Endpoint
+
+
+class SpatialCacheKeyTest(unittest.TestCase):
+    def setUp(self):
+        self.cache = ResponseCache(reverse_geocode_precision=8)
+
+    def _key(self, latlng: str) -> str:
+        return self.cache.key("GET", ENDPOINT, ENDPOINT.value, {"latlng": latlng})
+
+    def test_nearby_points_share_a_key(self):
+        self.assertEqual(self._key("12.931300,77.616500"), self._key("12.931301,77.616501"))
+
+    def test_malformed_latlng_falls_back_to_the_exact_key(self):
+        for latlng in ("12.93", "north,east", "12.93,77.61,1", "200,77.61"):
+            self.assertEqual(self._key(latlng), ResponseCache().key("GET", ENDPOINT, ENDPOINT.value, {"latlng": latlng}))
+
+
+class ResponseCacheTest(unittest.TestCase):
+    def test_get_and_set_take_the_key_first(self):
+        cache = ResponseCache(endpoint_ttls={ENDPOINT: 0})
+        cache.set("key", {"status": "ok"})
+        cache.set("other", {"status": "ok"}, ENDPOINT)
+
+        self.assertEqual(cache.get("key"), {"status": "ok"})
+        self.assertIsNone(cache.get("other", ENDPOINT))
+
+
+if __name__ == "__main__":
+    unittest.main()
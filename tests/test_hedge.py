@@ -0,0 +1,101 @@
+import asyncio
+import concurrent.futures
+import threading
+import time
+import unittest
+
+from py_olamaps.hedge import HedgePolicy, asend_hedged, send_hedged
+from py_olamaps.utils.CommonEnums import RoutingApi
+
+ENDPOINT = RoutingApi.Directions_Endpoint
+
+
+class _Response:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+        self.closed = False
+
+    def close(self):
+        self.closed = True
+
+    async def aclose(self):
+        self.closed = True
+
+
+class _RecordingExecutor(concurrent.futures.ThreadPoolExecutor):
+    def __init__(self):
+        super().__init__(4)
+        self.submitted = 0
+
+    def submit(self, *args, **kwargs):
+        self.submitted += 1
+        return super().submit(*args, **kwargs)
+
+
+def _policy() -> HedgePolicy:
+    return HedgePolicy((ENDPOINT,), delay=0.05, max_hedge_ratio=1.0)
+
+
+class SendHedgedTest(unittest.TestCase):
+    def setUp(self):
+        self.executor = _RecordingExecutor()
+        self.addCleanup(self.executor.shutdown)
+
+    def _send(self, *attempts):
+        # Each call of the returned function plays the next attempt: (seconds to answer, response).
+        attempts = list(attempts)
+        lock = threading.Lock()
+
+        def send():
+            with lock:
+                delay, response = attempts.pop(0)
+            time.sleep(delay)
+            return response
+
+        return send
+
+    def test_pending_success_beats_fast_error_status(self):
+        success, throttled = _Response(200), _Response(429)
+        send = self._send((0.2, success), (0.0, throttled))
+
+        self.assertIs(send_hedged(self.executor, _policy(), ENDPOINT, send, lambda: True), success)
+        self.assertTrue(throttled.closed)
+        self.assertFalse(success.closed)
+
+    def test_error_status_is_returned_when_nothing_succeeds(self):
+        first, second = _Response(503), _Response(503)
+        send = self._send((0.1, first), (0.0, second))
+
+        self.assertIs(send_hedged(self.executor, _policy(), ENDPOINT, send, lambda: True), second)
+        self.assertTrue(first.closed)
+        self.assertFalse(second.closed)
+
+    def test_only_the_hedge_copy_uses_the_pool(self):
+        primary, hedge = _Response(200), _Response(200)
+        send = self._send((0.1, primary), (0.0, hedge))
+
+        self.assertIs(send_hedged(self.executor, _policy(), ENDPOINT, send, lambda: True), hedge)
+        self.assertEqual(self.executor.submitted, 1)
+        # The abandoned primary is closed once it answers.
+        time.sleep(0.2)
+        self.assertTrue(primary.closed)
+
+
+class AsendHedgedTest(unittest.TestCase):
+    def test_pending_success_beats_fast_error_status(self):
+        success, throttled = _Response(200), _Response(500)
+        attempts = [(0.2, success), (0.0, throttled)]
+
+        async def send():
+            delay, response = attempts.pop(0)
+            await asyncio.sleep(delay)
+            return response
+
+        result = asyncio.run(asend_hedged(_policy(), ENDPOINT, send, lambda: True))
+
+        self.assertIs(result, success)
+        self.assertTrue(throttled.closed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import os
+import tempfile
+import unittest
+
+from py_olamaps.OlaMaps import OlaMaps
+from py_olamaps.exceptions import OlaMapsError
+from py_olamaps.image_cache import ImageCache
+from py_olamaps.utils.vector_tiles import MBTilesStore
+
+BASE_URL = "https://api.olamaps.io"
+CDN_URL = "https://tiles.example-cdn.com"
+
+
+class _Response:
+    def __init__(self, status_code: int, body=None, content: bytes = b""):
+        self.status_code = status_code
+        self.headers = {}
+        self.content = content
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def iter_content(self, chunk_size):
+        for start in range(0, len(self.content), chunk_size):
+            yield self.content[start:start + chunk_size]
+
+    def close(self):
+        pass
+
+
+class _ImageTransport:
+    def __init__(self):
+        self.requests = 0
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False):
+        self.requests += 1
+        return _Response(200, content=b"image" * 1000)
+
+    def close(self):
+        pass
+
+
+class _RecordingTransport:
+    def __init__(self):
+        self.requests = []
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False):
+        self.requests.append((url, dict(headers or {}), dict(params or {})))
+        if url.endswith("/style.json"):
+            return _Response(200, {"sources": {"planet": {"type": "vector", "url": CDN_URL + "/planet.json"}}})
+        if url.endswith("/planet.json"):
+            return _Response(200, {"tiles": [CDN_URL + "/planet/{z}/{x}/{y}.pbf",
+                                              BASE_URL + "/tiles/vector/v1/data/planet/{z}/{x}/{y}.pbf"]})
+        return _Response(200, content=b"tile")
+
+    def close(self):
+        pass
+
+
+class VectorTilesTest(unittest.TestCase):
+    def test_credentials_are_only_sent_to_the_api_host(self):
+        transport = _RecordingTransport()
+        client = OlaMaps(api_key="secret", transport=transport, base_url=BASE_URL)
+        store = MBTilesStore(os.path.join(tempfile.mkdtemp(), "tiles.mbtiles"))
+        fetcher = client.map_tiles.vector_tiles(store, style_name="default-light-standard")
+        fetcher.get_tile(1, 0, 0)
+        fetcher.get_tile(1, 1, 0)
+
+        for url, headers, params in transport.requests:
+            authorized = "api_key" in params or "Authorization" in headers
+            self.assertEqual(authorized, url.startswith(BASE_URL), url)
+        self.assertEqual(len(transport.requests), 4)
+
+
+class StaticMapImageCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.transport = _ImageTransport()
+        self.image_cache = ImageCache(directory=tempfile.mkdtemp())
+        self.client = OlaMaps(api_key="key", transport=self.transport, image_cache=self.image_cache)
+
+    def _static_map(self, **options):
+        return self.client.map_tiles.static_map_image_based_on_center_point("default-light-standard", 77.61, 12.93,
+                                                                            15, 800, 600, "png", **options)
+
+    def test_responses_are_returned_unless_a_memoryview_is_requested(self):
+        self.assertIsInstance(self._static_map(), _Response)
+        self.assertEqual(bytes(self._static_map(as_memoryview=True)), b"image" * 1000)
+        self.assertEqual(bytes(self._static_map(as_memoryview=True)), b"image" * 1000)
+        self.assertEqual(self.transport.requests, 2)
+
+    def test_streamed_misses_fill_the_disk_tier(self):
+        directory = tempfile.mkdtemp()
+        first = self._static_map(destination=os.path.join(directory, "first.png"))
+        second = self._static_map(destination=os.path.join(directory, "second.png"))
+
+        self.assertEqual(first.bytes_written, second.bytes_written)
+        self.assertEqual(self.transport.requests, 1)
+        self.assertEqual(self.image_cache.disk_hits, 1)
+        with open(os.path.join(directory, "second.png"), "rb") as file:
+            self.assertEqual(file.read(), b"image" * 1000)
+
+    def test_memoryview_cannot_be_combined_with_destination(self):
+        with self.assertRaises(OlaMapsError):
+            self._static_map(destination=bytearray(5000), as_memoryview=True)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import threading
+import unittest
+
+from py_olamaps.AsyncOlaMaps import AsyncOlaMaps
+from py_olamaps.OlaMaps import OlaMaps
+
+
+class _Response:
+    def __init__(self, body: dict):
+        self.status_code = 200
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def close(self):
+        pass
+
+    async def aclose(self):
+        pass
+
+
+class _AutocompleteTransport:
+    def __init__(self):
+        self.inputs = []
+
+    def request(self, method, url, headers=None, params=None, data=None, stream=False):
+        self.inputs.append(params["input"])
+        return _Response({"predictions": [], "status": "ok"})
+
+    def close(self):
+        pass
+
+
+class _AsyncAutocompleteTransport(_AutocompleteTransport):
+    async def request(self, method, url, headers=None, params=None, data=None, stream=False):
+        return super().request(method, url, headers, params, data, stream)
+
+    async def aclose(self):
+        pass
+
+
+class AutocompleteSessionTest(unittest.TestCase):
+    def test_session_options_are_passed_through(self):
+        transport = _AutocompleteTransport()
+        client = OlaMaps(api_key="key", transport=transport)
+        session = client.places.autocomplete_session(debounce=0, min_length=3, cache_size=1)
+
+        self.assertIsNone(session.update("ke"))
+        session.update("kempe")
+        session.update("kormangala")
+        session.update("kempe")
+
+        self.assertEqual(transport.inputs, ["kempe", "kormangala", "kempe"])
+
+    def test_requests_are_counted_across_threads(self):
+        transport = _AutocompleteTransport()
+        client = OlaMaps(api_key="key", transport=transport)
+        session = client.places.autocomplete_session(debounce=0, min_prefix_results=0)
+
+        def type_inputs(prefix):
+            for index in range(200):
+                session.update(f"{prefix} {index}")
+
+        threads = [threading.Thread(target=type_inputs, args=(prefix,)) for prefix in "abcd"]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(session.stats()["requests"], len(transport.inputs))
+
+    def test_async_session_options_are_passed_through(self):
+        transport = _AsyncAutocompleteTransport()
+
+        async def scenario():
+            client = AsyncOlaMaps(api_key="key", transport=transport)
+            session = client.places.autocomplete_session(debounce=0, min_length=3, cache_size=1)
+            self.assertIsNone(await session.update("ke"))
+            await session.update("kempe")
+            await session.update("kormangala")
+            await session.update("kempe")
+
+        asyncio.run(scenario())
+        self.assertEqual(transport.inputs, ["kempe", "kormangala", "kempe"])
+
+
+if __name__ == "__main__":
+    unittest.main()
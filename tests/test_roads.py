@@ -0,0 +1,46 @@
+import unittest
+
+from py_olamaps.OlaMaps import OlaMaps
+
+
+class _Response:
+    def __init__(self, body: dict):
+        self.status_code = 200
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def close(self):
+        pass
+
+
+class _SnapTransport:
+    # Snaps every point of a window to the location it was sent with.
+    def request(self, method, url, headers=None, params=None, data=None, stream=False):
+        points = params["points"].split("|")
+        return _Response({"snapped_points": [{"location": {"lat": float(point.split(",")[0]),
+                                                           "lng": float(point.split(",")[1])},
+                                              "original_index": index}
+                                             for index, point in enumerate(points)],
+                          "status": "SUCCESS"})
+
+    def close(self):
+        pass
+
+
+class BulkSnapToRoadTest(unittest.TestCase):
+    def test_stationary_trace_keeps_every_point(self):
+        client = OlaMaps(api_key="key", transport=_SnapTransport())
+        # A parked vehicle keeps reporting the same location.
+        points = ["12.93,77.61"] * 12 + ["12.94,77.62"] * 6 + ["12.93,77.61"] * 12
+
+        result = client.roads.bulk_snap_to_road(points, window_size=10, overlap=4)
+
+        self.assertEqual(result["errors"], [])
+        self.assertEqual([point["original_index"] for point in result["snapped_points"]], list(range(len(points))))
+
+
+if __name__ == "__main__":
+    unittest.main()
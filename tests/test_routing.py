@@ -0,0 +1,54 @@
+import unittest
+
+from py_olamaps.OlaMaps import OlaMaps
+from py_olamaps.exceptions import OlaMapsError
+
+
+class _Response:
+    def __init__(self, body: dict):
+        self.status_code = 200
+        self.headers = {}
+        self._body = body
+
+    def json(self):
+        return self._body
+
+    def close(self):
+        pass
+
+
+class _MatrixTransport:
+    # Answers the block of the second origin without rows and the block of the third with a short row.
+    def request(self, method, url, headers=None, params=None, data=None, stream=False):
+        origins = params["origins"].split("|")
+        destinations = params["destinations"].split("|")
+        if origins[0] == "12.1,77.1":
+            return _Response({"status": "SUCCESS"})
+        if origins[0] == "12.2,77.2":
+            return _Response({"rows": [{"elements": [{"status": "OK"}]}], "status": "SUCCESS"})
+        return _Response({"rows": [{"elements": [{"status": "OK", "distance": 1, "duration": 1}] * len(destinations)}
+                                   for _ in origins],
+                          "status": "SUCCESS"})
+
+    def close(self):
+        pass
+
+
+class BulkDistanceMatrixTest(unittest.TestCase):
+    def test_malformed_blocks_are_reported_as_errors(self):
+        client = OlaMaps(api_key="key", transport=_MatrixTransport())
+        origins = ["12.0,77.0", "12.1,77.1", "12.2,77.2"]
+        destinations = ["13.0,78.0", "13.1,78.1"]
+
+        matrix = client.routing.bulk_distance_matrix(origins, destinations, max_elements=2)
+
+        self.assertEqual(sorted(error.input.origin_start for error in matrix["errors"]), [1, 2])
+        for error in matrix["errors"]:
+            self.assertIsInstance(error.error, OlaMapsError)
+        self.assertEqual([element["distance"] for element in matrix["rows"][0]["elements"]], [1, 1])
+        self.assertEqual(matrix["rows"][1]["elements"], [None, None])
+        self.assertEqual(matrix["rows"][2]["elements"], [None, None])
+
+
+if __name__ == "__main__":
+    unittest.main()